@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useReducer, useEffect } from 'react';
+import React, { createContext, useContext, useReducer, useEffect, useRef } from 'react';
 import apiService from '../services/api';
 
 // Estado inicial
@@ -83,6 +83,9 @@ const AppContext = createContext();
 // Provider
 export function AppProvider({ children }) {
   const [state, dispatch] = useReducer(appReducer, initialState);
+  // Chave de idempotência da tentativa de checkout em curso: repetida nos
+  // reenvios (duplo clique, erro de rede) e trocada só após o sucesso
+  const checkoutKey = useRef(null);
 
   // Ações
   const actions = {
@@ -126,6 +129,7 @@ export function AppProvider({ children }) {
 
     logout: () => {
       apiService.removeToken();
+      checkoutKey.current = null;
       dispatch({ type: ActionTypes.LOGOUT });
     },
 
@@ -218,7 +222,11 @@ export function AppProvider({ children }) {
     createOrder: async (orderData) => {
       try {
         dispatch({ type: ActionTypes.SET_LOADING, payload: true });
-        const response = await apiService.createOrder(orderData);
+        if (!checkoutKey.current) {
+          checkoutKey.current = crypto.randomUUID();
+        }
+        const response = await apiService.createOrder(orderData, checkoutKey.current);
+        checkoutKey.current = null;
         dispatch({ type: ActionTypes.CLEAR_CART });
         return response;
       } catch (error) {
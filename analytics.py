@@ -0,0 +1,50 @@
+from src.models.user import db
+
+class SalesRollup(db.Model):
+    # Vendas de pedidos entregues por restaurante e hora (horário local,
+    # ver src.services.rollups)
+    __table_args__ = (
+        db.UniqueConstraint('restaurant_id', 'bucket', name='uq_sales_rollup_restaurant_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False)  # início da hora
+
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    items_sold = db.Column(db.Integer, nullable=False, default=0)
+
+class DailySalesRollup(db.Model):
+    # As mesmas vendas por dia: relatórios diários leem uma linha por dia
+    __table_args__ = (
+        db.UniqueConstraint('restaurant_id', 'day', name='uq_daily_sales_rollup_restaurant_day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+    items_sold = db.Column(db.Integer, nullable=False, default=0)
+
+class ProductSalesRollup(db.Model):
+    # Quantidade e faturamento por produto, restaurante e dia (horário local)
+    __table_args__ = (
+        db.UniqueConstraint('restaurant_id', 'day', 'product_id', name='uq_product_sales_rollup_restaurant_day_product'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+class RolledUpOrder(db.Model):
+    # Pedidos já somados às rollups: torna o processamento idempotente e
+    # permite que a carga histórica e a incremental rodem juntas
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), primary_key=True, autoincrement=False)
+    bucket = db.Column(db.DateTime, nullable=False)
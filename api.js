@@ -44,7 +44,9 @@ class ApiService {
       const data = await response.json();
 
       if (!response.ok) {
-        throw new Error(data.message || 'Erro na requisição');
+        const error = new Error(data.message || 'Erro na requisição');
+        error.status = response.status;
+        throw error;
       }
 
       return data;
@@ -84,17 +86,66 @@ class ApiService {
     return this.request(`/restaurants/${id}`);
   }
 
+  // Cardápio completo (restaurante, categorias e produtos) numa requisição
+  async getMenu(id) {
+    return this.request(`/restaurants/${id}/menu`);
+  }
+
+  // Restaurantes abertos agora (params: category_id, limit, offset)
+  async getOpenRestaurants(params = {}) {
+    const queryString = new URLSearchParams(params).toString();
+    return this.request(`/restaurants/open${queryString ? `?${queryString}` : ''}`);
+  }
+
+  // Horário de funcionamento: windows = [{ weekday: 0-6 (segunda a domingo), opens_at: 'HH:MM', closes_at: 'HH:MM' }]
+  async getOpeningHours(restaurantId) {
+    return this.request(`/restaurants/${restaurantId}/hours`);
+  }
+
+  async setOpeningHours(restaurantId, windows) {
+    return this.request(`/restaurants/${restaurantId}/hours`, {
+      method: 'PUT',
+      body: JSON.stringify({ windows }),
+    });
+  }
+
+  async setProductSchedule(restaurantId, productId, windows) {
+    return this.request(`/restaurants/${restaurantId}/products/${productId}/schedule`, {
+      method: 'PUT',
+      body: JSON.stringify({ windows }),
+    });
+  }
+
   async getCategories() {
     return this.request('/restaurants/categories');
   }
 
-  // Métodos do carrinho
+  // Busca no catálogo (restaurantes e produtos); prefix para autocompletar
+  async search(query, params = {}) {
+    const queryString = new URLSearchParams({ q: query, ...params }).toString();
+    return this.request(`/search?${queryString}`);
+  }
+
+  // Taxa e prazo de entrega de vários restaurantes para um endereço
+  async getDeliveryQuotes(restaurantIds, { addressId, latitude, longitude } = {}) {
+    return this.request('/restaurants/quotes', {
+      method: 'POST',
+      body: JSON.stringify({
+        restaurant_ids: restaurantIds,
+        address_id: addressId,
+        latitude,
+        longitude,
+      }),
+    });
+  }
+
+  // Métodos do carrinho (mantido no KV do servidor até o checkout)
   async getCart() {
-    return this.request('/orders/cart');
+    return this.request('/cart');
   }
 
   async addToCart(productId, quantity, notes = '') {
-    return this.request('/orders/cart/add', {
+    return this.request('/cart/add', {
       method: 'POST',
       body: JSON.stringify({
         product_id: productId,
@@ -105,21 +156,28 @@ class ApiService {
   }
 
   async removeFromCart(itemId) {
-    return this.request(`/orders/cart/remove/${itemId}`, {
+    return this.request(`/cart/remove/${itemId}`, {
       method: 'DELETE',
     });
   }
 
   async clearCart() {
-    return this.request('/orders/cart/clear', {
+    return this.request('/cart/clear', {
       method: 'DELETE',
     });
   }
 
   // Métodos de pedidos
-  async createOrder(orderData) {
-    return this.request('/orders', {
+  // Fecha o carrinho (guardado no KV do servidor) em pedido; reenvios com a
+  // mesma chave não geram um segundo pedido, então quem chama gera uma
+  // chave por tentativa de checkout e a repete nos reenvios (ver AppContext)
+  async createOrder(orderData, idempotencyKey) {
+    return this.request('/cart/checkout', {
       method: 'POST',
+      headers: {
+        ...this.getHeaders(),
+        ...(idempotencyKey ? { 'Idempotency-Key': idempotencyKey } : {}),
+      },
       body: JSON.stringify(orderData),
     });
   }
@@ -130,8 +188,21 @@ class ApiService {
     return this.request(endpoint);
   }
 
+  // Meus pedidos por cursor: params = { cursor, limit, fields, status }; a
+  // resposta traz next_cursor (null na última página)
+  async getMyOrders(params = {}) {
+    const queryString = new URLSearchParams(params).toString();
+    return this.request(`/orders/mine${queryString ? `?${queryString}` : ''}`);
+  }
+
+  // Pedidos antigos saem da tabela principal para o arquivo morto
   async getOrder(id) {
-    return this.request(`/orders/${id}`);
+    try {
+      return await this.request(`/orders/${id}`);
+    } catch (error) {
+      if (error.status !== 404) throw error;
+      return this.request(`/orders/archive/${id}`);
+    }
   }
 
   async updateOrderStatus(id, status) {
@@ -141,6 +212,49 @@ class ApiService {
     });
   }
 
+  // Painel do restaurante: pedidos abertos; com since, só o que mudou
+  async getOrderBoard(restaurantId, since) {
+    const queryString = since ? `?since=${encodeURIComponent(since)}` : '';
+    return this.request(`/restaurants/${restaurantId}/orders/board${queryString}`);
+  }
+
+  // Métodos do entregador
+  async updateCourier(data) {
+    return this.request('/couriers/me', {
+      method: 'PUT',
+      body: JSON.stringify(data),
+    });
+  }
+
+  async getAssignments() {
+    return this.request('/couriers/me/assignments');
+  }
+
+  // action: 'pickup' (retirado) ou 'deliver' (entregue)
+  async updateAssignment(orderId, action) {
+    return this.request(`/couriers/me/assignments/${orderId}/${action}`, {
+      method: 'POST',
+    });
+  }
+
+  // Relatórios do restaurante (params: from, to em AAAA-MM-DD; granularity: day ou hour)
+  async getSalesReport(restaurantId, params = {}) {
+    const queryString = new URLSearchParams(params).toString();
+    return this.request(`/restaurants/${restaurantId}/reports/sales${queryString ? `?${queryString}` : ''}`);
+  }
+
+  async getTopProducts(restaurantId, params = {}) {
+    const queryString = new URLSearchParams(params).toString();
+    return this.request(`/restaurants/${restaurantId}/reports/products${queryString ? `?${queryString}` : ''}`);
+  }
+
+  // Atualizações de status em tempo real (Server-Sent Events)
+  subscribeToOrders(onStatus) {
+    const source = new EventSource(`${API_BASE_URL}/orders/stream?token=${encodeURIComponent(this.token)}`);
+    source.addEventListener('order_status', (event) => onStatus(JSON.parse(event.data)));
+    return () => source.close();
+  }
+
   // Métodos de avaliações
   async createReview(orderId, reviewData) {
     return this.request(`/orders/${orderId}/review`, {
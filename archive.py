@@ -0,0 +1,219 @@
+import argparse
+import bisect
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from src.models.user import db
+from src.models.order import Order, OrderItem, Review
+from src.models.courier import DeliveryAssignment
+from src.models.analytics import RolledUpOrder
+from src.models.archive_segment import ArchiveSegment
+from src.models.rows import order_rows
+from src.services.cache import TTLCache
+from src.services.rollups import rollups
+
+ARCHIVED_STATUSES = ('delivered', 'cancelled')
+
+def _isoformat(value):
+    # Datas como em to_dict(); order_rows devolve datetimes
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+class OrderArchive:
+    # Particionamento quente/frio dos pedidos. Pedidos entregues ou
+    # cancelados há mais de `retention` saem de order/order_item (e das
+    # tabelas que apontam para eles) para segmentos .jsonl.gz no diretório
+    # do arquivo morto, registrados em archive_segment. As tabelas quentes,
+    # e os seus índices, ficam com o tamanho do movimento recente.
+    #
+    # Cada segmento tem até segment_size pedidos, gravados em blocos de
+    # block_size linhas JSON; cada bloco é um membro gzip próprio, então
+    # `zcat` lê o segmento inteiro e find() descomprime só um bloco.
+
+    def __init__(self, directory=None, retention=timedelta(days=90), segment_size=50000, block_size=256,
+                 max_age=60):
+        self.directory = directory
+        self.retention = retention
+        self.segment_size = segment_size
+        self.block_size = block_size
+        self.max_age = max_age
+        self.blocks = TTLCache(maxsize=256, ttl=600)
+        self._segments = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def init_app(self, app, default_directory):
+        # ARCHIVE_DIR e ARCHIVE_RETENTION_DAYS
+        self.directory = os.environ.get('ARCHIVE_DIR', default_directory)
+        self.retention = timedelta(days=int(os.environ.get('ARCHIVE_RETENTION_DAYS', self.retention.days)))
+
+    def _write_segment(self, records):
+        # Grava num arquivo temporário e renomeia: um segmento nunca fica pela metade
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"orders-{records[0]['id']}-{records[-1]['id']}-{int(time.time() * 1000)}.jsonl.gz"
+        path = os.path.join(self.directory, name)
+        blocks, offset = [], 0
+        with open(path + '.tmp', 'wb') as output:
+            for start in range(0, len(records), self.block_size):
+                block = records[start:start + self.block_size]
+                lines = ''.join(json.dumps(record, separators=(',', ':'), ensure_ascii=False, default=_isoformat)
+                                + '\n' for record in block)
+                data = gzip.compress(lines.encode('utf-8'), compresslevel=6)
+                output.write(data)
+                blocks.append([block[0]['id'], offset, len(data)])
+                offset += len(data)
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(path + '.tmp', path)
+        return name, blocks, offset
+
+    def _records(self, order_ids):
+        # Mesmo JSON de Order.to_dict(), mais a entrega e as avaliações do pedido
+        records = []
+        for start in range(0, len(order_ids), 1000):
+            chunk = order_ids[start:start + 1000]
+            records.extend(order_rows(Order.query.filter(Order.id.in_(chunk)), 1, len(chunk)))
+        assignments = {}
+        reviews = {}
+        for start in range(0, len(order_ids), 1000):
+            chunk = order_ids[start:start + 1000]
+            for assignment in DeliveryAssignment.query.filter(DeliveryAssignment.order_id.in_(chunk)):
+                assignments[assignment.order_id] = assignment.to_dict()
+            for review_id, order_id in db.session.query(Review.id, Review.order_id).filter(Review.order_id.in_(chunk)):
+                reviews.setdefault(order_id, []).append(review_id)
+        for record in records:
+            record['delivery_assignment'] = assignments.get(record['id'])
+            record['review_ids'] = reviews.get(record['id'], [])
+        records.sort(key=lambda record: record['id'])
+        return records
+
+    def _delete(self, order_ids):
+        for start in range(0, len(order_ids), 1000):
+            chunk = order_ids[start:start + 1000]
+            # Avaliações continuam, sem o vínculo com o pedido arquivado
+            (Review.query.filter(Review.order_id.in_(chunk))
+             .update({'order_id': None}, synchronize_session=False))
+            for model in (OrderItem, DeliveryAssignment, RolledUpOrder):
+                model.query.filter(model.order_id.in_(chunk)).delete(synchronize_session=False)
+            Order.query.filter(Order.id.in_(chunk)).delete(synchronize_session=False)
+
+    def archive(self, cutoff=None, limit=None, progress=None):
+        # Move os pedidos elegíveis, um segmento por transação. Se a
+        # transação falhar depois de o arquivo ser gravado, o arquivo fica
+        # órfão (sem linha em archive_segment) e é ignorado.
+        cutoff = cutoff or datetime.utcnow() - self.retention
+        archived = 0
+        while limit is None or archived < limit:
+            size = self.segment_size if limit is None else min(self.segment_size, limit - archived)
+            # Entregues que as rollups ainda não contaram (arquivo antes do
+            # backfill, entrega após o lookback) são somados antes de sair;
+            # os que continuarem fora delas ficam na tabela até a próxima vez
+            rollups.include(Order.created_at < cutoff, size)
+            rolled_up = db.session.query(RolledUpOrder.order_id).filter(RolledUpOrder.order_id == Order.id)
+            order_ids = [order_id for order_id, in
+                         db.session.query(Order.id)
+                         .filter(Order.status.in_(ARCHIVED_STATUSES), Order.created_at < cutoff,
+                                 or_(Order.status != 'delivered', rolled_up.exists()))
+                         .order_by(Order.id)
+                         .limit(size)]
+            if not order_ids:
+                break
+
+            records = self._records(order_ids)
+            name, blocks, size_bytes = self._write_segment(records)
+            created = [record['created_at'] for record in records if record['created_at']]
+            db.session.add(ArchiveSegment(
+                path=name,
+                first_order_id=records[0]['id'],
+                last_order_id=records[-1]['id'],
+                first_created_at=min(created) if created else None,
+                last_created_at=max(created) if created else None,
+                orders=len(records),
+                size_bytes=size_bytes,
+                blocks=json.dumps(blocks)
+            ))
+            try:
+                self._delete(order_ids)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            self.invalidate()
+            archived += len(records)
+            if progress:
+                progress(archived, name, size_bytes)
+        return archived
+
+    def invalidate(self):
+        self._segments = None
+
+    def _load_segments(self):
+        # Lista de segmentos (pequena) em memória; recarregada após max_age
+        # segundos para ver os segmentos criados por outros processos
+        with self._lock:
+            if self._segments is None or time.monotonic() - self._loaded_at >= self.max_age:
+                self._segments = [(first, last, path, json.loads(blocks)) for first, last, path, blocks in
+                                  db.session.query(ArchiveSegment.first_order_id, ArchiveSegment.last_order_id,
+                                                   ArchiveSegment.path, ArchiveSegment.blocks)]
+                self._loaded_at = time.monotonic()
+            return self._segments
+
+    def _read_block(self, path, offset, length):
+        key = (path, offset)
+        block = self.blocks.get(key)
+        if block is None:
+            with open(os.path.join(self.directory, path), 'rb') as source:
+                source.seek(offset)
+                data = gzip.decompress(source.read(length))
+            block = {}
+            for line in data.decode('utf-8').splitlines():
+                record = json.loads(line)
+                block[record['id']] = record
+            self.blocks.set(key, block)
+        return block
+
+    def find(self, order_id):
+        for first, last, path, blocks in self._load_segments():
+            if not first <= order_id <= last:
+                continue
+            index = bisect.bisect_right([block[0] for block in blocks], order_id) - 1
+            if index < 0:
+                continue
+            _, offset, length = blocks[index]
+            record = self._read_block(path, offset, length).get(order_id)
+            if record is not None:
+                return record
+        return None
+
+order_archive = OrderArchive()
+
+def find_order(order_id):
+    # Leitura transparente: tabela quente primeiro, depois o arquivo morto.
+    # Retorna (dados no formato de Order.to_dict(), arquivado?) ou (None, False).
+    order = Order.with_items().filter_by(id=order_id).first()
+    if order is not None:
+        return order.to_dict(), False
+    record = order_archive.find(order_id)
+    return (record, True) if record is not None else (None, False)
+
+if __name__ == '__main__':
+    # Rodar periodicamente (cron): python -m src.services.archive --days 90
+    from src.main import app
+
+    parser = argparse.ArgumentParser(description='Move pedidos antigos para o arquivo morto')
+    parser.add_argument('--days', type=int, default=None, help='idade mínima dos pedidos (padrão: ARCHIVE_RETENTION_DAYS)')
+    parser.add_argument('--limit', type=int, default=None, help='no máximo N pedidos nesta execução')
+    args = parser.parse_args()
+
+    with app.app_context():
+        cutoff = datetime.utcnow() - (timedelta(days=args.days) if args.days is not None else order_archive.retention)
+        started = time.perf_counter()
+        total = order_archive.archive(cutoff, args.limit,
+                                      lambda archived, name, size: print(f'{name}: {size / 1024:.0f} KiB, '
+                                                                         f'{archived} pedidos até agora'))
+        print(f'{total} pedidos arquivados em {time.perf_counter() - started:.1f}s (anteriores a {cutoff:%Y-%m-%d})')
@@ -0,0 +1,24 @@
+from src.models.user import db
+from datetime import datetime
+
+class ArchiveSegment(db.Model):
+    # Arquivo JSONL comprimido com pedidos antigos (ver src.services.archive).
+    # Cada bloco é um membro gzip independente com pedidos em ordem de id;
+    # blocks guarda [[primeiro id, offset, tamanho], ...] para ler só o
+    # bloco de um pedido.
+    __table_args__ = (
+        db.Index('ix_archive_segment_order_range', 'first_order_id', 'last_order_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(255), unique=True, nullable=False)  # relativo ao diretório do arquivo morto
+
+    first_order_id = db.Column(db.Integer, nullable=False)
+    last_order_id = db.Column(db.Integer, nullable=False)
+    first_created_at = db.Column(db.DateTime, nullable=True)
+    last_created_at = db.Column(db.DateTime, nullable=True)
+    orders = db.Column(db.Integer, nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    blocks = db.Column(db.Text, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
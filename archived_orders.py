@@ -0,0 +1,22 @@
+from flask import Blueprint, jsonify
+from src.models.restaurant import Restaurant
+from src.routes.auth import token_required
+from src.services.archive import find_order
+
+archived_orders_bp = Blueprint('archived_orders', __name__)
+
+@archived_orders_bp.route('/archive/<int:order_id>', methods=['GET'])
+@token_required
+def get_archived_order(current_user, order_id):
+    # Pedido pelo id, esteja na tabela quente ou no arquivo morto; usado
+    # pelo getOrder do frontend quando /orders/<id> responde 404
+    order, archived = find_order(order_id)
+    if order is None:
+        return jsonify({'message': 'Order not found'}), 404
+
+    if order['user_id'] != current_user.id and current_user.user_type != 'admin':
+        owner_id = Restaurant.query.with_entities(Restaurant.owner_id).filter_by(id=order['restaurant_id']).scalar()
+        if owner_id != current_user.id:
+            return jsonify({'message': 'Access denied'}), 403
+
+    return jsonify({'order': order, 'archived': archived}), 200
@@ -1,31 +1,91 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
 from src.models.user import db, User
+from src.services.cache import TTLCache
+from src.services.passwords import HashingBusy, hash_password, needs_rehash, verify_password
+from src.services.ratelimit import RateLimiter
 import jwt
 import datetime
+import time
+import uuid
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
 
+# Tentativas de login por usuário (por processo): 5 seguidas, depois 5/min
+login_limiter = RateLimiter(capacity=5, rate=5 / 60)
+
+def _busy_response():
+    return jsonify({'message': 'Server is busy, please try again'}), 503, {'Retry-After': '1'}
+
+# Cache (por processo) dos usuários já resolvidos, indexado pelo ID do token.
+# O TTL limita a defasagem entre workers, já que a invalidação é local.
+principal_cache = TTLCache(maxsize=10000, ttl=60)
+
+def _principal_key(data, token):
+    # Tokens emitidos antes do 'jti' usam o próprio token como chave
+    return data.get('jti') or token
+
+def _detached_copy(user):
+    # Cópia desanexada da sessão, com os valores das colunas já carregados
+    values = {attr.key: getattr(user, attr.key) for attr in User.__mapper__.column_attrs}
+    snapshot = User(**values)
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+def load_principal(data, token):
+    key = _principal_key(data, token)
+    snapshot = principal_cache.get(key)
+    if snapshot is not None:
+        # Reanexa à sessão atual sem emitir SELECT
+        return db.session.merge(snapshot, load=False)
+
+    user = User.query.get(data['user_id'])
+    if user:
+        ttl = principal_cache.ttl
+        if data.get('exp'):
+            ttl = min(ttl, data['exp'] - time.time())
+        principal_cache.set(key, _detached_copy(user), ttl=ttl)
+    return user
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_principal(mapper, connection, target):
+    # Desativação, troca de user_type ou qualquer alteração do usuário
+    principal_cache.discard_where(lambda key, user: user.id == target.id)
+
+def _authenticate(f, token, args, kwargs):
+    if not token:
+        return jsonify({'message': 'Token is missing'}), 401
+    
+    try:
+        if token.startswith('Bearer '):
+            token = token[7:]
+        data = jwt.decode(token, 'asdf#FGSgvasgf$5$WGT', algorithms=['HS256'])
+        current_user = load_principal(data, token)
+        if not current_user:
+            return jsonify({'message': 'User not found'}), 401
+    except jwt.ExpiredSignatureError:
+        return jsonify({'message': 'Token has expired'}), 401
+    except jwt.InvalidTokenError:
+        return jsonify({'message': 'Token is invalid'}), 401
+    
+    return f(current_user, *args, **kwargs)
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        
-        try:
-            if token.startswith('Bearer '):
-                token = token[7:]
-            data = jwt.decode(token, 'asdf#FGSgvasgf$5$WGT', algorithms=['HS256'])
-            current_user = User.query.get(data['user_id'])
-            if not current_user:
-                return jsonify({'message': 'User not found'}), 401
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Token is invalid'}), 401
-        
-        return f(current_user, *args, **kwargs)
+        return _authenticate(f, request.headers.get('Authorization'), args, kwargs)
+    return decorated
+
+def stream_token_required(f):
+    # Só para streams: EventSource não envia cabeçalhos, então o token
+    # também é aceito em ?token=. Fica fora das demais rotas porque a URL
+    # vai para logs de acesso, histórico e Referer.
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        return _authenticate(f, request.headers.get('Authorization') or request.args.get('token'), args, kwargs)
     return decorated
 
 @auth_bp.route('/register', methods=['POST'])
@@ -52,7 +112,7 @@ def register():
             full_name=data.get('full_name'),
             user_type=data.get('user_type', 'customer')
         )
-        user.set_password(data['password'])
+        user.password_hash = hash_password(data['password'])
         
         db.session.add(user)
         db.session.commit()
@@ -62,6 +122,9 @@ def register():
             'user': user.to_dict()
         }), 201
         
+    except HashingBusy:
+        db.session.rollback()
+        return _busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Error creating user: {str(e)}'}), 500
@@ -74,20 +137,31 @@ def login():
         if not data.get('username') or not data.get('password'):
             return jsonify({'message': 'Username and password are required'}), 400
         
+        if not login_limiter.allow(data['username'].lower()):
+            return jsonify({'message': 'Too many login attempts, please try again later'}), 429
+        
         # Buscar usuário por username ou email
         user = User.query.filter(
             (User.username == data['username']) | (User.email == data['username'])
         ).first()
         
-        if not user or not user.check_password(data['password']):
+        if not user or not verify_password(user.password_hash, data['password']):
             return jsonify({'message': 'Invalid credentials'}), 401
         
         if not user.is_active:
             return jsonify({'message': 'Account is deactivated'}), 401
         
+        login_limiter.reset(data['username'].lower())
+        
+        # Migrar o hash para o esquema configurado, se necessário
+        if needs_rehash(user.password_hash):
+            user.password_hash = hash_password(data['password'])
+            db.session.commit()
+        
         # Gerar token JWT
         token = jwt.encode({
             'user_id': user.id,
+            'jti': uuid.uuid4().hex,
             'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7)
         }, 'asdf#FGSgvasgf$5$WGT', algorithm='HS256')
         
@@ -97,6 +171,8 @@ def login():
             'user': user.to_dict()
         }), 200
         
+    except HashingBusy:
+        return _busy_response()
     except Exception as e:
         return jsonify({'message': f'Login error: {str(e)}'}), 500
 
@@ -111,6 +187,7 @@ def refresh_token(current_user):
     # Gerar novo token
     token = jwt.encode({
         'user_id': current_user.id,
+        'jti': uuid.uuid4().hex,
         'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7)
     }, 'asdf#FGSgvasgf$5$WGT', algorithm='HS256')
     
@@ -0,0 +1,384 @@
+import argparse
+import bisect
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import select, update
+from src.models.events import Change, on_commit, publish
+from src.models.user import db
+from src.models.restaurant import Restaurant, Product
+from src.models.schedule import OpeningHours, ProductSchedule
+
+logger = logging.getLogger(__name__)
+
+DAY = 24 * 60
+WEEK = 7 * DAY
+NO_KEYS = np.zeros(0, dtype=np.int64)
+
+def minute_of_week(moment):
+    return moment.weekday() * DAY + moment.hour * 60 + moment.minute
+
+class WeeklyWindows:
+    # Janelas semanais de um conjunto de chaves (ids de restaurantes ou de
+    # produtos), pré-calculadas em minutos da semana: os intervalos unidos
+    # de cada chave e, para cada fronteira, as chaves que abrem e as que
+    # fecham nela. Uma chave que fecha e reabre no mesmo minuto não gera
+    # evento. A montagem é vetorizada.
+
+    def __init__(self, rows):
+        # rows: (chave, weekday, opens_at, closes_at)
+        keys = np.array([row[0] for row in rows], dtype=np.int64)
+        weekdays = np.array([row[1] for row in rows], dtype=np.int64)
+        opens = np.array([row[2].hour * 60 + row[2].minute for row in rows], dtype=np.int64)
+        closes = np.array([row[3].hour * 60 + row[3].minute for row in rows], dtype=np.int64)
+
+        # [início, fim) em minutos da semana; closes_at <= opens_at atravessa
+        # a meia-noite e a janela que passa de domingo para segunda é
+        # dividida em duas
+        starts = weekdays * DAY + opens
+        ends = starts + ((closes - opens) % DAY)
+        ends[ends == starts] += DAY
+        wraps = ends > WEEK
+        keys = np.concatenate([keys, keys[wraps]])
+        starts = np.concatenate([starts, np.zeros(wraps.sum(), dtype=np.int64)])
+        ends = np.concatenate([np.minimum(ends, WEEK), ends[wraps] - WEEK])
+
+        # Une as janelas sobrepostas ou encostadas de cada chave: com as
+        # chaves deslocadas para faixas disjuntas, o máximo acumulado dos
+        # fins separa os grupos
+        order = np.lexsort((starts, keys))
+        keys, starts, ends = keys[order], starts[order], ends[order]
+        offset = keys * (2 * WEEK)
+        reach = np.maximum.accumulate(ends + offset)
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = starts[1:] + offset[1:] > reach[:-1]
+        groups = np.flatnonzero(first)
+        self._keys = keys[groups]
+        self._starts = starts[groups]
+        self._ends = (np.maximum.reduceat(ends + offset, groups) - offset[groups]) if len(groups) else ends[groups]
+        self.keys = np.unique(self._keys)
+
+        # Eventos por minuto: +1 abre, -1 fecha; abrir e fechar no mesmo
+        # minuto (fim de domingo e início de segunda) se anulam
+        minutes = np.concatenate([self._starts, self._ends % WEEK])
+        event_keys = np.concatenate([self._keys, self._keys])
+        signs = np.concatenate([np.ones(len(self._keys), dtype=np.int64), -np.ones(len(self._keys), dtype=np.int64)])
+        base = int(self.keys.max(initial=0)) + 1
+        codes, inverse = np.unique(minutes * base + event_keys, return_inverse=True)
+        net = np.bincount(inverse.reshape(-1), weights=signs, minlength=len(codes))
+        codes, net = codes[net != 0], net[net != 0]
+        event_minutes, event_keys = codes // base, codes % base
+        self.boundaries = np.unique(event_minutes).tolist()
+        splits = np.searchsorted(event_minutes, self.boundaries + [WEEK])
+        self._events = {}
+        for index, minute in enumerate(self.boundaries):
+            chunk = slice(splits[index], splits[index + 1])
+            self._events[minute] = (event_keys[chunk][net[chunk] > 0], event_keys[chunk][net[chunk] < 0])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def open_at(self, moment):
+        # Chaves dentro de alguma janela no instante (horário local)
+        minute = minute_of_week(moment)
+        return np.unique(self._keys[(self._starts <= minute) & (minute < self._ends)])
+
+    def next_boundary(self, moment):
+        # Próxima fronteira estritamente depois de moment, ou None
+        if not self.boundaries:
+            return None
+        base = moment.replace(second=0, microsecond=0)
+        minute = minute_of_week(base)
+        index = bisect.bisect_right(self.boundaries, minute)
+        if index < len(self.boundaries):
+            return base + timedelta(minutes=self.boundaries[index] - minute)
+        return base + timedelta(minutes=self.boundaries[0] + WEEK - minute)
+
+    def due(self, since, until):
+        # (instante, abrem, fecham) de cada fronteira em (since, until]
+        moment = self.next_boundary(since)
+        while moment is not None and moment <= until:
+            opens, closes = self._events[minute_of_week(moment)]
+            yield moment, opens, closes
+            moment = self.next_boundary(moment)
+
+def _load_windows(model, key):
+    # Pelo Core: sem a camada de carregamento do ORM para cada janela
+    return WeeklyWindows(db.session.connection().execute(
+        select(key, model.weekday, model.opens_at, model.closes_at)).all())
+
+class Availability:
+    # Restaurantes abertos agora, em memória: vetores booleanos indexados
+    # pelo id (ativo, online e aberto = ativo & online) e os ids de cada
+    # categoria, em ordem. "Está aberto?" é uma leitura no vetor e a
+    # listagem de uma categoria só olha os restaurantes dela.
+    #
+    # Nas fronteiras do horário de funcionamento cada processo liga e
+    # desliga o online localmente, como o agendador faz no banco; mudanças
+    # manuais chegam pelos commits deste processo e, dos outros, pela
+    # recarga a cada max_age segundos. As janelas, que mudam pouco, são
+    # relidas a cada hours_max_age segundos ou quando mudam neste processo.
+
+    def __init__(self, utc_offset_hours=-3, max_age=60, hours_max_age=600):
+        self.utc_offset_hours = utc_offset_hours
+        self.max_age = max_age
+        self.hours_max_age = hours_max_age
+        self.hours = None
+        self.hours_loaded_at = None
+        self.active = np.zeros(0, dtype=bool)
+        self.online = np.zeros(0, dtype=bool)
+        self.open = np.zeros(0, dtype=bool)
+        self.categories = {}
+        self.loaded_at = None
+        self._checked_at = None
+        self._next_at = None
+        self._lock = threading.Lock()
+
+    def local_now(self):
+        return datetime.utcnow() + timedelta(hours=self.utc_offset_hours)
+
+    def load(self):
+        rows = db.session.query(Restaurant.id, Restaurant.category_id, Restaurant.is_active,
+                                Restaurant.is_online).all()
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        size = int(ids.max()) + 1 if len(ids) else 0
+        active = np.zeros(size, dtype=bool)
+        online = np.zeros(size, dtype=bool)
+        active[ids] = [bool(row[2]) for row in rows]
+        online[ids] = [bool(row[3]) for row in rows]
+
+        # Ids de cada categoria (sem categoria: -1), ordenados
+        category_ids = np.array([row[1] if row[1] is not None else -1 for row in rows], dtype=np.int64)
+        order = np.lexsort((ids, category_ids))
+        unique, starts = np.unique(category_ids[order], return_index=True)
+        categories = dict(zip(unique.tolist(), np.split(ids[order], starts[1:])))
+
+        if self.hours_loaded_at is None or time.monotonic() - self.hours_loaded_at >= self.hours_max_age:
+            self.hours = _load_windows(OpeningHours, OpeningHours.restaurant_id)
+            self.hours_loaded_at = time.monotonic()
+        self.active, self.online, self.open = active, online, active & online
+        self.categories = categories
+        self._checked_at = self.local_now()
+        self._next_at = self.hours.next_boundary(self._checked_at)
+        self.loaded_at = time.monotonic()
+
+    def invalidate(self, hours=False):
+        if hours:
+            self.hours_loaded_at = None
+        self.loaded_at = None
+
+    def _advance(self, now):
+        changed = False
+        for _, opens, closes in self.hours.due(self._checked_at, now):
+            self.online[opens[opens < len(self.online)]] = True
+            self.online[closes[closes < len(self.online)]] = False
+            changed = True
+        if changed:
+            self.open = self.active & self.online
+        self._checked_at = now
+        self._next_at = self.hours.next_boundary(now)
+
+    def ensure_fresh(self):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.max_age:
+            if self._next_at is None or self.local_now() < self._next_at:
+                return
+        with self._lock:
+            if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.max_age:
+                self.load()
+            elif self._next_at is not None and self.local_now() >= self._next_at:
+                self._advance(self.local_now())
+
+    def apply(self, values, deleted=False):
+        if self.loaded_at is None:
+            return
+        restaurant_id = values['id']
+        if restaurant_id >= len(self.open):
+            # Restaurante novo: recarrega na próxima leitura
+            self.invalidate()
+            return
+        with self._lock:
+            self.active[restaurant_id] = not deleted and bool(values.get('is_active'))
+            self.online[restaurant_id] = not deleted and bool(values.get('is_online'))
+            self.open[restaurant_id] = self.active[restaurant_id] and self.online[restaurant_id]
+
+    def is_open(self, restaurant_id):
+        self.ensure_fresh()
+        return 0 <= restaurant_id < len(self.open) and bool(self.open[restaurant_id])
+
+    def open_ids(self, category_id=None):
+        # Ids dos restaurantes abertos agora (de uma categoria), em ordem
+        self.ensure_fresh()
+        if category_id is None:
+            return np.flatnonzero(self.open)
+        ids = self.categories.get(category_id, NO_KEYS)
+        return ids[self.open[ids]]
+
+class AvailabilityScheduler:
+    # Liga e desliga Restaurant.is_online e Product.is_available nas
+    # fronteiras das janelas, em lote: uma transação por rodada, só com as
+    # linhas que mudam de estado. O UPDATE é feito pelo Core e as mudanças
+    # são publicadas aos hooks de commit (cache do catálogo, cardápios,
+    # carrinhos, bitmap) como se viessem do ORM.
+    # Basta um processo (SCHEDULER_ENABLED=1 em um único worker ou
+    # python -m src.services.availability); com mais de um, o segundo não
+    # encontra nada para mudar.
+    #
+    # Fora das fronteiras o dono pode pausar o restaurante ou o produto à
+    # mão; o estado volta a seguir a janela na fronteira seguinte.
+
+    def __init__(self, availability, interval=60.0, max_age=300):
+        self.availability = availability
+        self.interval = interval
+        self.max_age = max_age
+        self.hours = None
+        self.products = None
+        self.loaded_at = None
+        self._checked_at = None
+        self._thread = None
+        self._wake = threading.Event()
+
+    def wake(self):
+        # Janelas cadastradas ou alteradas neste processo
+        self.loaded_at = None
+        self._wake.set()
+
+    def start(self, app):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, args=(app,), name='availability-scheduler', daemon=True)
+        self._thread.start()
+
+    def _next_at(self):
+        moments = [windows.next_boundary(self._checked_at) for windows in (self.hours, self.products)
+                   if windows is not None and self._checked_at is not None]
+        moments = [moment for moment in moments if moment is not None]
+        return min(moments) if moments else None
+
+    def _loop(self, app):
+        while True:
+            try:
+                with app.app_context():
+                    self.run_once()
+            except Exception:
+                logger.exception('Availability round failed')
+            # Dorme até a próxima fronteira (no máximo interval segundos)
+            timeout = self.interval
+            next_at = self._next_at()
+            if next_at is not None:
+                timeout = min(timeout, max((next_at - self.availability.local_now()).total_seconds(), 0) + 0.5)
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def load(self):
+        self.hours = _load_windows(OpeningHours, OpeningHours.restaurant_id)
+        self.products = _load_windows(ProductSchedule, ProductSchedule.product_id)
+        self.loaded_at = time.monotonic()
+
+    @staticmethod
+    def _flip(model, column, ids, value, returning):
+        # UPDATE em lotes de 1000 ids, só nas linhas que mudam de estado;
+        # devolve as Changes para os hooks de commit
+        changes = []
+        ids = [int(key) for key in ids]
+        for start in range(0, len(ids), 1000):
+            chunk = ids[start:start + 1000]
+            rows = db.session.execute(update(model)
+                                      .where(model.id.in_(chunk), (column != value) | column.is_(None))
+                                      .values({column.key: value})
+                                      .returning(*returning)
+                                      .execution_options(synchronize_session=False))
+            changes.extend(Change('update', model, dict(row._mapping, **{column.key: value}), {column.key})
+                           for row in rows)
+        return changes
+
+    def _states(self, windows, now):
+        # Estado de cada chave após as fronteiras vencidas desde a última
+        # rodada; após uma semana parada, o estado de todas pelas janelas
+        if now - self._checked_at >= timedelta(days=7):
+            opened = windows.open_at(now)
+            return opened, np.setdiff1d(windows.keys, opened)
+        states = {}
+        for _, opens, closes in windows.due(self._checked_at, now):
+            states.update(dict.fromkeys(opens.tolist(), True))
+            states.update(dict.fromkeys(closes.tolist(), False))
+        return ([key for key, state in states.items() if state],
+                [key for key, state in states.items() if not state])
+
+    def run_once(self, now=None):
+        # Na primeira rodada (processo novo) todas as chaves com janela
+        # voltam ao estado da janela: fronteiras perdidas enquanto estava parado
+        now = now or self.availability.local_now()
+        if self.loaded_at is None or time.monotonic() - self.loaded_at >= self.max_age:
+            self.load()
+        first = self._checked_at is None
+        if first:
+            self._checked_at = now - timedelta(days=7)
+
+        started = time.perf_counter()
+        stats, changes = {}, []
+        try:
+            for name, windows, model, column, returning in (
+                    ('restaurants', self.hours, Restaurant, Restaurant.is_online, (Restaurant.id, Restaurant.is_active)),
+                    ('products', self.products, Product, Product.is_available, (Product.id, Product.restaurant_id))):
+                opened, closed = self._states(windows, now)
+                opened = self._flip(model, column, opened, True, returning)
+                closed = self._flip(model, column, closed, False, returning)
+                stats[name] = (len(opened), len(closed))
+                changes.extend(opened + closed)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self._checked_at = now
+        if changes:
+            publish(changes)
+        stats['seconds'] = time.perf_counter() - started
+        return stats
+
+availability = Availability(utc_offset_hours=int(os.environ.get('SCHEDULE_UTC_OFFSET', -3)))
+scheduler = AvailabilityScheduler(availability, interval=float(os.environ.get('SCHEDULER_INTERVAL', 60.0)))
+
+@on_commit(Restaurant)
+def _update_availability(changes):
+    for change in changes:
+        if change.op == 'update' and not change.changed & {'is_active', 'is_online', 'category_id'}:
+            continue
+        required = {'id'} if change.op == 'delete' else {'id', 'is_active', 'is_online'}
+        if 'category_id' in change.changed or not required <= change.values.keys():
+            # Restaurante novo, de outra categoria ou com atributos expirados
+            availability.invalidate()
+            continue
+        availability.apply(change.values, deleted=change.op == 'delete')
+
+@on_commit(OpeningHours, ProductSchedule)
+def _reload_windows(changes):
+    if any(change.model is OpeningHours for change in changes):
+        availability.invalidate(hours=True)
+    scheduler.wake()
+
+if __name__ == '__main__':
+    # Agendador dedicado: python -m src.services.availability
+    from src.main import app
+
+    parser = argparse.ArgumentParser(description='Liga e desliga restaurantes e produtos pelas janelas de horário')
+    parser.add_argument('--once', action='store_true', help='executa uma rodada e sai')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        while True:
+            stats = scheduler.run_once()
+            if any(sum(stats[name]) for name in ('restaurants', 'products')) or args.once:
+                print(f"restaurantes: {stats['restaurants'][0]} abertos, {stats['restaurants'][1]} fechados; "
+                      f"produtos: {stats['products'][0]} disponíveis, {stats['products'][1]} indisponíveis "
+                      f"em {stats['seconds'] * 1000:.0f} ms")
+            if args.once:
+                break
+            next_at = scheduler._next_at()
+            timeout = scheduler.interval
+            if next_at is not None:
+                timeout = min(timeout, max((next_at - availability.local_now()).total_seconds(), 0) + 0.5)
+            time.sleep(timeout)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import json
+import math
+import random
+import sys
+import os
+import threading
+import time
+import uuid
+sys.path.insert(0, os.path.dirname(__file__))
+
+import jwt
+from src.models.user import User
+from src.models.restaurant import Restaurant, Product
+from src.models.order import Order
+from src.main import app
+
+DEFAULT_MIX = 'browse=70,cart=15,checkout=5,status=5,review=5'
+SEARCH_TERMS = ['pizza', 'acai', 'hamb', 'sushi', 'lasanha', 'cox', 'pastel', 'feijoada']
+ADDRESS = {'street': 'Rua Bench', 'number': '1', 'neighborhood': 'Centro', 'city': 'São Paulo',
+           'state': 'SP', 'zip_code': '00000-000'}
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, elapsed, ok):
+        with self._lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, wall_seconds):
+        report = {}
+        for name, values in sorted(self.samples.items()):
+            values.sort()
+            report[name] = {
+                'requests': len(values),
+                'errors': self.errors.get(name, 0),
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p95_ms': percentile(values, 0.95) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+                'throughput_rps': len(values) / wall_seconds
+            }
+        return report
+
+class Fixtures:
+    # Amostras do banco (gerado por bench_data.py) usadas pelos cenários
+    def __init__(self, sample_size=2000):
+        rng = random.Random(7)
+        self.customers = [id for id, in User.query.with_entities(User.id)
+                          .filter_by(user_type='customer').limit(sample_size)]
+        restaurants = (Restaurant.query
+                       .with_entities(Restaurant.id, Restaurant.latitude, Restaurant.longitude,
+                                      Restaurant.minimum_order)
+                       .filter_by(is_active=True, is_online=True).limit(sample_size).all())
+        self.restaurants = [(id, lat, lng) for id, lat, lng, _ in restaurants]
+        self.minimum_orders = {id: minimum_order or 0.0 for id, _, _, minimum_order in restaurants}
+        # Produtos que podem ir ao carrinho, com o preço: restaurante -> [(id, preço)]
+        self.products = {}
+        for product_id, restaurant_id, price in (Product.query
+                                                 .with_entities(Product.id, Product.restaurant_id, Product.price)
+                                                 .filter(Product.restaurant_id.in_(list(self.minimum_orders)[:200]),
+                                                         Product.is_active.is_(True),
+                                                         Product.is_available.is_(True))):
+            self.products.setdefault(restaurant_id, []).append((product_id, price))
+        self.open_orders = (Order.query.with_entities(Order.id, Order.restaurant_id, Restaurant.owner_id)
+                            .join(Restaurant, Restaurant.id == Order.restaurant_id)
+                            .filter(Order.status == 'pending').limit(sample_size).all())
+        self.delivered_orders = (Order.query.with_entities(Order.id, Order.user_id)
+                                 .filter(Order.status == 'delivered').limit(sample_size).all())
+        rng.shuffle(self.delivered_orders)
+        if not self.customers or not self.restaurants or not self.products:
+            raise SystemExit('Banco sem dados: execute bench_data.py antes')
+
+def token_for(user_id):
+    # Tokens emitidos direto: o benchmark não mede o custo do login
+    return jwt.encode({
+        'user_id': user_id,
+        'jti': uuid.uuid4().hex,
+        'exp': datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+    }, app.config['SECRET_KEY'], algorithm='HS256')
+
+class Session:
+    def __init__(self, recorder, fixtures, rng):
+        self.client = app.test_client()
+        self.recorder = recorder
+        self.fixtures = fixtures
+        self.rng = rng
+        self.customer_id = rng.choice(fixtures.customers)
+        self.token = token_for(self.customer_id)
+        # Um restaurante por sessão: o carrinho só aceita itens de um
+        # restaurante, e o que sobrou de outra execução é descartado
+        self.restaurant_id = rng.choice(list(fixtures.products))
+        self.client.delete('/api/cart/clear', headers={'Authorization': f'Bearer {self.token}'})
+
+    def call(self, name, method, path, token=None, **kwargs):
+        headers = kwargs.pop('headers', {})
+        headers['Authorization'] = f'Bearer {token or self.token}'
+        started = time.perf_counter()
+        response = self.client.open(path, method=method, headers=headers, **kwargs)
+        elapsed = time.perf_counter() - started
+        self.recorder.add(name, elapsed, response.status_code < 400)
+        return response
+
+def browse(session):
+    restaurant_id, lat, lng = session.rng.choice(session.fixtures.restaurants)
+    session.call('GET /api/restaurants/categories', 'GET', '/api/restaurants/categories')
+    session.call('GET /api/restaurants', 'GET', '/api/restaurants')
+    session.call('GET /api/restaurants/<id>', 'GET', f'/api/restaurants/{restaurant_id}')
+    session.call('GET /api/search', 'GET', f'/api/search?q={session.rng.choice(SEARCH_TERMS)}&prefix=1')
+    if lat is not None:
+        session.call('GET /api/restaurants/nearby', 'GET', f'/api/restaurants/nearby?lat={lat}&lng={lng}')
+
+def add_to_cart(session, minimum=0.0):
+    # Até dois produtos do restaurante da sessão, na quantidade que leva o
+    # carrinho ao pedido mínimo (minimum)
+    products = session.fixtures.products[session.restaurant_id]
+    chosen = session.rng.sample(products, min(2, len(products)))
+    quantity = min(99, max(1, math.ceil(minimum / (sum(price for _, price in chosen) or 1))))
+    for product_id, _ in chosen:
+        session.call('POST /api/cart/add', 'POST', '/api/cart/add',
+                     json={'product_id': product_id, 'quantity': quantity})
+    session.call('GET /api/cart', 'GET', '/api/cart')
+
+def checkout(session):
+    add_to_cart(session, session.fixtures.minimum_orders[session.restaurant_id])
+    session.call('POST /api/cart/checkout', 'POST', '/api/cart/checkout',
+                 headers={'Idempotency-Key': uuid.uuid4().hex},
+                 json={'delivery_address': ADDRESS, 'payment_method': 'pix'})
+    session.call('GET /api/orders/mine', 'GET', '/api/orders/mine')
+
+def update_status(session):
+    if not session.fixtures.open_orders:
+        return
+    order_id, _, owner_id = session.rng.choice(session.fixtures.open_orders)
+    session.call('PUT /api/orders/<id>/status', 'PUT', f'/api/orders/{order_id}/status',
+                 token=token_for(owner_id), json={'status': 'confirmed'})
+
+def review(session):
+    try:
+        order_id, user_id = session.fixtures.delivered_orders.pop()
+    except IndexError:
+        return
+    session.call('POST /api/orders/<id>/review', 'POST', f'/api/orders/{order_id}/review',
+                 token=token_for(user_id), json={'rating': session.rng.randint(1, 5)})
+
+SCENARIOS = {
+    'browse': browse,
+    'cart': add_to_cart,
+    'checkout': checkout,
+    'status': update_status,
+    'review': review,
+}
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, weight = part.split('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f'Cenário desconhecido: {name}')
+        mix[name] = float(weight)
+    return mix
+
+def run(mix, threads, duration, seed):
+    recorder = Recorder()
+    with app.app_context():
+        fixtures = Fixtures()
+
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        session = Session(recorder, fixtures, rng)
+        while time.perf_counter() < deadline:
+            SCENARIOS[rng.choices(names, weights)[0]](session)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return recorder.report(time.perf_counter() - started)
+
+def print_report(report):
+    print(f"{'endpoint':<34} {'req':>7} {'erros':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8}")
+    for name, row in report.items():
+        print(f"{name:<34} {row['requests']:>7} {row['errors']:>6} {row['p50_ms']:>8.2f} "
+              f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['throughput_rps']:>8.1f}")
+
+def regressions(report, baseline, tolerance):
+    found = []
+    for name, row in report.items():
+        previous = baseline.get(name)
+        if previous and row['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            found.append(f"{name}: p95 {previous['p95_ms']:.2f} -> {row['p95_ms']:.2f} ms")
+    return found
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark dos cenários da API sobre src.main.app')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'pesos dos cenários (padrão: {DEFAULT_MIX})')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30, help='segundos')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='grava o relatório em JSON')
+    parser.add_argument('--baseline', help='relatório JSON anterior para comparação')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='aumento máximo aceito do p95 em relação ao baseline (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    report = run(parse_mix(args.mix), args.threads, args.duration, args.seed)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            found = regressions(report, json.load(baseline), args.tolerance)
+        if found:
+            print('\nRegressões:\n  ' + '\n  '.join(found))
+            sys.exit(1)
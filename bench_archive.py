@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Banco e arquivo morto próprios, num diretório temporário
+directory = tempfile.mkdtemp(prefix='bench_archive_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(directory, 'app.db')
+os.environ['ARCHIVE_DIR'] = os.path.join(directory, 'archive')
+
+from sqlalchemy import event, text
+from src.main import app
+from src.models.user import db
+from src.models.order import Order, OrderItem
+from src.services.archive import order_archive, find_order
+from bench_data import generate, insert_batches, sqlite_load_pragmas
+
+OPEN_STATUSES = ['pending', 'confirmed', 'preparing', 'ready', 'delivering']
+
+def timed(function, arguments):
+    timings = []
+    for argument in arguments:
+        started = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+def grow(rng, first_id, count, start, days, restaurants, users, owners, products_per_restaurant):
+    # `days` dias de movimento: só as últimas horas ainda têm pedidos abertos
+    orders, items = [], []
+    end = start + timedelta(days=days)
+    for i in range(first_id, first_id + count):
+        created_at = start + timedelta(seconds=rng.randint(0, days * 86400 - 1))
+        if end - created_at < timedelta(hours=3):
+            status = rng.choice(OPEN_STATUSES)
+        else:
+            status = 'cancelled' if rng.random() < 0.1 else 'delivered'
+        restaurant_id = rng.randint(1, restaurants)
+        subtotal = 0.0
+        for _ in range(rng.randint(1, 4)):
+            product_id = (restaurant_id - 1) * products_per_restaurant + rng.randint(1, products_per_restaurant)
+            quantity = rng.randint(1, 3)
+            subtotal += 10.0 * quantity
+            items.append({'order_id': i, 'product_id': product_id, 'quantity': quantity,
+                          'unit_price': 10.0, 'total_price': 10.0 * quantity})
+        orders.append({'id': i, 'order_number': f'A{i}', 'user_id': owners + rng.randint(1, users),
+                       'restaurant_id': restaurant_id, 'status': status, 'subtotal': subtotal,
+                       'delivery_fee': 5.0, 'total': subtotal + 5.0, 'delivery_street': 'Rua Bench',
+                       'delivery_number': '1', 'delivery_neighborhood': 'Centro',
+                       'delivery_city': 'São Paulo', 'delivery_state': 'SP',
+                       'delivery_zip_code': '00000-000', 'payment_method': 'pix',
+                       'payment_status': 'paid', 'created_at': created_at,
+                       'delivered_at': created_at + timedelta(minutes=40) if status == 'delivered' else None})
+    insert_batches(Order, orders)
+    insert_batches(OrderItem, items)
+    return end
+
+def live_size():
+    # Bytes ocupados nas páginas das tabelas quentes e dos seus índices
+    # (SQLite: dbstat). O espaço liberado pelo arquivo é reaproveitado pelas
+    # próximas inserções, então conta o ocupado e não o alocado.
+    rows = db.session.execute(text(
+        "SELECT m.tbl_name, m.type, SUM(s.pgsize - s.unused) FROM dbstat s JOIN sqlite_master m ON m.name = s.name "
+        "WHERE m.tbl_name IN ('order', 'order_item') GROUP BY m.tbl_name, m.type")).all()
+    tables = sum(size for _, kind, size in rows if kind == 'table')
+    indexes = sum(size for _, kind, size in rows if kind == 'index')
+    return tables / 2 ** 20, indexes / 2 ** 20
+
+def hot_queries(rng, restaurants, users, owners, recent_ids, repeat):
+    # O que o movimento do dia consulta: painel do restaurante, histórico do
+    # cliente (primeira página) e detalhe de um pedido recente
+    board = timed(lambda restaurant_id: Order.query.filter(Order.restaurant_id == restaurant_id,
+                                                           Order.status.in_(OPEN_STATUSES))
+                  .order_by(Order.created_at.desc()).all(),
+                  [rng.randint(1, restaurants) for _ in range(repeat)])
+    history = timed(lambda user_id: Order.query.filter_by(user_id=user_id)
+                    .order_by(Order.created_at.desc()).limit(20).all(),
+                    [owners + rng.randint(1, users) for _ in range(repeat)])
+    detail = timed(lambda order_id: find_order(order_id),
+                   [rng.choice(recent_ids) for _ in range(repeat)])
+    db.session.remove()
+    return board, history, detail
+
+def run(archive, args):
+    rng = random.Random(args.seed)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(1, args.restaurants, args.restaurants * args.products_per_restaurant, 0, args.users, args.seed)
+        owners = args.restaurants
+
+        clock = datetime.utcnow() - timedelta(days=args.steps * args.step_days)
+        results = []
+        for step in range(args.steps):
+            first_id = step * args.step_orders + 1
+            clock = grow(rng, first_id, args.step_orders, clock, args.step_days, args.restaurants, args.users,
+                         owners, args.products_per_restaurant)
+            archived = 0
+            if archive:
+                archived = order_archive.archive(clock - timedelta(days=args.retention))
+            live = db.session.query(Order.id).count()
+            tables, indexes = live_size()
+            recent_ids = list(range(first_id + args.step_orders - 1000, first_id + args.step_orders))
+            board, history, detail = hot_queries(rng, args.restaurants, args.users, owners, recent_ids, args.repeat)
+            results.append((first_id + args.step_orders - 1, live, tables, indexes, board, history, detail))
+            print(f"{'arquivado' if archive else 'sem arquivo'} | histórico {(step + 1) * args.step_days} dias, "
+                  f"{first_id + args.step_orders - 1} pedidos: {live} na tabela quente "
+                  f"(+{archived} arquivados), tabelas {tables:.1f} MiB, índices {indexes:.1f} MiB | "
+                  f"painel {board:.2f} ms, histórico do cliente {history:.2f} ms, pedido {detail:.2f} ms")
+
+        if archive:
+            # Leitura transparente de pedidos arquivados: bloco frio e bloco em cache
+            old_ids = [rng.randint(1, args.step_orders) for _ in range(args.repeat)]
+            order_archive.blocks.clear()
+            cold = timed(lambda order_id: find_order(order_id), old_ids)
+            warm = timed(lambda order_id: find_order(order_id), old_ids)
+            segments = os.listdir(os.environ['ARCHIVE_DIR'])
+            size = sum(os.path.getsize(os.path.join(os.environ['ARCHIVE_DIR'], name)) for name in segments)
+            print(f"pedido arquivado: {cold:.2f} ms (bloco frio), {warm:.2f} ms (em cache); "
+                  f"{len(segments)} segmentos, {size / 2 ** 20:.1f} MiB")
+        return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Tabela quente de pedidos com e sem arquivo morto, '
+                                                 'à medida que o histórico cresce')
+    parser.add_argument('--restaurants', type=int, default=500)
+    parser.add_argument('--products-per-restaurant', type=int, default=20)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--steps', type=int, default=6)
+    parser.add_argument('--step-days', type=int, default=60)
+    parser.add_argument('--step-orders', type=int, default=100000)
+    parser.add_argument('--retention', type=int, default=90)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', sqlite_load_pragmas)
+        db.engine.dispose()
+
+    baseline = run(False, args)
+    archived = run(True, args)
+    first, last = archived[0], archived[-1]
+    print(f"\n{last[0]} pedidos no histórico: índices {baseline[-1][3]:.1f} MiB sem arquivo, "
+          f"{last[3]:.1f} MiB com arquivo (primeiro passo: {first[3]:.1f} MiB); "
+          f"histórico do cliente {baseline[-1][5]:.2f} x {last[5]:.2f} ms")
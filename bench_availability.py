@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, time as clock, timedelta
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Banco próprio, num arquivo temporário
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench_availability_'), 'app.db')
+
+from sqlalchemy import event
+from src.main import app
+from src.models.user import db
+from src.models.restaurant import Restaurant
+from src.models.schedule import OpeningHours
+from src.services.availability import availability, scheduler
+from bench_data import generate, insert_batches, sqlite_load_pragmas, CATEGORIES
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return result, timings[len(timings) // 2] * 1000
+
+def sql_page(category_id, limit):
+    # Listagem filtrando as linhas no banco, como antes do bitmap
+    query = Restaurant.query.filter(Restaurant.category_id == category_id, Restaurant.is_active.is_(True),
+                                    Restaurant.is_online.is_(True))
+    return query.count(), query.order_by(Restaurant.id).limit(limit).all()
+
+def bitmap_page(category_id, limit):
+    ids = availability.open_ids(category_id)
+    page = ids[:limit].tolist()
+    return len(ids), Restaurant.query.filter(Restaurant.id.in_(page)).order_by(Restaurant.id).all()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Restaurantes abertos agora: bitmap em memória x filtro no banco, '
+                                                 'e o custo de uma fronteira de horário')
+    parser.add_argument('--restaurants', type=int, default=50000)
+    parser.add_argument('--scheduled', type=float, default=0.6, help='fração com horário de funcionamento')
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', sqlite_load_pragmas)
+        db.engine.dispose()
+        db.drop_all()
+        db.create_all()
+        generate(10, args.restaurants, args.restaurants, 0, 1000, 42)
+
+        # Almoço 11:00-15:00 e jantar 18:00-23:00 todos os dias
+        rng = random.Random(42)
+        scheduled = [restaurant_id for restaurant_id in range(1, args.restaurants + 1)
+                     if rng.random() < args.scheduled]
+        insert_batches(OpeningHours, (
+            {'restaurant_id': restaurant_id, 'weekday': weekday, 'opens_at': opens_at, 'closes_at': closes_at}
+            for restaurant_id in scheduled for weekday in range(7)
+            for opens_at, closes_at in ((clock(11), clock(15)), (clock(18), clock(23)))))
+
+        # Uma segunda-feira às 10:59, no horário local
+        before = datetime(2026, 10, 19, 10, 59)
+        stats = scheduler.run_once(before)
+        print(f"\n{len(scheduled)} restaurantes com horário; primeira rodada (fecha os fora da janela): "
+              f"{stats['restaurants'][1]} desligados em {stats['seconds'] * 1000:.0f} ms")
+
+        availability.load()
+        availability._checked_at, availability._next_at = before, availability.hours.next_boundary(before)
+
+        # Fronteira das 11:00: o agendador liga todos no banco, em lote, e
+        # cada processo avança o próprio bitmap
+        stats = scheduler.run_once(before + timedelta(minutes=1))
+        print(f"11:00 no banco: {stats['restaurants'][0]} restaurantes ligados em {stats['seconds'] * 1000:.0f} ms "
+              f"(uma transação)")
+        started = time.perf_counter()
+        availability._advance(before + timedelta(minutes=1))
+        print(f"11:00 no bitmap: {(time.perf_counter() - started) * 1000:.2f} ms")
+        availability.load()
+
+        for category_id in (1, len(CATEGORIES)):
+            (sql_total, sql_rows), sql_time = timed(lambda: sql_page(category_id, args.limit), args.repeat)
+            (total, rows), bitmap_time = timed(lambda: bitmap_page(category_id, args.limit), args.repeat)
+            assert total == sql_total and [row.id for row in rows] == [row.id for row in sql_rows]
+            print(f"categoria {category_id}: {total} abertos; página de {args.limit} + total: "
+                  f"banco {sql_time:.2f} ms, bitmap {bitmap_time:.2f} ms ({sql_time / bitmap_time:.1f}x)")
+
+        ids = [rng.randint(1, args.restaurants) for _ in range(1000)]
+        _, check_time = timed(lambda: [availability.is_open(restaurant_id) for restaurant_id in ids], args.repeat)
+        print(f"is_open: {check_time * 1000 / len(ids):.2f} µs por restaurante")
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Banco e KV próprios, em arquivos temporários
+workdir = tempfile.mkdtemp(prefix='bench_cart_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'app.db')
+os.environ.setdefault('CART_STORE', os.path.join(workdir, 'carts.db'))
+
+from sqlalchemy import event
+from src.main import app
+from src.models.user import db, User
+from src.models.restaurant import Restaurant, Product
+from src.models.order import Cart, CartItem
+from src.services.cart_store import cart_store
+
+CART_WRITE = re.compile(r'^\s*(INSERT INTO|UPDATE|DELETE FROM)\s+"?cart(_item)?"?\s', re.IGNORECASE)
+
+class WriteCounter:
+    # Comandos que escrevem em cart/cart_item (um executemany conta 1) e
+    # linhas afetadas por eles
+    def __init__(self, engine):
+        self.count = self.rows = 0
+        event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, conn, cursor, statement, parameters, context, executemany):
+        if CART_WRITE.match(statement):
+            self.count += 1
+            self.rows += max(cursor.rowcount, 0) or (len(parameters) if executemany else 1)
+
+def seed(restaurants, products_per_restaurant, users):
+    db.session.execute(User.__table__.insert(), [
+        {'id': i, 'username': f'u{i}', 'email': f'u{i}@bench.local', 'password_hash': 'x',
+         'user_type': 'restaurant' if i <= restaurants else 'customer', 'is_active': True}
+        for i in range(1, restaurants + users + 1)])
+    db.session.execute(Restaurant.__table__.insert(), [
+        {'id': i, 'name': f'R{i}', 'street': 'Rua', 'number': '1', 'neighborhood': 'Centro', 'city': 'São Paulo',
+         'state': 'SP', 'zip_code': '00000-000', 'owner_id': i, 'is_active': True, 'is_online': True}
+        for i in range(1, restaurants + 1)])
+    db.session.execute(Product.__table__.insert(), [
+        {'id': (r - 1) * products_per_restaurant + p, 'name': f'P{r}-{p}', 'price': 10.0 + p,
+         'restaurant_id': r, 'is_active': True, 'is_available': True}
+        for r in range(1, restaurants + 1) for p in range(1, products_per_restaurant + 1)])
+    db.session.commit()
+
+def sessions(rng, restaurants, products_per_restaurant, users, adds, removes, checkout_ratio):
+    # Roteiro de cada usuário: adições e remoções num restaurante; uma
+    # fração fecha o pedido e o resto abandona o carrinho
+    for user_id in range(restaurants + 1, restaurants + users + 1):
+        restaurant_id = rng.randint(1, restaurants)
+        products = [(restaurant_id - 1) * products_per_restaurant + rng.randint(1, products_per_restaurant)
+                    for _ in range(adds)]
+        yield user_id, products, removes, rng.random() < checkout_ratio
+
+# Caminho antigo: cada operação grava cart/cart_item e atualiza updated_at
+
+def sql_add(user_id, product_id, quantity=1):
+    cart = Cart.query.filter_by(user_id=user_id).first()
+    product = db.session.get(Product, product_id)
+    if not cart:
+        cart = Cart(user_id=user_id, restaurant_id=product.restaurant_id)
+        db.session.add(cart)
+        db.session.flush()
+    item = CartItem.query.filter_by(cart_id=cart.id, product_id=product_id).first()
+    if item:
+        item.quantity += quantity
+        item.total_price = item.unit_price * item.quantity
+    else:
+        db.session.add(CartItem(cart_id=cart.id, product_id=product_id, quantity=quantity,
+                                unit_price=product.price, total_price=product.price * quantity))
+    cart.updated_at = datetime.utcnow()
+    db.session.commit()
+    return Cart.with_items().filter_by(user_id=user_id).first().to_dict()
+
+def sql_remove(user_id):
+    cart = Cart.query.filter_by(user_id=user_id).first()
+    item = CartItem.query.filter_by(cart_id=cart.id).first()
+    if item:
+        db.session.delete(item)
+    cart.updated_at = datetime.utcnow()
+    db.session.commit()
+    return Cart.with_items().filter_by(user_id=user_id).first().to_dict()
+
+def sql_checkout(user_id):
+    cart = Cart.with_items().filter_by(user_id=user_id).first()
+    CartItem.query.filter_by(cart_id=cart.id).delete(synchronize_session=False)
+    Cart.query.filter_by(id=cart.id).delete(synchronize_session=False)
+    db.session.commit()
+
+# Caminho novo: KV até o checkout; abandonados vão ao banco por TTL
+
+def kv_add(user_id, product_id, quantity=1):
+    return cart_store.to_dict(cart_store.add(user_id, product_id, quantity))
+
+def kv_remove(user_id):
+    cart = cart_store.get(user_id)
+    return cart_store.to_dict(cart_store.remove(user_id, cart['items'][0]['id']))
+
+def kv_checkout(user_id):
+    # Mesmo efeito do checkout sobre o carrinho (o pedido em si fica de fora)
+    cart_store.get(user_id)
+    cart_store.delete_stored([user_id])
+    db.session.commit()
+    cart_store.discard(user_id)
+
+def run(label, add, remove, checkout, script, counter, flush=None):
+    counter.count = counter.rows = 0
+    latencies = []
+    started = time.perf_counter()
+    for user_id, products, removes, checks_out in script:
+        for product_id in products:
+            began = time.perf_counter()
+            add(user_id, product_id)
+            latencies.append(time.perf_counter() - began)
+        for _ in range(removes):
+            began = time.perf_counter()
+            remove(user_id)
+            latencies.append(time.perf_counter() - began)
+        if checks_out:
+            checkout(user_id)
+    browse = counter.count
+    if flush:
+        flush()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"{label:<18} comandos: {counter.count:>6} ({browse} antes do TTL), linhas: {counter.rows:>6}, "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms, total {elapsed:.1f} s")
+    return counter.count, counter.rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Escritas no banco no caminho do carrinho: SQL x KV')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--adds', type=int, default=6, help='adições por sessão')
+    parser.add_argument('--removes', type=int, default=2, help='remoções por sessão')
+    parser.add_argument('--checkout-ratio', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    with app.app_context():
+        seed(50, 20, args.users)
+        counter = WriteCounter(db.engine)
+        script = list(sessions(random.Random(args.seed), 50, 20, args.users, args.adds, args.removes,
+                               args.checkout_ratio))
+        print(f"{args.users} sessões, {args.adds} adições e {args.removes} remoções cada, "
+              f"{args.checkout_ratio:.0%} com checkout; KV: {os.environ['CART_STORE']}")
+        before = run('SQL (antes)', sql_add, sql_remove, sql_checkout, script, counter)
+        # Limpa o que o caminho antigo deixou e passa a contar o novo
+        CartItem.query.delete()
+        Cart.query.delete()
+        db.session.commit()
+        after = run('KV + TTL (depois)', kv_add, kv_remove, kv_checkout, script, counter,
+                    flush=lambda: cart_store.flush_expired(now=time.time() + cart_store.ttl + 1))
+        print(f"redução em cart/cart_item: {before[0] / max(after[0], 1):.0f}x menos comandos de escrita, "
+              f"{before[1] / max(after[1], 1):.1f}x menos linhas escritas")
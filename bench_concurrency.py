@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Banco e KV próprios, num diretório temporário, compartilhados com o gunicorn
+WORKDIR = tempfile.mkdtemp(prefix='bench_concurrency_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(WORKDIR, 'app.db')
+os.environ['CART_STORE'] = os.path.join(WORKDIR, 'carts.db')
+os.environ['ARCHIVE_DIR'] = os.path.join(WORKDIR, 'archive')
+
+from src.main import app
+from src.models.user import db
+from bench_api import percentile, token_for
+from bench_data import generate
+
+# (classe, workers, requisições simultâneas por worker); no gthread e no
+# gevent worker_connections (1000) limita as conexões abertas por worker
+MODES = {
+    'sync': ('sync', 3, 1),
+    'gthread': ('gthread', 3, 32),
+    'gevent': ('gevent', 3, 1000),
+}
+
+def start_server(mode, port):
+    worker_class, workers, concurrency = MODES[mode]
+    # ORDER_STREAM_LOCAL: no SQLite o broker é do processo; aqui só conta
+    # manter as conexões abertas, não entregar eventos entre workers
+    env = dict(os.environ, WEB_BIND=f'127.0.0.1:{port}', WEB_WORKER_CLASS=worker_class, WEB_WORKERS=str(workers),
+               WEB_THREADS=str(concurrency if worker_class == 'gthread' else 1), WEB_WORKER_CONNECTIONS='1000',
+               ORDER_STREAM_LOCAL='1')
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', config, 'src.main:app'],
+                              cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            status, _ = asyncio.run(request(port, '/api/restaurants/1/menu', None, 2))
+            if status == 200:
+                return server
+        except OSError:
+            pass
+        time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'gunicorn ({mode}) não subiu')
+
+async def request(port, path, token, timeout):
+    # Uma requisição por conexão (Connection: close); devolve status e corpo
+    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    try:
+        headers = f'GET {path} HTTP/1.1\r\nHost: bench\r\nConnection: close\r\n'
+        if token:
+            headers += f'Authorization: Bearer {token}\r\n'
+        writer.write((headers + '\r\n').encode())
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    status_line, _, body = response.partition(b'\r\n')
+    return int(status_line.split()[1]), body
+
+async def open_stream(port, token, timeout, opened):
+    # Abre um stream SSE e o mantém aberto; conta quando chega o "retry:"
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return None
+    writer.write((f'GET /api/orders/stream HTTP/1.1\r\nHost: bench\r\n'
+                  f'Authorization: Bearer {token}\r\n\r\n').encode())
+    try:
+        received = b''
+        deadline = time.monotonic() + timeout
+        while b'retry:' not in received:
+            chunk = await asyncio.wait_for(reader.read(4096), max(0.01, deadline - time.monotonic()))
+            if not chunk:
+                break
+            received += chunk
+        if b'retry:' in received:
+            opened.append(writer)
+            return writer
+    except (OSError, asyncio.TimeoutError):
+        pass
+    writer.close()
+    return None
+
+async def probe(port, paths, tokens, count, concurrency, timeout):
+    # Requisições comuns disparadas enquanto os streams estão abertos
+    timings, failures = [], 0
+    queue = list(range(count))
+
+    async def client():
+        nonlocal failures
+        while queue:
+            index = queue.pop()
+            started = time.perf_counter()
+            try:
+                status, _ = await request(port, paths[index % len(paths)], tokens[index % len(tokens)], timeout)
+                if status != 200:
+                    failures += 1
+                    continue
+            except (OSError, asyncio.TimeoutError, IndexError, ValueError):
+                failures += 1
+                continue
+            timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return sorted(timings), failures, time.perf_counter() - started
+
+async def level(port, streams, tokens, paths, args):
+    opened = []
+    await asyncio.gather(*(open_stream(port, tokens[i % len(tokens)], args.timeout, opened) for i in range(streams)))
+    timings, failures, wall = await probe(port, paths, tokens, args.probes, args.concurrency, args.timeout)
+    for writer in opened:
+        writer.close()
+    await asyncio.sleep(0.5)
+    return len(opened), timings, failures, wall
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Streams SSE abertos x requisições comuns, por classe de worker '
+                                                 'do gunicorn (gunicorn.conf.py)')
+    parser.add_argument('--modes', default='sync,gthread,gevent')
+    parser.add_argument('--streams', default='3,30,300,1000,2000')
+    parser.add_argument('--probes', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=5)
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+    levels = [int(value) for value in args.streams.split(',')]
+
+    # Cada stream e cada requisição são um descritor no cliente e no servidor
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, max(soft, max(levels) * 2 + 1024))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(5, 200, 4000, 0, 2000, 42)
+        tokens = [token_for(user_id) for user_id in random.Random(7).sample(range(1, 2001), 500)]
+    paths = [f'/api/restaurants/{restaurant_id}/menu' for restaurant_id in range(1, 201)] + ['/api/cart']
+
+    for mode in args.modes.split(','):
+        server = start_server(mode, args.port)
+        try:
+            print(f"\n{mode} ({MODES[mode][1]} workers x {MODES[mode][2]} requisições simultâneas)")
+            for streams in levels:
+                opened, timings, failures, wall = asyncio.run(level(args.port, streams, tokens, paths, args))
+                print(f"  {streams:5d} streams: {opened:5d} abertos; {args.probes} requisições: "
+                      f"{len(timings)} ok, {failures} falhas/timeouts, "
+                      f"p50 {percentile(timings, 0.5) * 1000:7.1f} ms, p99 {percentile(timings, 0.99) * 1000:7.1f} ms, "
+                      f"{len(timings) / wall:6.0f} req/s")
+                if not timings:
+                    # Workers presos nos streams: os níveis seguintes só repetem os timeouts
+                    print('  saturado; níveis seguintes ignorados')
+                    break
+        finally:
+            server.terminate()
+            server.wait()
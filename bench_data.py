@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import event, inspect, select, text
+from werkzeug.security import generate_password_hash
+from src.services.passwords import PASSWORD_HASH_METHOD
+from src.models.user import db, User, Address
+from src.models.restaurant import Category, Restaurant, ProductCategory, Product
+from src.models.order import Order, OrderItem, Review
+
+BENCH_PASSWORD = 'bench123'
+BATCH_SIZE = 10000
+
+CITIES = [
+    ('São Paulo', 'SP', -23.5505, -46.6333), ('Rio de Janeiro', 'RJ', -22.9068, -43.1729),
+    ('Belo Horizonte', 'MG', -19.9167, -43.9345), ('Curitiba', 'PR', -25.4284, -49.2733),
+    ('Porto Alegre', 'RS', -30.0346, -51.2177), ('Salvador', 'BA', -12.9777, -38.5016),
+    ('Recife', 'PE', -8.0476, -34.8770), ('Fortaleza', 'CE', -3.7319, -38.5267),
+    ('Brasília', 'DF', -15.7939, -47.8828), ('Manaus', 'AM', -3.1190, -60.0217),
+]
+CATEGORIES = ['Lanches', 'Pizza', 'Japonesa', 'Italiana', 'Brasileira', 'Doces', 'Bebidas', 'Açaí']
+DISHES = ['Hambúrguer', 'Pizza', 'Sushi', 'Lasanha', 'Feijoada', 'Açaí', 'Coxinha', 'Pastel',
+          'Risoto', 'Temaki', 'Brigadeiro', 'Salada', 'Moqueca', 'Tapioca', 'Pão de queijo']
+ADJECTIVES = ['Especial', 'da Casa', 'Tradicional', 'Gourmet', 'Vegano', 'Picante', 'Grande',
+              'Caseiro', 'Artesanal', 'Light']
+STATUSES = ['pending', 'confirmed', 'preparing', 'ready', 'delivering', 'delivered', 'delivered',
+            'delivered', 'cancelled']
+
+def sqlite_load_pragmas(dbapi_connection, connection_record):
+    # Carga descartável: sem journal nem fsync
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=OFF')
+    cursor.execute('PRAGMA synchronous=OFF')
+    cursor.execute('PRAGMA cache_size=-200000')
+    cursor.close()
+
+def insert_batches(model, rows):
+    # Insere um iterável de dicts em lotes via executemany do Core
+    table = model.__table__
+    batch, total = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+        total += len(batch)
+    db.session.commit()
+    return total
+
+def has_data():
+    # Alguma tabela do app já existe e tem linhas?
+    with db.engine.connect() as connection:
+        existing = set(inspect(connection).get_table_names())
+        return any(connection.execute(select(text('1')).select_from(table).limit(1)).first()
+                   for table in db.metadata.sorted_tables if table.name in existing)
+
+def reset_sequences():
+    # PostgreSQL: os ids foram inseridos explicitamente e as sequências
+    # ficaram paradas; sem isso o próximo INSERT do app repete o id 1
+    if db.engine.dialect.name != 'postgresql':
+        return
+    quote = db.engine.dialect.identifier_preparer.quote
+    for table in db.metadata.sorted_tables:
+        if 'id' not in table.c or not table.c.id.primary_key:
+            continue
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence(:table, 'id'), COALESCE(MAX(id), 0) + 1, false) "
+            f"FROM {quote(table.name)}"), {'table': quote(table.name)})
+    db.session.commit()
+
+def generate(cities, restaurants, products, orders, users, seed):
+    rng = random.Random(seed)
+    cities = CITIES[:cities] if cities <= len(CITIES) else [
+        (f'Cidade {i}', 'XX', rng.uniform(-30, -3), rng.uniform(-60, -35)) for i in range(cities)]
+    products_per_restaurant = max(1, products // restaurants)
+    now = datetime.utcnow()
+    password_hash = generate_password_hash(BENCH_PASSWORD, method=PASSWORD_HASH_METHOD)
+    counts = {}
+
+    def timed(name, model, rows):
+        started = time.perf_counter()
+        counts[name] = insert_batches(model, rows)
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {counts[name]} linhas em {elapsed:.1f}s ({counts[name] / max(elapsed, 1e-9):,.0f}/s)")
+
+    timed('categorias', Category, (
+        {'id': i + 1, 'name': name, 'is_active': True} for i, name in enumerate(CATEGORIES)))
+
+    # Usuários: 1..restaurants são donos; o restante, clientes
+    owners = restaurants
+    timed('usuários', User, (
+        {'id': i, 'username': f'bench{i}', 'email': f'bench{i}@bench.local',
+         'password_hash': password_hash, 'user_type': 'restaurant' if i <= owners else 'customer',
+         'is_active': True, 'created_at': now}
+        for i in range(1, owners + users + 1)))
+
+    def address(city):
+        name, state, lat, lng = city
+        return {'street': f'Rua {rng.randint(1, 999)}', 'number': str(rng.randint(1, 3000)),
+                'neighborhood': 'Centro', 'city': name, 'state': state, 'zip_code': '00000-000',
+                'latitude': lat + rng.uniform(-0.15, 0.15), 'longitude': lng + rng.uniform(-0.15, 0.15)}
+
+    timed('endereços', Address, (
+        dict(address(rng.choice(cities)), id=i, user_id=owners + i, is_default=True)
+        for i in range(1, users + 1)))
+
+    def restaurant_rows():
+        for i in range(1, restaurants + 1):
+            rating = round(rng.uniform(3, 5), 1)
+            total_reviews = rng.randint(0, 500)
+            yield dict(address(rng.choice(cities)), id=i, name=f'Restaurante {i}',
+                       description=f'{rng.choice(DISHES)} {rng.choice(ADJECTIVES)}',
+                       is_online=rng.random() < 0.8, is_active=True,
+                       delivery_fee=round(rng.uniform(0, 12), 2), minimum_order=20.0,
+                       delivery_time=rng.randint(20, 60), rating=rating, total_reviews=total_reviews,
+                       rating_sum=rating * total_reviews, category_id=rng.randint(1, len(CATEGORIES)),
+                       owner_id=i, created_at=now - timedelta(days=rng.randint(0, 1000)))
+
+    timed('restaurantes', Restaurant, restaurant_rows())
+
+    sections = 3
+    timed('categorias de produtos', ProductCategory, (
+        {'id': (r - 1) * sections + s + 1, 'name': f'Seção {s + 1}', 'restaurant_id': r,
+         'is_active': True, 'order': s + 1}
+        for r in range(1, restaurants + 1) for s in range(sections)))
+
+    # Preços guardados em memória para montar os itens dos pedidos
+    prices = []
+
+    def product_rows():
+        product_id = 0
+        for r in range(1, restaurants + 1):
+            for p in range(products_per_restaurant):
+                product_id += 1
+                price = round(rng.uniform(5, 90), 2)
+                prices.append(price)
+                yield {'id': product_id, 'name': f'{rng.choice(DISHES)} {rng.choice(ADJECTIVES)}',
+                       'description': f'{rng.choice(DISHES)} com {rng.choice(DISHES).lower()}',
+                       'price': price, 'is_available': True, 'is_active': True,
+                       'preparation_time': rng.randint(5, 40), 'restaurant_id': r,
+                       'category_id': (r - 1) * sections + p % sections + 1, 'created_at': now}
+
+    timed('produtos', Product, product_rows())
+
+    def order_chunk(first_id, last_id):
+        orders, items, reviews = [], [], []
+        for i in range(first_id, last_id + 1):
+            restaurant_id = rng.randint(1, restaurants)
+            created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 365))
+            status = rng.choice(STATUSES)
+            user_id = owners + rng.randint(1, users)
+            subtotal = 0.0
+            first_product = (restaurant_id - 1) * products_per_restaurant
+            for _ in range(rng.randint(1, 4)):
+                product_id = first_product + rng.randint(1, products_per_restaurant)
+                quantity = rng.randint(1, 3)
+                unit_price = prices[product_id - 1]
+                subtotal += unit_price * quantity
+                items.append({'order_id': i, 'product_id': product_id, 'quantity': quantity,
+                              'unit_price': unit_price, 'total_price': unit_price * quantity})
+            if status == 'delivered' and rng.random() < 0.3:
+                reviews.append({'user_id': user_id, 'restaurant_id': restaurant_id, 'order_id': i,
+                                'rating': rng.randint(1, 5), 'created_at': created_at})
+            orders.append({'id': i, 'order_number': f'B{i}', 'user_id': user_id,
+                           'restaurant_id': restaurant_id, 'status': status, 'subtotal': subtotal,
+                           'delivery_fee': 5.0, 'total': subtotal + 5.0, 'delivery_street': 'Rua Bench',
+                           'delivery_number': '1', 'delivery_neighborhood': 'Centro',
+                           'delivery_city': 'São Paulo', 'delivery_state': 'SP',
+                           'delivery_zip_code': '00000-000', 'payment_method': 'pix',
+                           'payment_status': 'paid', 'created_at': created_at,
+                           'delivered_at': created_at + timedelta(minutes=40) if status == 'delivered' else None})
+        return orders, items, reviews
+
+    # Pedidos, itens e avaliações em lotes; os itens só depois dos seus pedidos
+    started = time.perf_counter()
+    for name in ('pedidos', 'itens', 'avaliações'):
+        counts[name] = 0
+    for first_id in range(1, orders + 1, BATCH_SIZE):
+        chunk = order_chunk(first_id, min(first_id + BATCH_SIZE - 1, orders))
+        for name, model, rows in zip(('pedidos', 'itens', 'avaliações'), (Order, OrderItem, Review), chunk):
+            if rows:
+                db.session.execute(model.__table__.insert(), rows)
+                counts[name] += len(rows)
+        db.session.commit()
+    elapsed = time.perf_counter() - started
+    print(f"pedidos: {counts['pedidos']}, itens: {counts['itens']}, avaliações: {counts['avaliações']} "
+          f"em {elapsed:.1f}s ({counts['pedidos'] / max(elapsed, 1e-9):,.0f} pedidos/s)")
+    reset_sequences()
+    return counts
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Gera dados sintéticos para benchmark (escala completa: '
+                    '--restaurants 100000 --products 5000000 --orders 50000000)')
+    parser.add_argument('--cities', type=int, default=10)
+    parser.add_argument('--restaurants', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=50000)
+    parser.add_argument('--orders', type=int, default=200000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', help='banco a recriar (padrão: DATABASE_URL ou o SQLite local)')
+    parser.add_argument('--force', action='store_true', help='apaga o banco padrão mesmo que tenha dados')
+    args = parser.parse_args()
+
+    # Antes de importar o app, que lê DATABASE_URL
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+    from src.main import app
+
+    with app.app_context():
+        # Todas as tabelas são recriadas: um banco com dados só com
+        # confirmação (--force) ou escolhido explicitamente (--database)
+        if not (args.force or args.database) and has_data():
+            raise SystemExit(f'{db.engine.url.render_as_string()} já tem dados; '
+                             'use --force para apagá-los ou --database para escolher outro banco')
+
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', sqlite_load_pragmas)
+            db.engine.dispose()
+
+        db.drop_all()
+        db.create_all()
+        started = time.perf_counter()
+        generate(args.cities, args.restaurants, args.products, args.orders, args.users, args.seed)
+        print(f"\nTotal: {time.perf_counter() - started:.1f}s (senha dos usuários: {BENCH_PASSWORD})")
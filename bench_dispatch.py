@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import sys
+import os
+import time
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Banco próprio em memória: a simulação não toca nos dados da aplicação
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from src.main import app
+from src.models.user import db, User
+from src.models.restaurant import Restaurant
+from src.models.order import Order
+from src.models.courier import Courier, DeliveryAssignment
+from src.services.dispatch import dispatcher, plan
+
+CENTER = (-23.5505, -46.6333)  # São Paulo
+SPREAD = 0.15                  # ~16 km para cada lado
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))] if values else 0.0
+
+def point(rng, spread=SPREAD):
+    return CENTER[0] + rng.uniform(-spread, spread), CENTER[1] + rng.uniform(-spread, spread)
+
+def solver_benchmark(rng, orders, couriers, restaurants):
+    # Só o solver, com tuplas em memória: rodada cheia e replanejamento
+    kitchens = [point(rng) for _ in range(restaurants)]
+    ready = []
+    for order_id in range(1, orders + 1):
+        r_lat, r_lng = rng.choice(kitchens)
+        d_lat, d_lng = r_lat + rng.uniform(-0.03, 0.03), r_lng + rng.uniform(-0.03, 0.03)
+        ready.append((order_id, r_lat, r_lng, d_lat, d_lng, float(order_id)))
+    free = [(courier_id, *point(rng), 3) for courier_id in range(1, couriers + 1)]
+
+    started = time.perf_counter()
+    results = plan(free, ready, [])
+    full = time.perf_counter() - started
+    assigned = sum(len(order_ids) for _, _, order_ids, _ in results)
+
+    # Lotes abertos da rodada anterior recebem pedidos novos dos mesmos restaurantes
+    by_id = {order[0]: order for order in ready}
+    open_batches = []
+    for courier_id, batch, order_ids, _ in results:
+        if len(order_ids) < 3:
+            anchor = by_id[order_ids[0]]
+            open_batches.append((courier_id, batch, *anchor[1:5], 3 - len(order_ids)))
+    arrivals = [(orders + i, *by_id[rng.randint(1, orders)][1:5], float(orders + i)) for i in range(1, 201)]
+    started = time.perf_counter()
+    incremental = plan([], arrivals, open_batches)
+    replan = time.perf_counter() - started
+
+    print(f"solver: {orders} pedidos, {couriers} entregadores -> {assigned} atribuídos em "
+          f"{len(results)} lotes, {full * 1000:.0f} ms")
+    print(f"replanejamento: 200 pedidos novos x {len(open_batches)} lotes abertos -> "
+          f"{sum(len(ids) for _, _, ids, _ in incremental)} encaixados, {replan * 1000:.1f} ms")
+
+def seed(rng, restaurants, couriers):
+    now = datetime.utcnow()
+    db.session.execute(User.__table__.insert(), [
+        {'id': i, 'username': f'sim{i}', 'email': f'sim{i}@sim.local', 'password_hash': 'x',
+         'user_type': 'courier' if i > restaurants else 'restaurant', 'is_active': True}
+        for i in range(1, restaurants + couriers + 1)])
+    db.session.execute(Restaurant.__table__.insert(), [
+        dict(zip(('latitude', 'longitude'), point(rng)), id=i, name=f'Sim {i}', street='Rua', number='1',
+             neighborhood='Centro', city='São Paulo', state='SP', zip_code='00000-000', owner_id=i)
+        for i in range(1, restaurants + 1)])
+    db.session.execute(Courier.__table__.insert(), [
+        dict(zip(('latitude', 'longitude'), point(rng)), id=i, user_id=restaurants + i, status='available',
+             capacity=3, last_seen_at=now)
+        for i in range(1, couriers + 1)])
+    db.session.commit()
+
+def simulate(rng, orders, couriers, restaurants, per_round, trip_rounds):
+    # Pedidos ficam prontos em ondas; cada rodada do despachante mede o
+    # tempo de retrato + solver (no pool) + gravação. Entregadores concluem
+    # a viagem após trip_rounds rodadas e voltam a ficar livres.
+    seed(rng, restaurants, couriers)
+    locations = {restaurant_id: (lat, lng) for restaurant_id, lat, lng in
+                 db.session.query(Restaurant.id, Restaurant.latitude, Restaurant.longitude)}
+    ready_round, assigned_round, durations = {}, {}, []
+    trips = {}
+    next_id, round_number = 1, 0
+
+    while len(assigned_round) < orders and round_number < 10000:
+        round_number += 1
+        if next_id <= orders:
+            count = min(per_round, orders - next_id + 1)
+            rows = []
+            for order_id in range(next_id, next_id + count):
+                restaurant_id = rng.randint(1, restaurants)
+                lat, lng = locations[restaurant_id]
+                rows.append({'id': order_id, 'order_number': f'S{order_id}', 'user_id': 1,
+                             'restaurant_id': restaurant_id, 'status': 'ready', 'subtotal': 30.0,
+                             'delivery_fee': 5.0, 'total': 35.0, 'delivery_street': 'Rua',
+                             'delivery_number': '1', 'delivery_neighborhood': 'Centro',
+                             'delivery_city': 'São Paulo', 'delivery_state': 'SP',
+                             'delivery_zip_code': '00000-000', 'payment_method': 'pix',
+                             'payment_status': 'paid', 'created_at': datetime.utcnow(),
+                             'delivery_latitude': lat + rng.uniform(-0.03, 0.03),
+                             'delivery_longitude': lng + rng.uniform(-0.03, 0.03)})
+                ready_round[order_id] = round_number
+            db.session.execute(Order.__table__.insert(), rows)
+            db.session.commit()
+            next_id += count
+
+        stats = dispatcher.run_once()
+        durations.append((stats['orders'], stats['seconds']))
+
+        for order_id, courier_id in (db.session.query(DeliveryAssignment.order_id, DeliveryAssignment.courier_id)
+                                     .filter(DeliveryAssignment.assigned_at.isnot(None),
+                                             DeliveryAssignment.status == 'assigned')):
+            if order_id not in assigned_round:
+                assigned_round[order_id] = round_number
+                trips.setdefault(courier_id, round_number + trip_rounds)
+
+        # Viagens concluídas: pedidos entregues e entregador livre de novo
+        done = [courier_id for courier_id, finish in trips.items() if finish <= round_number]
+        if done:
+            now = datetime.utcnow()
+            (DeliveryAssignment.query.filter(DeliveryAssignment.courier_id.in_(done),
+                                             DeliveryAssignment.status != 'delivered')
+             .update({'status': 'delivered', 'delivered_at': now}, synchronize_session=False))
+            (Courier.query.filter(Courier.id.in_(done))
+             .update({'status': 'available', 'last_seen_at': now}, synchronize_session=False))
+            db.session.commit()
+            for courier_id in done:
+                del trips[courier_id]
+
+    waits = [assigned_round[order_id] - ready_round[order_id] for order_id in assigned_round]
+    busy = [seconds for pending, seconds in durations if pending]
+    peak = max(pending for pending, _ in durations)
+    print(f"\nsimulação: {orders} pedidos, {couriers} entregadores, {restaurants} restaurantes, "
+          f"{per_round} pedidos prontos por rodada")
+    print(f"rodadas: {round_number}, pico de {peak} pedidos prontos aguardando")
+    print(f"duração da rodada (retrato + solver + gravação): p50 {percentile(busy, 0.5) * 1000:.0f} ms, "
+          f"p95 {percentile(busy, 0.95) * 1000:.0f} ms, máx {max(busy) * 1000:.0f} ms")
+    print(f"espera até a atribuição (em rodadas): p50 {percentile(waits, 0.5)}, "
+          f"p95 {percentile(waits, 0.95)}, máx {max(waits)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Simulador e benchmark do despacho de entregadores')
+    parser.add_argument('--orders', type=int, default=5000, help='pedidos prontos simultâneos')
+    parser.add_argument('--couriers', type=int, default=1500)
+    parser.add_argument('--restaurants', type=int, default=800)
+    parser.add_argument('--per-round', type=int, default=1000, help='pedidos que ficam prontos por rodada')
+    parser.add_argument('--trip-rounds', type=int, default=3, help='rodadas até o entregador concluir a viagem')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    solver_benchmark(random.Random(args.seed), args.orders, args.couriers, args.restaurants)
+    with app.app_context():
+        simulate(random.Random(args.seed), args.orders, args.couriers, args.restaurants,
+                 args.per_round, args.trip_rounds)
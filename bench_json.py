@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Banco próprio em memória: o benchmark não toca nos dados da aplicação
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from flask.json.provider import DefaultJSONProvider
+from src.main import app
+from src.models.user import db, User
+from src.models.restaurant import Restaurant, Product
+from src.models.order import Order, OrderItem, serialize_orders
+from src.models.rows import order_rows, product_rows, row_columns, row_serializer
+from src.services import json_provider
+
+def seed(menu_size, orders, items_per_order):
+    rng = random.Random(1)
+    now = datetime.utcnow()
+    db.session.add(User(id=1, username='bench', email='bench@bench.local', password_hash='x'))
+    db.session.add(Restaurant(id=1, name='Bench', street='Rua', number='1', neighborhood='Centro',
+                              city='São Paulo', state='SP', zip_code='00000-000', owner_id=1))
+    db.session.flush()
+    db.session.execute(Product.__table__.insert(), [
+        {'id': i, 'name': f'Produto {i}', 'description': 'Descrição do produto ' * 3,
+         'price': round(rng.uniform(5, 90), 2), 'restaurant_id': 1, 'created_at': now}
+        for i in range(1, menu_size + 1)])
+    db.session.execute(Order.__table__.insert(), [
+        {'id': i, 'order_number': f'B{i}', 'user_id': 1, 'restaurant_id': 1, 'status': 'delivered',
+         'subtotal': 50.0, 'delivery_fee': 5.0, 'total': 55.0, 'delivery_street': 'Rua',
+         'delivery_number': '1', 'delivery_neighborhood': 'Centro', 'delivery_city': 'São Paulo',
+         'delivery_state': 'SP', 'delivery_zip_code': '00000-000', 'payment_method': 'pix',
+         'payment_status': 'paid', 'created_at': now - timedelta(minutes=i),
+         'confirmed_at': now - timedelta(minutes=i), 'delivered_at': now}
+        for i in range(1, orders + 1)])
+    db.session.execute(OrderItem.__table__.insert(), [
+        {'order_id': i, 'product_id': rng.randint(1, menu_size), 'quantity': 1,
+         'unit_price': 25.0, 'total_price': 25.0}
+        for i in range(1, orders + 1) for _ in range(items_per_order)])
+    db.session.commit()
+
+def best_of(repeat, function, expire):
+    timings = []
+    for _ in range(repeat):
+        if expire:
+            db.session.expire_all()
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def compare(name, repeat, baseline, fast, expire=True):
+    # Confere que as duas saídas são o mesmo JSON antes de medir
+    if json.loads(baseline()) != json.loads(fast()):
+        raise SystemExit(f'{name}: JSON diferente entre os caminhos')
+    slow, quick = best_of(repeat, baseline, expire), best_of(repeat, fast, expire)
+    print(f"{name:<42} {slow * 1000:>9.2f} {quick * 1000:>9.2f} {slow / quick:>7.1f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serialização JSON: to_dict + json padrão vs tuplas + orjson')
+    parser.add_argument('--menu', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=500)
+    parser.add_argument('--items', type=int, default=3, help='itens por pedido')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if json_provider.orjson is None:
+        print('orjson não instalado: o caminho rápido usa o json da stdlib')
+
+    with app.app_context():
+        seed(args.menu, args.orders, args.items)
+        standard = DefaultJSONProvider(app)
+        menu = Product.query.filter_by(restaurant_id=1).order_by(Product.id)
+        history = Order.query.filter_by(user_id=1)
+
+        # Somente a serialização, com os dados já em memória
+        products = menu.all()
+        product_tuples = menu.with_entities(*row_columns(Product)).all()
+        serialize_product = row_serializer(Product)
+
+        print(f"{'cenário':<42} {'padrão ms':>9} {'rápido ms':>9} {'ganho':>8}")
+        compare(f'cardápio ({args.menu} produtos), serialização', args.repeat,
+                lambda: standard.dumps([product.to_dict() for product in products]),
+                lambda: app.json.dumps([serialize_product(row) for row in product_tuples]), expire=False)
+        compare(f'cardápio ({args.menu} produtos), com consulta', args.repeat,
+                lambda: standard.dumps([product.to_dict() for product in menu]),
+                lambda: app.json.dumps(product_rows(menu)))
+        compare(f'histórico ({args.orders} pedidos), com consulta', args.repeat,
+                lambda: standard.dumps(serialize_orders(history, per_page=args.orders)),
+                lambda: app.json.dumps(order_rows(history, per_page=args.orders)))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Banco em memória, só para o benchmark
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from flask import jsonify
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+from src.main import app
+from src.models.user import db, User
+from src.models.restaurant import Restaurant, ProductCategory, Product
+from src.services.menu_snapshots import menu_snapshots
+from bench_data import insert_batches
+
+SIZES = (10, 100, 1000, 5000)
+
+def lazy_menu(restaurant_id):
+    # Como a página de um restaurante era montada: relacionamentos lazy e
+    # um to_dict() por objeto
+    restaurant = Restaurant.query.get(restaurant_id)
+    categories = sorted((category for category in ProductCategory.query.filter_by(restaurant_id=restaurant_id)
+                         if category.is_active), key=lambda category: category.order)
+    return jsonify({
+        'restaurant': restaurant.to_dict(),
+        'categories': [dict(category.to_dict(),
+                            products=[product.to_dict() for product in category.products if product.is_active])
+                       for category in categories]
+    })
+
+def ttfb(path, repeat, encoding='gzip'):
+    # Até o primeiro pedaço do corpo sair do app WSGI
+    timings, size = [], 0
+    for _ in range(repeat):
+        environ = EnvironBuilder(path=path, headers={'Accept-Encoding': encoding}).get_environ()
+        started = time.perf_counter()
+        app_iter, status, headers = run_wsgi_app(app, environ, buffered=False)
+        first = next(iter(app_iter), b'')
+        timings.append(time.perf_counter() - started)
+        size = len(first) + sum(len(chunk) for chunk in app_iter)
+        if hasattr(app_iter, 'close'):
+            app_iter.close()
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, size
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Cardápio completo: snapshot pré-comprimido x serialização lazy')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username='owner', email='owner@bench', password_hash='x', user_type='restaurant'))
+        for restaurant_id in range(1, len(SIZES) + 1):
+            db.session.add(Restaurant(id=restaurant_id, name=f'Restaurante {restaurant_id}', street='Rua Bench',
+                                      number='1', neighborhood='Centro', city='São Paulo', state='SP',
+                                      zip_code='00000-000', owner_id=1))
+        db.session.commit()
+        category_id = product_id = 0
+        categories, products = [], []
+        for restaurant_id, size in enumerate(SIZES, 1):
+            sections = max(1, size // 25)
+            for section in range(sections):
+                category_id += 1
+                categories.append({'id': category_id, 'name': f'Seção {section}', 'restaurant_id': restaurant_id,
+                                   'is_active': True, 'order': sections - section})
+            for i in range(size):
+                product_id += 1
+                products.append({'id': product_id, 'name': f'Produto {product_id}',
+                                 'description': 'Descrição do produto com alguns ingredientes e observações',
+                                 'price': 10.0 + i % 50, 'is_available': True, 'is_active': True,
+                                 'preparation_time': 15, 'restaurant_id': restaurant_id,
+                                 'category_id': category_id - sections + 1 + i % sections})
+        insert_batches(ProductCategory, categories)
+        insert_batches(Product, products)
+
+        app.add_url_rule('/bench/lazy-menu/<int:restaurant_id>', 'bench_lazy_menu', lazy_menu)
+
+    for restaurant_id, size in enumerate(SIZES, 1):
+        lazy, lazy_size = ttfb(f'/bench/lazy-menu/{restaurant_id}', args.repeat)
+        menu_snapshots.invalidate()
+        started = time.perf_counter()
+        ttfb(f'/api/restaurants/{restaurant_id}/menu', 1)
+        build = (time.perf_counter() - started) * 1000
+        snapshot, gzip_size = ttfb(f'/api/restaurants/{restaurant_id}/menu', args.repeat)
+        print(f"{size:5d} produtos: lazy {lazy:7.2f} ms ({lazy_size / 1024:6.1f} KiB) | snapshot {snapshot:5.2f} ms "
+              f"({gzip_size / 1024:5.1f} KiB gzip), montagem após mudança {build:6.1f} ms")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Banco próprio, num arquivo temporário
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='bench_reports_'), 'app.db')
+
+from sqlalchemy import func
+from src.main import app
+from src.models.user import db
+from src.models.order import Order, OrderItem
+from src.services.rollups import rollups
+from bench_data import generate
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return result, timings[len(timings) // 2]
+
+def live_sales(restaurant_id, start, end):
+    # O que o relatório custaria sem rollups: pedidos e itens do período
+    first, last = rollups._range(start, end)
+    offset = timedelta(hours=rollups.utc_offset_hours)
+    delivered_at = func.coalesce(Order.delivered_at, Order.created_at)
+    orders = (db.session.query(Order.id, delivered_at, Order.total)
+              .filter(Order.restaurant_id == restaurant_id, Order.status == 'delivered',
+                      delivered_at >= first - offset, delivered_at < last - offset)
+              .all())
+    items = dict(db.session.query(OrderItem.order_id, func.sum(OrderItem.quantity))
+                 .filter(OrderItem.order_id.in_([order_id for order_id, _, _ in orders]))
+                 .group_by(OrderItem.order_id)
+                 .all()) if orders else {}
+    days = {}
+    for order_id, moment, total in orders:
+        entry = days.setdefault((moment + offset).date(), [0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += total
+        entry[2] += items.get(order_id, 0)
+    return days
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Carga das rollups de vendas e relatórios: rollup x consulta ao vivo')
+    parser.add_argument('--restaurants', type=int, default=200)
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--orders', type=int, default=300000)
+    parser.add_argument('--chunk', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        generate(1, args.restaurants, args.products, args.orders, 2000, 42)
+
+        started = time.perf_counter()
+        total = rollups.backfill(args.chunk)
+        elapsed = time.perf_counter() - started
+        print(f"\nbackfill: {total} pedidos entregues em {elapsed:.1f}s "
+              f"({total / elapsed:,.0f} pedidos/s, lotes de {args.chunk})")
+        rollups.refresh()
+
+        # Restaurante com mais pedidos, período de 30 e de 365 dias
+        restaurant_id = (db.session.query(Order.restaurant_id).group_by(Order.restaurant_id)
+                         .order_by(func.count().desc()).limit(1).scalar())
+        end = max(db.session.query(func.max(Order.created_at)).scalar().date(),
+                  db.session.query(func.max(Order.delivered_at)).scalar().date()) + timedelta(days=1)
+        for days in (30, 365):
+            start = end - timedelta(days=days - 1)
+            report, rollup_time = timed(lambda: rollups.sales(restaurant_id, start, end), args.repeat)
+            live, live_time = timed(lambda: live_sales(restaurant_id, start, end), args.repeat)
+            _, top_time = timed(lambda: rollups.top_products(restaurant_id, start, end), args.repeat)
+            # Conferência: o total das rollups bate com a consulta ao vivo
+            assert report['totals']['orders'] == sum(entry[0] for entry in live.values())
+            assert abs(report['totals']['revenue'] - round(sum(entry[1] for entry in live.values()), 2)) < 0.05
+            print(f"restaurante {restaurant_id}, {days} dias ({report['totals']['orders']} pedidos): "
+                  f"rollup {rollup_time * 1000:.1f} ms, ao vivo {live_time * 1000:.1f} ms "
+                  f"({live_time / rollup_time:.1f}x), top produtos {top_time * 1000:.1f} ms")
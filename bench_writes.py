@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import (Column, DateTime, Float, Integer, MetaData, String, Table, create_engine,
+                        event, func, select)
+from sqlalchemy.exc import OperationalError
+from src.models import storage
+
+# Tabela própria do benchmark: não depende dos dados nem das FKs da aplicação
+metadata = MetaData()
+bench_write = Table(
+    'bench_write', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('worker', Integer, nullable=False, index=True),
+    Column('status', String(20), nullable=False),
+    Column('total', Float, nullable=False),
+    Column('created_at', DateTime, server_default=func.now()),
+)
+
+def make_engine(url, profile):
+    # 'default' reproduz a configuração antiga (create_engine sem opções);
+    # 'tuned' usa as opções e os PRAGMAs de src.models.storage
+    if profile == 'default':
+        engine = create_engine(url)
+        if engine.dialect.name == 'sqlite':
+            @event.listens_for(engine, 'connect')
+            def rollback_journal(dbapi_connection, connection_record):
+                dbapi_connection.execute('PRAGMA journal_mode=DELETE')
+        return engine
+
+    engine = create_engine(url, **storage.engine_options(url))
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', storage._sqlite_pragmas)
+    return engine
+
+def worker(url, profile, index, deadline, read_ratio, results):
+    # Cada processo imita um worker do gunicorn: transações curtas de
+    # escrita (INSERT + UPDATE) intercaladas com leituras
+    engine = make_engine(url, profile)
+    writes = reads = errors = 0
+    latencies = []
+    with engine.connect() as connection:
+        while time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                if reads < writes * read_ratio:
+                    connection.execute(select(func.count()).select_from(bench_write)
+                                       .where(bench_write.c.worker == index)).scalar()
+                    connection.rollback()
+                    reads += 1
+                else:
+                    with connection.begin():
+                        result = connection.execute(bench_write.insert(),
+                                                    {'worker': index, 'status': 'pending', 'total': 42.0})
+                        connection.execute(bench_write.update()
+                                           .where(bench_write.c.id == result.inserted_primary_key[0])
+                                           .values(status='confirmed'))
+                    writes += 1
+                    latencies.append(time.perf_counter() - started)
+            except OperationalError:
+                # "database is locked" no SQLite sem busy_timeout
+                errors += 1
+    engine.dispose()
+    results.put((writes, reads, errors, latencies))
+
+def run(url, profile, processes, duration, read_ratio):
+    engine = make_engine(url, profile)
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    engine.dispose()
+
+    results = multiprocessing.Queue()
+    deadline = time.time() + duration
+    pool = [multiprocessing.Process(target=worker, args=(url, profile, i, deadline, read_ratio, results))
+            for i in range(processes)]
+    for process in pool:
+        process.start()
+    collected = [results.get() for _ in pool]
+    for process in pool:
+        process.join()
+
+    latencies = sorted(value for _, _, _, values in collected for value in values)
+    writes = sum(row[0] for row in collected)
+    p95 = latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0
+    return {
+        'writes_per_s': writes / duration,
+        'reads_per_s': sum(row[1] for row in collected) / duration,
+        'errors': sum(row[2] for row in collected),
+        'p95_write_ms': p95,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Vazão de escritas concorrentes por perfil de banco')
+    parser.add_argument('--url', help='banco a usar (padrão: DATABASE_URL ou um SQLite temporário)')
+    parser.add_argument('--profiles', default='default,tuned')
+    parser.add_argument('--processes', type=int, default=4, help='processos concorrentes (workers)')
+    parser.add_argument('--duration', type=float, default=10, help='segundos por perfil')
+    parser.add_argument('--read-ratio', type=float, default=3, help='leituras por escrita')
+    args = parser.parse_args()
+
+    url = args.url or storage.database_url(os.path.join(tempfile.mkdtemp(prefix='bench_writes_'), 'bench.db'))
+
+    print(f"{'perfil':<10} {'escritas/s':>11} {'leituras/s':>11} {'erros':>7} {'p95 ms':>8}")
+    for profile in args.profiles.split(','):
+        row = run(url, profile, args.processes, args.duration, args.read_ratio)
+        print(f"{profile:<10} {row['writes_per_s']:>11.1f} {row['reads_per_s']:>11.1f} "
+              f"{row['errors']:>7} {row['p95_write_ms']:>8.2f}")
+    print(f"\nBanco: {make_engine(url, 'default').url.render_as_string(hide_password=True)}")
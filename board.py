@@ -0,0 +1,20 @@
+from flask import Blueprint, request, jsonify
+from src.models.restaurant import Restaurant
+from src.routes.auth import token_required
+from src.services.order_board import order_boards
+
+board_bp = Blueprint('board', __name__)
+
+@board_bp.route('/<int:restaurant_id>/orders/board', methods=['GET'])
+@token_required
+def get_order_board(current_user, restaurant_id):
+    # Pedidos abertos do restaurante; com ?since= (valor devolvido na
+    # leitura anterior) só os pedidos alterados e os removidos desde então
+    owner_id = Restaurant.query.with_entities(Restaurant.owner_id).filter_by(id=restaurant_id).scalar()
+    if owner_id is None:
+        return jsonify({'message': 'Restaurant not found'}), 404
+    if owner_id != current_user.id and current_user.user_type != 'admin':
+        return jsonify({'message': 'Access denied'}), 403
+
+    board = order_boards.read(restaurant_id, request.args.get('since'))
+    return jsonify(board), 200
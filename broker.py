@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    def __init__(self, broker, channels, maxsize=100):
+        self.broker = broker
+        self.channels = tuple(channels)
+        self._queue = queue.Queue(maxsize)
+
+    def put(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            # Consumidor lento: descarta em vez de bloquear quem publica
+            pass
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class LocalBroker:
+    # Pub/sub em memória do processo. Não cria threads: cada assinante só
+    # tem uma fila, consumida por quem atende a conexão. Outro broker (ex.:
+    # Redis) pode substituí-lo via set_broker(), desde que ofereça a mesma
+    # interface subscribe/add/unsubscribe/publish. Com mais de um worker, uma
+    # mensagem publicada num processo não chega aos streams dos outros
+    # (shared = False; ver init_broker).
+    shared = False
+
+    def __init__(self):
+        self._channels = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, *channels):
+        return self.add(Subscription(self, channels))
+
+    def add(self, subscription):
+        # Qualquer objeto com channels e put(message); put() é chamado por
+        # quem publica (ou pela thread de escuta) e não deve bloquear
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+        return len(subscribers)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._channels.values())
+
+class PostgresBroker(LocalBroker):
+    # Pub/sub entre processos e servidores com LISTEN/NOTIFY do PostgreSQL.
+    # publish() vira um NOTIFY; cada processo mantém uma conexão dedicada
+    # em LISTEN (numa thread, ou greenlet sob gevent) que repassa as
+    # mensagens às assinaturas locais. O NOTIFY só é entregue após o commit
+    # e o payload é limitado a 8000 bytes. Mensagens publicadas enquanto a
+    # conexão de escuta reconecta se perdem; o cliente SSE segue pelos
+    # próximos eventos.
+    shared = True
+    CHANNEL = 'order_events'
+
+    def __init__(self, engine):
+        super().__init__()
+        self.engine = engine
+        self._listener_pid = None
+        self._start_lock = threading.Lock()
+
+    def add(self, subscription):
+        self._ensure_listener()
+        return super().add(subscription)
+
+    def publish(self, channel, message):
+        payload = json.dumps({'channel': channel, 'message': message})
+        with self.engine.begin() as connection:
+            connection.execute(text('SELECT pg_notify(:channel, :payload)'),
+                               {'channel': self.CHANNEL, 'payload': payload})
+
+    def _deliver(self, payload):
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.warning('Ignoring malformed %s notification', self.CHANNEL)
+            return
+        super().publish(data['channel'], data['message'])
+
+    def _ensure_listener(self):
+        # Uma thread por processo, iniciada no primeiro assinante (depois
+        # do fork do gunicorn)
+        if self._listener_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._listener_pid == os.getpid():
+                return
+            threading.Thread(target=self._listen, name='broker-listener', daemon=True).start()
+            self._listener_pid = os.getpid()
+
+    def _listen(self):
+        while True:
+            connection = None
+            try:
+                # Conexão fora do pool, em autocommit, só para o LISTEN
+                connection = self.engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                cursor = dbapi_connection.cursor()
+                cursor.execute(f'LISTEN {self.CHANNEL}')
+                if not hasattr(dbapi_connection, 'poll'):
+                    # psycopg 3: notifies() bloqueia até a próxima mensagem
+                    for notify in dbapi_connection.notifies():
+                        self._deliver(notify.payload)
+                    continue
+                while True:
+                    if select.select([dbapi_connection], [], [], 30) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        self._deliver(dbapi_connection.notifies.pop(0).payload)
+            except Exception:
+                logger.exception('Broker listener failed; reconnecting')
+                time.sleep(1)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+_broker = LocalBroker()
+
+def init_broker(engine):
+    # PostgreSQL: streams recebem eventos de qualquer worker. Nos demais
+    # bancos o broker é do processo, e o stream exige um único worker
+    # (ver stream_available)
+    if engine.dialect.name == 'postgresql':
+        set_broker(PostgresBroker(engine))
+
+def stream_available():
+    # WEB_WORKERS é exportado pelo gunicorn.conf.py em cada worker;
+    # ORDER_STREAM_LOCAL=1 aceita streams que só veem o próprio processo
+    if get_broker().shared or os.environ.get('ORDER_STREAM_LOCAL', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return int(os.environ.get('WEB_WORKERS', 1)) <= 1
+
+def get_broker():
+    return _broker
+
+def set_broker(broker):
+    global _broker
+    _broker = broker
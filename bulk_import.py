@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+import argparse
+import csv
+import io
+import json
+import sys
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy.exc import OperationalError
+from src.models.user import db
+from src.models.restaurant import Restaurant, ProductCategory, Product
+
+BATCH_SIZE = 20000
+
+# Perfil de carga do SQLite: sem fsync e com journal em memória. Uma queda
+# no meio da carga pode corromper o arquivo, por isso só vale durante a
+# importação, com o banco travado para os demais processos, e é desfeito
+# ao final.
+SQLITE_LOAD_PRAGMAS = {
+    'synchronous': 'OFF',
+    'journal_mode': 'MEMORY',
+    'temp_store': 'MEMORY',
+    'cache_size': '-200000',
+}
+
+class DatabaseInUse(Exception):
+    pass
+
+@contextmanager
+def load_profile(connection):
+    # PRAGMAs de segurança não mudam dentro de transação: a conexão precisa
+    # estar livre ao entrar e ao sair
+    if connection.dialect.name != 'sqlite':
+        yield
+        return
+
+    previous = {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+                for name in SQLITE_LOAD_PRAGMAS}
+
+    # Trava exclusiva mantida até o fim da carga: com outro processo no
+    # meio de uma transação a importação não começa, e ninguém lê ou
+    # escreve enquanto o journal está em memória
+    connection.exec_driver_sql('PRAGMA locking_mode=EXCLUSIVE')
+    try:
+        connection.exec_driver_sql('BEGIN EXCLUSIVE')
+        connection.commit()
+        for name, value in SQLITE_LOAD_PRAGMAS.items():
+            connection.exec_driver_sql(f'PRAGMA {name}={value}')
+        # Sair do WAL falha em silêncio (o modo anterior continua) se o
+        # banco não estiver de fato exclusivo
+        applied = connection.exec_driver_sql('PRAGMA journal_mode').scalar()
+        if applied.lower() != SQLITE_LOAD_PRAGMAS['journal_mode'].lower():
+            raise DatabaseInUse(f'journal_mode stayed {applied}')
+        connection.commit()
+    except (OperationalError, DatabaseInUse) as e:
+        connection.rollback()
+        _restore(connection, previous)
+        raise DatabaseInUse(f'Database is in use by another connection; stop the app before importing ({e})')
+
+    try:
+        yield
+    finally:
+        connection.rollback()
+        _restore(connection, previous)
+
+def _restore(connection, previous):
+    # A trava sai antes da volta ao WAL: em WAL o locking_mode não volta a
+    # NORMAL, e fora dele a trava só é liberada no próximo acesso ao arquivo
+    connection.exec_driver_sql('PRAGMA locking_mode=NORMAL')
+    connection.exec_driver_sql('SELECT 1 FROM sqlite_master LIMIT 1')
+    connection.commit()
+    for name, value in previous.items():
+        connection.exec_driver_sql(f'PRAGMA {name}={value}')
+    connection.commit()
+
+class BulkLoader:
+    # Insere tuplas em lotes direto pelo driver: executemany no SQLite e
+    # COPY no PostgreSQL, sem passar pela unidade de trabalho do ORM
+    # (e portanto sem disparar os eventos dos modelos).
+
+    def __init__(self, connection, batch_size=BATCH_SIZE):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.rows = 0
+        self.seconds = 0.0
+
+    def load(self, table, columns, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(table, columns, batch)
+                batch = []
+        if batch:
+            self._flush(table, columns, batch)
+
+    def _flush(self, table, columns, batch):
+        started = time.perf_counter()
+        if self.connection.dialect.name == 'postgresql':
+            self._copy(table, columns, batch)
+        else:
+            placeholders = ', '.join('?' for _ in columns)
+            names = ', '.join(f'"{column}"' for column in columns)
+            self.connection.exec_driver_sql(
+                f'INSERT INTO "{table.name}" ({names}) VALUES ({placeholders})', batch)
+        self.seconds += time.perf_counter() - started
+        self.rows += len(batch)
+
+    def _copy(self, table, columns, batch):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        names = ', '.join(f'"{column}"' for column in columns)
+        cursor = self.connection.connection.cursor()
+        try:
+            cursor.copy_expert(f'COPY "{table.name}" ({names}) FROM STDIN WITH (FORMAT csv)', buffer)
+        finally:
+            cursor.close()
+
+    @property
+    def rate(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+def read_catalog(path):
+    # Linhas do catálogo: restaurant (nome ou id), category, name, description,
+    # price, preparation_time, image_url. Aceita .csv, .jsonl ou .json (lista).
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as source:
+            yield from csv.DictReader(source)
+    elif path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as source:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, encoding='utf-8') as source:
+            yield from json.load(source)
+
+def import_catalog(path, batch_size=BATCH_SIZE):
+    # Importa produtos resolvendo restaurantes e seções em memória; seções
+    # inexistentes são criadas antes da carga, na mesma transação
+    restaurants = {}
+    for restaurant_id, name in db.session.query(Restaurant.id, Restaurant.name):
+        restaurants[str(restaurant_id)] = restaurant_id
+        restaurants.setdefault(name, restaurant_id)
+
+    sections = {(restaurant_id, name): section_id for section_id, restaurant_id, name in
+                db.session.query(ProductCategory.id, ProductCategory.restaurant_id, ProductCategory.name)}
+    db.session.commit()
+
+    def resolve(row):
+        restaurant_id = restaurants.get(str(row['restaurant']))
+        if restaurant_id is None:
+            raise ValueError(f"Unknown restaurant: {row['restaurant']}")
+        section = (restaurant_id, row['category']) if row.get('category') else None
+        return restaurant_id, section
+
+    missing = set()
+    for row in read_catalog(path):
+        _, section = resolve(row)
+        if section and section not in sections:
+            missing.add(section)
+
+    now = datetime.utcnow()
+    columns = ('name', 'description', 'price', 'image_url', 'is_available', 'is_active',
+               'preparation_time', 'restaurant_id', 'category_id', 'created_at')
+
+    def rows():
+        for row in read_catalog(path):
+            restaurant_id, section = resolve(row)
+            yield (row['name'], row.get('description') or None, float(row['price']),
+                   row.get('image_url') or None, True, True, int(row.get('preparation_time') or 15),
+                   restaurant_id, sections[section] if section else None, now)
+
+    # Conexão própria: os PRAGMAs do SQLite só podem mudar fora de transação.
+    # No WAL qualquer conexão aberta ao arquivo impede a trava exclusiva,
+    # inclusive as ociosas do próprio pool
+    db.session.remove()
+    db.engine.dispose()
+    with db.engine.connect() as connection, load_profile(connection):
+        with connection.begin():
+            for restaurant_id, name in sorted(missing):
+                result = connection.execute(ProductCategory.__table__.insert(),
+                                            {'restaurant_id': restaurant_id, 'name': name})
+                sections[(restaurant_id, name)] = result.inserted_primary_key[0]
+
+            loader = BulkLoader(connection, batch_size)
+            loader.load(Product.__table__, columns, rows())
+    return loader
+
+if __name__ == "__main__":
+    from src.main import app
+
+    parser = argparse.ArgumentParser(description='Importa um catálogo de produtos (CSV, JSON ou JSONL)')
+    parser.add_argument('path')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.perf_counter()
+        try:
+            loader = import_catalog(args.path, args.batch_size)
+        except DatabaseInUse as e:
+            sys.exit(str(e))
+        print(f"Produtos importados: {loader.rows} em {time.perf_counter() - started:.1f}s "
+              f"(inserção: {loader.rate:,.0f} linhas/s)")
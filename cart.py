@@ -0,0 +1,63 @@
+from flask import Blueprint, request, jsonify
+from src.routes.auth import token_required
+from src.services.cart_store import cart_store, CartError
+from src.services.checkout import place_order, CheckoutError
+
+cart_bp = Blueprint('cart', __name__)
+
+@cart_bp.route('', methods=['GET'])
+@token_required
+def get_cart(current_user):
+    return jsonify({'cart': cart_store.serialize(current_user.id)}), 200
+
+@cart_bp.route('/add', methods=['POST'])
+@token_required
+def add_to_cart(current_user):
+    # Só o KV é escrito; o banco recebe o carrinho no checkout ou por TTL
+    data = request.get_json() or {}
+    if not isinstance(data.get('product_id'), int):
+        return jsonify({'message': 'product_id is required'}), 400
+
+    try:
+        cart = cart_store.add(current_user.id, data['product_id'], data.get('quantity', 1), data.get('notes') or None)
+    except CartError as e:
+        return jsonify({'message': e.message}), e.status_code
+
+    return jsonify({'message': 'Item added to cart', 'cart': cart_store.to_dict(cart)}), 200
+
+@cart_bp.route('/remove/<int:item_id>', methods=['DELETE'])
+@token_required
+def remove_from_cart(current_user, item_id):
+    try:
+        cart = cart_store.remove(current_user.id, item_id)
+    except CartError as e:
+        return jsonify({'message': e.message}), e.status_code
+
+    return jsonify({'message': 'Item removed from cart', 'cart': cart_store.to_dict(cart)}), 200
+
+@cart_bp.route('/clear', methods=['DELETE'])
+@token_required
+def clear_cart(current_user):
+    cart_store.clear(current_user.id)
+    return jsonify({'message': 'Cart cleared', 'cart': None}), 200
+
+@cart_bp.route('/checkout', methods=['POST'])
+@token_required
+def checkout(current_user):
+    # Converte o carrinho do KV em pedido; o endereço vem em delivery_address
+    # ou nos próprios campos do corpo. Idempotency-Key repetida devolve o
+    # pedido já criado (200) em vez de criar outro.
+    data = request.get_json() or {}
+    address = data.get('delivery_address') or data
+    if not isinstance(address, dict):
+        return jsonify({'message': 'delivery_address must be an object'}), 400
+
+    try:
+        order, created = place_order(current_user, address, data.get('payment_method'), data.get('notes'),
+                                     request.headers.get('Idempotency-Key'))
+    except CheckoutError as e:
+        return jsonify({'message': e.message}), e.status_code
+
+    if created:
+        return jsonify({'message': 'Order created successfully', 'order': order.to_dict()}), 201
+    return jsonify({'message': 'Order already created', 'order': order.to_dict()}), 200
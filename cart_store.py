@@ -0,0 +1,458 @@
+import argparse
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy.orm import selectinload
+from src.models.events import on_commit
+from src.models.user import db
+from src.models.restaurant import Product
+from src.models.order import Cart, CartItem
+from src.services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+class CartError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+class MemoryBackend:
+    # Carrinhos no próprio processo: só serve com um único worker (ou em
+    # testes). O que estiver aqui na saída do processo é gravado no banco.
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        return entry[0] if entry else None
+
+    def update(self, key, function, ttl):
+        # Leitura-modificação-escrita atômica; function(None) para chave ausente
+        with self._lock:
+            entry = self._data.get(key)
+            value = function(entry[0] if entry else None)
+            if value is None:
+                self._data.pop(key, None)
+            else:
+                self._data[key] = (value, time.time() + ttl)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def claim_expired(self, now, lease, limit):
+        # Reserva as entradas vencidas por `lease` segundos e devolve
+        # [(chave, valor, novo vencimento)] para quem for gravá-las
+        with self._lock:
+            claimed = []
+            for key, (value, expires_at) in self._data.items():
+                if len(claimed) >= limit:
+                    break
+                if expires_at <= now:
+                    claimed.append((key, value, now + lease))
+            for key, value, expires_at in claimed:
+                self._data[key] = (value, expires_at)
+        return claimed
+
+    def commit_claimed(self, entries, persist):
+        # Chama persist(chaves) só com as entradas que não mudaram desde a
+        # reserva e as remove; ninguém altera o KV até persist terminar
+        with self._lock:
+            keys = [key for key, value, expires_at in entries if self._data.get(key) == (value, expires_at)]
+            persist(keys)
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def items(self):
+        with self._lock:
+            return [(key, value, expires_at) for key, (value, expires_at) in self._data.items()]
+
+class SQLiteBackend:
+    # Substituto local de um KV em rede (Redis/Memcached): um arquivo SQLite
+    # em WAL compartilhado pelos workers da máquina. As conexões ficam num
+    # pool por processo e são emprestadas a cada operação, e não presas a
+    # uma thread: com workers gevent cada requisição é um greenlet, e uma
+    # conexão por greenlet seria uma conexão nova por requisição.
+    # Sobrevive a reinícios, então não há o que gravar na saída.
+
+    def __init__(self, path):
+        self.path = path
+        self._idle = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS cart_kv '
+                           '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS ix_cart_kv_expires_at ON cart_kv (expires_at)')
+        return connection
+
+    @contextmanager
+    def _connection(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Conexões herdadas de um fork ficam com o processo pai
+                self._idle, self._pid = [], os.getpid()
+            connection = self._idle.pop() if self._idle else None
+        if connection is None:
+            connection = self._open()
+        try:
+            yield connection
+        finally:
+            with self._lock:
+                if self._pid == os.getpid():
+                    self._idle.append(connection)
+
+    def get(self, key):
+        with self._connection() as connection:
+            row = connection.execute('SELECT value FROM cart_kv WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def update(self, key, function, ttl):
+        with self._connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = connection.execute('SELECT value FROM cart_kv WHERE key = ?', (key,)).fetchone()
+                value = function(row[0] if row else None)
+                if value is None:
+                    connection.execute('DELETE FROM cart_kv WHERE key = ?', (key,))
+                else:
+                    connection.execute('INSERT INTO cart_kv (key, value, expires_at) VALUES (?, ?, ?) '
+                                       'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                                       'expires_at = excluded.expires_at', (key, value, time.time() + ttl))
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        return value
+
+    def delete(self, key):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM cart_kv WHERE key = ?', (key,))
+
+    def claim_expired(self, now, lease, limit):
+        with self._connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                rows = connection.execute('SELECT key, value FROM cart_kv WHERE expires_at <= ? LIMIT ?',
+                                          (now, limit)).fetchall()
+                connection.executemany('UPDATE cart_kv SET expires_at = ? WHERE key = ?',
+                                       [(now + lease, key) for key, _ in rows])
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        return [(key, value, now + lease) for key, value in rows]
+
+    def commit_claimed(self, entries, persist):
+        # A transação do KV fica aberta durante persist: um checkout que
+        # apague a chave nesse meio tempo espera, e um que já a apagou tira
+        # o carrinho da gravação
+        claimed = {key: (value, expires_at) for key, value, expires_at in entries}
+        with self._connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                keys, candidates = [], list(claimed)
+                for start in range(0, len(candidates), 500):
+                    chunk = candidates[start:start + 500]
+                    rows = connection.execute(
+                        f"SELECT key, value, expires_at FROM cart_kv WHERE key IN ({', '.join('?' * len(chunk))})",
+                        chunk).fetchall()
+                    keys.extend(key for key, value, expires_at in rows if claimed[key] == (value, expires_at))
+                persist(keys)
+                connection.executemany('DELETE FROM cart_kv WHERE key = ?', [(key,) for key in keys])
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        return len(keys)
+
+    def items(self):
+        return []
+
+class CartStore:
+    # Carrinhos ativos ficam no KV, não no banco: adicionar e remover itens
+    # não escreve em cart/cart_item. O carrinho vai para o SQL só no
+    # checkout (vira pedido) ou quando fica ttl segundos parado; a varredura
+    # dos vencidos roda numa thread à parte (start), a cada sweep_interval
+    # segundos, com sessão própria e fora das requisições. Um carrinho
+    # ausente do KV é carregado do banco, onde pode ter ficado gravado por
+    # TTL. Os totais usam preços de produto em cache; o checkout sempre
+    # reprecifica pelo banco.
+
+    def __init__(self, backend=None, ttl=1800, sweep_interval=60, lease=60, batch_size=500):
+        self.backend = backend or MemoryBackend()
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.lease = lease
+        self.batch_size = batch_size
+        self.products = TTLCache(maxsize=20000, ttl=60)
+        self._app = None
+        self._thread = None
+
+    def init_app(self, app, default_path):
+        # CART_STORE=memory ou o caminho do arquivo do KV (padrão: default_path)
+        location = os.environ.get('CART_STORE', default_path)
+        self.backend = MemoryBackend() if location == 'memory' else SQLiteBackend(location)
+        self.ttl = int(os.environ.get('CART_TTL', self.ttl))
+        self._app = app
+        atexit.register(self.flush_all)
+
+    @staticmethod
+    def _key(user_id):
+        return f'cart:{user_id}'
+
+    def _update(self, user_id, function):
+        def apply(raw):
+            cart = function(json.loads(raw) if raw else None)
+            return json.dumps(cart) if cart is not None else None
+        raw = self.backend.update(self._key(user_id), apply, self.ttl)
+        return json.loads(raw) if raw else None
+
+    def get(self, user_id):
+        raw = self.backend.get(self._key(user_id))
+        if raw is not None:
+            return json.loads(raw)
+
+        stored = self._load(user_id)
+        if stored is None:
+            return None
+        # Quem escreveu no KV enquanto o banco era lido prevalece
+        return self._update(user_id, lambda current: current if current is not None else stored)
+
+    def add(self, user_id, product_id, quantity=1, notes=None):
+        if not isinstance(quantity, int) or isinstance(quantity, bool) or not 1 <= quantity <= 99:
+            raise CartError('Quantity must be between 1 and 99')
+        product = self._products([product_id]).get(product_id)
+        if not product or not product['is_active'] or not product['is_available']:
+            raise CartError('Product is not available', 404)
+
+        self.get(user_id)
+        now = datetime.utcnow().isoformat()
+
+        def add_item(cart):
+            cart = cart if cart and cart['items'] else self._empty(user_id, now)
+            if cart['restaurant_id'] not in (None, product['restaurant_id']):
+                raise CartError('Cart has items from another restaurant')
+            cart['restaurant_id'] = product['restaurant_id']
+            for item in cart['items']:
+                if item['product_id'] == product_id and item['notes'] == notes:
+                    item['quantity'] = min(99, item['quantity'] + quantity)
+                    break
+            else:
+                cart['next_item_id'] += 1
+                cart['items'].append({'id': cart['next_item_id'], 'product_id': product_id,
+                                      'quantity': quantity, 'notes': notes})
+            cart['updated_at'] = now
+            return cart
+
+        return self._update(user_id, add_item)
+
+    def remove(self, user_id, item_id):
+        if self.get(user_id) is None:
+            raise CartError('Cart not found', 404)
+
+        def remove_item(cart):
+            items = [item for item in (cart or {}).get('items', []) if item['id'] != item_id]
+            if cart is None or len(items) == len(cart['items']):
+                raise CartError('Item not found', 404)
+            cart['items'] = items
+            if not items:
+                cart['restaurant_id'] = None
+            cart['updated_at'] = datetime.utcnow().isoformat()
+            return cart
+
+        return self._update(user_id, remove_item)
+
+    def clear(self, user_id):
+        # Carrinho vazio em vez de apagar a chave, para que uma cópia antiga
+        # gravada no banco não seja recarregada; some do banco no próximo flush
+        now = datetime.utcnow().isoformat()
+        return self._update(user_id, lambda cart: self._empty(user_id, now))
+
+    def discard(self, user_id):
+        # Depois do checkout: o pedido já foi gravado e o carrinho, apagado do banco
+        self.backend.delete(self._key(user_id))
+
+    @staticmethod
+    def _empty(user_id, now):
+        return {'user_id': user_id, 'restaurant_id': None, 'next_item_id': 0, 'items': [],
+                'created_at': now, 'updated_at': now}
+
+    def _products(self, product_ids):
+        products, missing = {}, []
+        for product_id in set(product_ids):
+            cached = self.products.get(product_id)
+            if cached is None:
+                missing.append(product_id)
+            else:
+                products[product_id] = cached
+        if missing:
+            for product in Product.query.filter(Product.id.in_(missing)):
+                data = product.to_dict()
+                self.products.set(product.id, data)
+                products[product.id] = data
+        return products
+
+    def to_dict(self, cart):
+        # Mesmo formato de Cart.to_dict(); None para carrinho ausente ou vazio
+        if not cart or not cart['items']:
+            return None
+        products = self._products([item['product_id'] for item in cart['items']])
+        items = []
+        for item in cart['items']:
+            product = products.get(item['product_id'])
+            unit_price = product['price'] if product else 0.0
+            items.append({
+                'id': item['id'],
+                'product_id': item['product_id'],
+                'quantity': item['quantity'],
+                'unit_price': unit_price,
+                'total_price': unit_price * item['quantity'],
+                'notes': item['notes'],
+                'product': product
+            })
+        return {
+            'id': None,
+            'user_id': cart['user_id'],
+            'restaurant_id': cart['restaurant_id'],
+            'total': sum(item['total_price'] for item in items),
+            'items': items,
+            'created_at': cart['created_at'],
+            'updated_at': cart['updated_at']
+        }
+
+    def serialize(self, user_id):
+        return self.to_dict(self.get(user_id))
+
+    def _load(self, user_id):
+        stored = Cart.query.options(selectinload(Cart.items)).filter_by(user_id=user_id).first()
+        if stored is None or not stored.items:
+            return None
+        items = [{'id': index, 'product_id': item.product_id, 'quantity': item.quantity, 'notes': item.notes}
+                 for index, item in enumerate(sorted(stored.items, key=lambda item: item.id), 1)]
+        return {'user_id': user_id, 'restaurant_id': stored.restaurant_id, 'next_item_id': len(items),
+                'items': items,
+                'created_at': (stored.created_at or datetime.utcnow()).isoformat(),
+                'updated_at': (stored.updated_at or datetime.utcnow()).isoformat()}
+
+    @staticmethod
+    def delete_stored(user_ids):
+        # Apaga os carrinhos gravados desses usuários (na transação corrente);
+        # sem nada gravado, custa só um SELECT
+        cart_ids = [cart_id for cart_id, in db.session.query(Cart.id).filter(Cart.user_id.in_(user_ids))]
+        if not cart_ids:
+            return
+        CartItem.query.filter(CartItem.cart_id.in_(cart_ids)).delete(synchronize_session=False)
+        Cart.query.filter(Cart.id.in_(cart_ids)).delete(synchronize_session=False)
+
+    def persist(self, carts):
+        # Substitui no banco os carrinhos informados numa única transação, com
+        # um INSERT em lote para os carrinhos e outro para os itens; os
+        # vazios apenas apagam o que houver gravado
+        if not carts:
+            return
+        self.delete_stored([cart['user_id'] for cart in carts])
+        products = self._products([item['product_id'] for cart in carts for item in cart['items']])
+        carts = [dict(cart, items=[item for item in cart['items'] if item['product_id'] in products])
+                 for cart in carts]
+        carts = [cart for cart in carts if cart['items']]
+        if carts:
+            table = Cart.__table__
+            # Um carrinho por usuário: o user_id devolvido liga itens e carrinho
+            ids = dict((user_id, cart_id) for cart_id, user_id in db.session.execute(
+                table.insert().returning(table.c.id, table.c.user_id),
+                [{'user_id': cart['user_id'], 'restaurant_id': cart['restaurant_id'],
+                  'created_at': datetime.fromisoformat(cart['created_at']),
+                  'updated_at': datetime.fromisoformat(cart['updated_at'])} for cart in carts]))
+            db.session.execute(CartItem.__table__.insert(), [
+                {'cart_id': ids[cart['user_id']], 'product_id': item['product_id'], 'quantity': item['quantity'],
+                 'unit_price': products[item['product_id']]['price'],
+                 'total_price': products[item['product_id']]['price'] * item['quantity'],
+                 'notes': item['notes']}
+                for cart in carts for item in cart['items']])
+        db.session.commit()
+
+    def flush_expired(self, now=None):
+        # Grava no banco os carrinhos parados há mais de ttl e tira-os do KV.
+        # A reserva (lease) evita que dois workers gravem o mesmo carrinho;
+        # se a gravação falhar, eles voltam a vencer ao fim da reserva. Os
+        # carrinhos alterados ou apagados (checkout) depois da reserva ficam
+        # de fora, para que o pedido feito não volte como carrinho gravado.
+        flushed = 0
+        while True:
+            claimed = self.backend.claim_expired(now or time.time(), self.lease, self.batch_size)
+            if not claimed:
+                return flushed
+            carts = {key: json.loads(value) for key, value, _ in claimed}
+            flushed += self.backend.commit_claimed(claimed, lambda keys: self.persist([carts[key] for key in keys]))
+            if len(claimed) < self.batch_size:
+                return flushed
+
+    def start(self, app):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, args=(app,), name='cart-sweeper', daemon=True)
+        self._thread.start()
+
+    def _loop(self, app):
+        # Cada rodada no seu app context: sessão própria, descartada ao fim
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                with app.app_context():
+                    self.flush_expired()
+            except Exception:
+                logger.exception('Cart sweep failed')
+
+    def flush_all(self):
+        # Na saída do processo: o que só existe na memória vai para o banco
+        entries = self.backend.items()
+        if not entries or self._app is None:
+            return
+        with self._app.app_context():
+            self.persist([json.loads(value) for _, value, _ in entries])
+
+cart_store = CartStore()
+
+@on_commit(Product)
+def _refresh_prices(changes):
+    for change in changes:
+        if 'id' in change.values:
+            cart_store.products.pop(change.values['id'])
+        else:
+            cart_store.products.clear()
+
+if __name__ == '__main__':
+    # Varredura dedicada: python -m src.services.cart_store (com
+    # CART_SWEEP_ENABLED=0 nos workers)
+    from src.main import app
+
+    parser = argparse.ArgumentParser(description='Grava no banco os carrinhos parados há mais de CART_TTL segundos')
+    parser.add_argument('--interval', type=float, default=cart_store.sweep_interval)
+    parser.add_argument('--once', action='store_true', help='executa uma rodada e sai')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        with app.app_context():
+            flushed = cart_store.flush_expired()
+        if flushed or args.once:
+            print(f"{flushed} carrinho(s) gravado(s) no banco")
+        if args.once:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,67 @@
+import hashlib
+import re
+from flask import current_app, g, request
+from src.models.events import on_commit
+from src.models.restaurant import Category, Restaurant, ProductCategory, Product
+from src.services.cache import TTLCache
+
+# Leituras públicas do catálogo: lista, detalhe e categorias
+CATALOG_PATH = re.compile(r'^/api/restaurants(/categories|/\d+)?/?$')
+
+class CatalogCache:
+    # Cache de respostas versionado. Qualquer escrita no catálogo avança a
+    # versão, o que descarta todas as respostas guardadas neste processo; o
+    # TTL limita a defasagem em relação às escritas de outros workers.
+
+    def __init__(self, maxsize=2048, ttl=30):
+        self.version = 0
+        self.responses = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def init_app(self, app):
+        app.before_request(self._serve_cached)
+        app.after_request(self._store)
+
+    def invalidate(self):
+        self.version += 1
+        self.responses.clear()
+
+    def _cacheable(self):
+        return request.method == 'GET' and CATALOG_PATH.match(request.path)
+
+    def _serve_cached(self):
+        if not self._cacheable():
+            return None
+
+        key = (self.version, request.full_path)
+        entry = self.responses.get(key)
+        if entry is None:
+            g.catalog_cache_key = key
+            return None
+
+        body, etag, mimetype = entry
+        response = current_app.response_class(body, mimetype=mimetype)
+        self._finish(response, etag)
+        return response
+
+    def _finish(self, response, etag):
+        response.set_etag(etag)
+        # Permite guardar, mas exige revalidação (If-None-Match) a cada uso
+        response.headers['Cache-Control'] = 'no-cache'
+        response.make_conditional(request)
+
+    def _store(self, response):
+        key = g.pop('catalog_cache_key', None)
+        if key is None or response.status_code != 200 or response.direct_passthrough:
+            return response
+
+        body = response.get_data()
+        etag = hashlib.sha1(body).hexdigest()
+        self.responses.set(key, (body, etag, response.mimetype))
+        self._finish(response, etag)
+        return response
+
+catalog_cache = CatalogCache()
+
+@on_commit(Restaurant, Product, ProductCategory, Category)
+def _invalidate_catalog(changes):
+    catalog_cache.invalidate()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import re
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import text
+from src.models.user import db
+from src.models.order import Order, OrderItem, Review, Cart, CartItem
+from src.main import app
+
+# Consultas canônicas dos caminhos de pedido e carrinho: (nome, tabela, consulta)
+def canonical_queries():
+    return [
+        ('meus pedidos', 'order',
+         Order.query.filter(Order.user_id == 1).order_by(Order.created_at.desc())),
+        ('pedidos abertos do restaurante', 'order',
+         Order.query.filter(Order.restaurant_id == 1, Order.status == 'pending')
+         .order_by(Order.created_at)),
+        ('pedidos por status', 'order',
+         Order.query.filter(Order.status == 'delivered', Order.created_at < '2024-01-01')),
+        ('itens do pedido', 'order_item', OrderItem.query.filter(OrderItem.order_id == 1)),
+        ('carrinho do usuário', 'cart', Cart.query.filter(Cart.user_id == 1)),
+        ('itens do carrinho', 'cart_item', CartItem.query.filter(CartItem.cart_id == 1)),
+        ('avaliações do restaurante', 'review', Review.query.filter(Review.restaurant_id == 1)),
+    ]
+
+def ensure_indexes():
+    # db.create_all() não cria índices em tabelas que já existem
+    created = []
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+            created.append(index.name)
+    return created
+
+def _sql(query):
+    return str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+def _sqlite_plan(connection, sql, table):
+    details = [row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+    scan = re.compile(rf'^SCAN "?{re.escape(table)}"?( |$)')
+    regressed = any(scan.match(detail) for detail in details)
+    return details, regressed
+
+def _postgresql_plan(connection, sql, table):
+    # Em tabelas pequenas o planner prefere Seq Scan de qualquer forma;
+    # desligá-lo mostra se existe um índice utilizável
+    connection.execute(text('SET LOCAL enable_seqscan = off'))
+    plan = connection.execute(text(f'EXPLAIN (FORMAT JSON) {sql}')).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    details, regressed = [], False
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        details.append(f"{node['Node Type']} {node.get('Relation Name', '')}".strip())
+        if node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == table:
+            regressed = True
+        nodes.extend(node.get('Plans', []))
+    return details, regressed
+
+def check_plans():
+    dialect = db.engine.dialect.name
+    explain = {'sqlite': _sqlite_plan, 'postgresql': _postgresql_plan}.get(dialect)
+    if explain is None:
+        raise SystemExit(f'Dialeto não suportado: {dialect}')
+
+    failures = []
+    with db.engine.connect() as connection:
+        for name, table, query in canonical_queries():
+            with connection.begin():
+                details, regressed = explain(connection, _sql(query), table)
+            print(f"[{'FALHA' if regressed else 'ok'}] {name}: {' | '.join(details)}")
+            if regressed:
+                failures.append(name)
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Verifica os planos das consultas de pedidos e carrinho')
+    parser.add_argument('--create-indexes', action='store_true',
+                        help='cria os índices declarados nos modelos que ainda não existem')
+    args = parser.parse_args()
+
+    with app.app_context():
+        if args.create_indexes:
+            print(f"Índices verificados: {len(ensure_indexes())}")
+
+        failures = check_plans()
+        if failures:
+            print(f"\n{len(failures)} consulta(s) com varredura sequencial: {', '.join(failures)}")
+            sys.exit(1)
+        print("\nNenhuma consulta com varredura sequencial.")
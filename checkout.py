@@ -0,0 +1,257 @@
+import atexit
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.restaurant import Restaurant, Product
+from src.models.order import Order, OrderItem, OrderNode
+from src.services.cart_store import cart_store
+
+PAYMENT_METHODS = ('credit_card', 'debit_card', 'pix', 'cash')
+ADDRESS_FIELDS = ('street', 'number', 'complement', 'neighborhood', 'city', 'state', 'zip_code')
+ORDER_NUMBER_ATTEMPTS = 3
+
+class CheckoutError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+class OrderNumberGenerator:
+    # Números de pedido no estilo Snowflake, sem consulta ao banco a cada
+    # pedido: 41 bits de milissegundos desde EPOCH_MS, 10 bits de nó e 12
+    # bits de sequência, em base 36 (no máximo 13 caracteres). O nó precisa
+    # ser único entre todos os processos de todos os servidores: vem de
+    # ORDER_NODE_ID (0-1023) ou é concedido pelo banco (tabela order_node)
+    # a cada worker, por lease_seconds, e renovado na metade do prazo.
+
+    EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    NODES = 1024
+
+    def __init__(self, node_id=None, lease_seconds=None):
+        self._configured_node = node_id
+        self.lease_seconds = lease_seconds or int(os.environ.get('ORDER_NODE_LEASE_SECONDS', 3600))
+        self._lock = threading.Lock()
+        self._pid = None
+        self._owner = None
+        self._renew_at = None
+
+    def _reset(self):
+        # Após o fork do gunicorn cada worker recomeça com o seu próprio nó
+        node, self._owner = self._configured_node, None
+        if node is None and os.environ.get('ORDER_NODE_ID'):
+            node = int(os.environ['ORDER_NODE_ID'])
+        if node is None:
+            self._owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+            node = self._lease()
+            atexit.register(self._release)
+        elif not 0 <= node < self.NODES:
+            raise ValueError(f'ORDER_NODE_ID must be between 0 and {self.NODES - 1}')
+        self.node_id = node
+        self._pid = os.getpid()
+        self._last_ms = 0
+        self._sequence = 0
+
+    def _lease(self):
+        # Primeiro um nó nunca usado; depois o de concessão vencida há mais
+        # tempo. Dois processos disputando o mesmo nó: um deles recomeça.
+        table = OrderNode.__table__
+        for _ in range(5):
+            now = datetime.utcnow()
+            values = {'owner': self._owner, 'expires_at': now + timedelta(seconds=self.lease_seconds)}
+            try:
+                with db.engine.begin() as connection:
+                    used = connection.execute(select(func.count()).select_from(table)).scalar()
+                    if used < self.NODES:
+                        connection.execute(table.insert().values(node_id=used, **values))
+                        node = used
+                    else:
+                        node = connection.execute(select(table.c.node_id).where(table.c.expires_at < now)
+                                                  .order_by(table.c.expires_at).limit(1)).scalar()
+                        if node is None:
+                            raise RuntimeError(f'All {self.NODES} order node ids are leased; '
+                                               'set ORDER_NODE_ID or lower ORDER_NODE_LEASE_SECONDS')
+                        claimed = connection.execute(table.update().where(table.c.node_id == node,
+                                                                          table.c.expires_at < now).values(**values))
+                        if claimed.rowcount != 1:
+                            continue
+            except IntegrityError:
+                continue
+            self._renew_at = now + timedelta(seconds=self.lease_seconds / 2)
+            return node
+        raise RuntimeError('Could not lease an order node id')
+
+    def _renew(self, now):
+        # Renova a concessão; se ela venceu e outro processo ficou com o nó,
+        # troca de nó (a sequência recomeça, sem colidir com o novo dono)
+        table = OrderNode.__table__
+        with db.engine.begin() as connection:
+            renewed = connection.execute(table.update().where(table.c.node_id == self.node_id,
+                                                              table.c.owner == self._owner)
+                                         .values(expires_at=now + timedelta(seconds=self.lease_seconds)))
+        if renewed.rowcount == 1:
+            self._renew_at = now + timedelta(seconds=self.lease_seconds / 2)
+        else:
+            self.node_id = self._lease()
+            self._last_ms = 0
+            self._sequence = 0
+
+    def _release(self):
+        if self._pid != os.getpid() or self._owner is None:
+            return
+        table = OrderNode.__table__
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(table.update().where(table.c.node_id == self.node_id, table.c.owner == self._owner)
+                                   .values(expires_at=datetime.utcnow()))
+        except Exception:
+            # Na saída do processo; a concessão vence sozinha
+            pass
+
+    def next(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            elif self._owner is not None and datetime.utcnow() >= self._renew_at:
+                self._renew(datetime.utcnow())
+
+            now = int(time.time() * 1000)
+            if now <= self._last_ms:
+                # Mesmo milissegundo (ou relógio voltando): avança a sequência
+                # e, se ela se esgotar, adianta o relógio lógico em 1 ms
+                now = self._last_ms
+                self._sequence = (self._sequence + 1) & 0xFFF
+                if self._sequence == 0:
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+
+            value = ((now - self.EPOCH_MS) << 22) | (self.node_id << 12) | self._sequence
+
+        digits = []
+        while value:
+            value, remainder = divmod(value, 36)
+            digits.append(self.ALPHABET[remainder])
+        return ''.join(reversed(digits)) or '0'
+
+order_numbers = OrderNumberGenerator()
+
+def _existing_order(user_id, idempotency_key):
+    if not idempotency_key:
+        return None
+    return Order.query.filter_by(user_id=user_id, idempotency_key=idempotency_key).first()
+
+def _coordinates(address):
+    # Coordenadas do endereço, opcionais; usadas no despacho dos entregadores
+    try:
+        latitude, longitude = float(address['latitude']), float(address['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None, None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None, None
+    return latitude, longitude
+
+def place_order(user, address, payment_method, notes=None, idempotency_key=None):
+    # Converte o carrinho do usuário em pedido numa única transação curta.
+    # Retorna (pedido, criado); repetir a chamada com a mesma idempotency_key
+    # devolve o pedido original sem cobrar de novo.
+    if payment_method not in PAYMENT_METHODS:
+        raise CheckoutError('Invalid payment method')
+
+    missing = [field for field in ADDRESS_FIELDS if field != 'complement' and not address.get(field)]
+    if missing:
+        raise CheckoutError(f"Missing address fields: {', '.join(missing)}")
+
+    if idempotency_key and len(idempotency_key) > 64:
+        raise CheckoutError('Idempotency key is too long')
+
+    existing = _existing_order(user.id, idempotency_key)
+    if existing:
+        return existing, False
+
+    cart = cart_store.get(user.id)
+    if not cart or not cart['items']:
+        raise CheckoutError('Cart is empty')
+
+    restaurant = Restaurant.query.get(cart['restaurant_id'])
+    if not restaurant or not restaurant.is_active or not restaurant.is_online:
+        raise CheckoutError('Restaurant is not accepting orders')
+
+    # Preços atuais dos produtos, lidos do banco (não do cache do carrinho)
+    products = {product.id: product for product in
+                Product.query.filter(Product.id.in_([item['product_id'] for item in cart['items']]))}
+    items = []
+    for item in cart['items']:
+        product = products.get(item['product_id'])
+        if (not product or not product.is_active or not product.is_available
+                or product.restaurant_id != restaurant.id):
+            raise CheckoutError(f"Product {item['product_id']} is not available")
+        items.append({
+            'product_id': product.id,
+            'quantity': item['quantity'],
+            'unit_price': product.price,
+            'total_price': product.price * item['quantity'],
+            'notes': item['notes']
+        })
+
+    subtotal = sum(item['total_price'] for item in items)
+    if subtotal < (restaurant.minimum_order or 0):
+        raise CheckoutError('Order is below the restaurant minimum')
+
+    delivery_fee = restaurant.delivery_fee or 0.0
+    latitude, longitude = _coordinates(address)
+    values = dict(
+        idempotency_key=idempotency_key,
+        user_id=user.id,
+        restaurant_id=restaurant.id,
+        subtotal=subtotal,
+        delivery_fee=delivery_fee,
+        total=subtotal + delivery_fee,
+        delivery_street=address['street'],
+        delivery_number=address['number'],
+        delivery_complement=address.get('complement'),
+        delivery_neighborhood=address['neighborhood'],
+        delivery_city=address['city'],
+        delivery_state=address['state'],
+        delivery_zip_code=address['zip_code'],
+        delivery_latitude=latitude,
+        delivery_longitude=longitude,
+        notes=notes,
+        payment_method=payment_method
+    )
+
+    for attempt in range(ORDER_NUMBER_ATTEMPTS):
+        order = Order(order_number=order_numbers.next(), **values)
+        try:
+            db.session.add(order)
+            db.session.flush()
+
+            # Itens em um único executemany; a cópia do carrinho gravada no
+            # banco (se houver) sai com dois DELETEs
+            for item in items:
+                item['order_id'] = order.id
+            db.session.execute(OrderItem.__table__.insert(), items)
+            cart_store.delete_stored([user.id])
+
+            db.session.commit()
+            break
+        except IntegrityError:
+            number = order.order_number
+            db.session.rollback()
+            # Outra requisição com a mesma chave venceu a corrida
+            existing = _existing_order(user.id, idempotency_key)
+            if existing:
+                return existing, False
+            # Número já usado (nó repetido entre processos): tenta outro
+            if attempt == ORDER_NUMBER_ATTEMPTS - 1 or not Order.query.filter_by(order_number=number).first():
+                raise
+
+    cart_store.discard(user.id)
+    return order, True
@@ -0,0 +1,69 @@
+from src.models.user import db
+from datetime import datetime
+
+class Courier(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
+    
+    # offline, available, delivering
+    status = db.Column(db.String(20), nullable=False, default='offline', index=True)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    capacity = db.Column(db.Integer, nullable=False, default=3)  # pedidos por viagem
+    
+    last_seen_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relacionamentos
+    user = db.relationship('User', backref=db.backref('courier', uselist=False))
+    assignments = db.relationship('DeliveryAssignment', backref='courier', lazy=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'status': self.status,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'capacity': self.capacity,
+            'last_seen_at': self.last_seen_at.isoformat() if self.last_seen_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+class DeliveryAssignment(db.Model):
+    __table_args__ = (
+        # Entregas em aberto, no total e de cada entregador
+        db.Index('ix_delivery_assignment_status', 'status'),
+        db.Index('ix_delivery_assignment_courier_status', 'courier_id', 'status'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Relacionamentos; um pedido é atribuído a no máximo um entregador
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, unique=True)
+    courier_id = db.Column(db.Integer, db.ForeignKey('courier.id'), nullable=False)
+    
+    # Pedidos retirados juntos compartilham o batch; sequence é a ordem de entrega
+    batch = db.Column(db.String(32), nullable=False)
+    sequence = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default='assigned')  # assigned, picked_up, delivered
+    
+    assigned_at = db.Column(db.DateTime, default=datetime.utcnow)
+    picked_up_at = db.Column(db.DateTime, nullable=True)
+    delivered_at = db.Column(db.DateTime, nullable=True)
+    
+    # Relacionamentos
+    order = db.relationship('Order', backref=db.backref('assignment', uselist=False))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_id': self.order_id,
+            'courier_id': self.courier_id,
+            'batch': self.batch,
+            'sequence': self.sequence,
+            'status': self.status,
+            'assigned_at': self.assigned_at.isoformat() if self.assigned_at else None,
+            'picked_up_at': self.picked_up_at.isoformat() if self.picked_up_at else None,
+            'delivered_at': self.delivered_at.isoformat() if self.delivered_at else None
+        }
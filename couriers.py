@@ -0,0 +1,118 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from src.models.user import db
+from src.models.order import Order
+from src.models.courier import Courier, DeliveryAssignment
+from src.routes.auth import token_required
+from src.services.dispatch import dispatcher
+
+couriers_bp = Blueprint('couriers', __name__)
+
+COURIER_STATUSES = ('offline', 'available')
+
+def _current_courier(user):
+    if user.user_type != 'courier':
+        return None
+    return Courier.query.filter_by(user_id=user.id).first()
+
+@couriers_bp.route('/me', methods=['PUT'])
+@token_required
+def update_courier(current_user):
+    # Posição e disponibilidade enviadas periodicamente pelo app do entregador
+    if current_user.user_type != 'courier':
+        return jsonify({'message': 'Access denied'}), 403
+
+    data = request.get_json() or {}
+    courier = Courier.query.filter_by(user_id=current_user.id).first()
+    if not courier:
+        courier = Courier(user_id=current_user.id)
+        db.session.add(courier)
+
+    try:
+        if 'latitude' in data or 'longitude' in data:
+            latitude, longitude = float(data['latitude']), float(data['longitude'])
+            if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                raise ValueError()
+            courier.latitude, courier.longitude = latitude, longitude
+        if 'capacity' in data:
+            courier.capacity = max(1, int(data['capacity']))
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'message': 'Invalid coordinates or capacity'}), 400
+
+    if 'status' in data:
+        if data['status'] not in COURIER_STATUSES:
+            return jsonify({'message': 'Invalid status'}), 400
+        # Em rota o entregador só volta a ficar livre ao concluir as entregas
+        if courier.status != 'delivering':
+            courier.status = data['status']
+
+    courier.last_seen_at = datetime.utcnow()
+    db.session.commit()
+    if courier.status == 'available':
+        dispatcher.wake()
+
+    return jsonify({'courier': courier.to_dict()}), 200
+
+@couriers_bp.route('/me/assignments', methods=['GET'])
+@token_required
+def get_assignments(current_user):
+    courier = _current_courier(current_user)
+    if not courier:
+        return jsonify({'message': 'Courier not found'}), 404
+
+    assignments = (DeliveryAssignment.query
+                   .filter(DeliveryAssignment.courier_id == courier.id,
+                           DeliveryAssignment.status != 'delivered')
+                   .order_by(DeliveryAssignment.batch, DeliveryAssignment.sequence)
+                   .all())
+    orders = {order.id: order for order in
+              Order.with_items().filter(Order.id.in_([a.order_id for a in assignments]))} if assignments else {}
+
+    result = []
+    for assignment in assignments:
+        data = assignment.to_dict()
+        data['order'] = orders[assignment.order_id].to_dict()
+        result.append(data)
+    return jsonify({'assignments': result}), 200
+
+@couriers_bp.route('/me/assignments/<int:order_id>/<action>', methods=['POST'])
+@token_required
+def update_assignment(current_user, order_id, action):
+    # pickup: pedido retirado (saiu para entrega); deliver: entregue
+    if action not in ('pickup', 'deliver'):
+        return jsonify({'message': 'Invalid action'}), 404
+
+    courier = _current_courier(current_user)
+    if not courier:
+        return jsonify({'message': 'Courier not found'}), 404
+
+    assignment = DeliveryAssignment.query.filter_by(order_id=order_id, courier_id=courier.id).first()
+    if not assignment:
+        return jsonify({'message': 'Assignment not found'}), 404
+
+    now = datetime.utcnow()
+    order = assignment.order
+    if action == 'pickup':
+        if assignment.status != 'assigned':
+            return jsonify({'message': 'Order was already picked up'}), 400
+        assignment.status, assignment.picked_up_at = 'picked_up', now
+        order.status = 'delivering'
+    else:
+        if assignment.status != 'picked_up':
+            return jsonify({'message': 'Order must be picked up first'}), 400
+        assignment.status, assignment.delivered_at = 'delivered', now
+        order.status, order.delivered_at = 'delivered', now
+
+        remaining = (DeliveryAssignment.query
+                     .filter(DeliveryAssignment.courier_id == courier.id,
+                             DeliveryAssignment.status != 'delivered',
+                             DeliveryAssignment.id != assignment.id)
+                     .count())
+        if not remaining:
+            courier.status = 'available'
+
+    db.session.commit()
+    if courier.status == 'available':
+        dispatcher.wake()
+
+    return jsonify({'assignment': assignment.to_dict()}), 200
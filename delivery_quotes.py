@@ -0,0 +1,183 @@
+import numpy as np
+from sqlalchemy import func
+from src.models.events import on_commit
+from src.models.user import db
+from src.models.restaurant import Restaurant, Product
+from src.models.order import Order
+from src.services.cache import TTLCache
+from src.services.geo import EARTH_RADIUS_KM, geohash, geohash_center
+from src.services.order_board import order_boards
+
+# Pedidos que ainda ocupam a cozinha
+KITCHEN_STATUSES = ('pending', 'confirmed', 'preparing')
+
+class QuoteEngine:
+    # Taxa e prazo de entrega por (restaurante, endereço), calculados em lote
+    # com NumPy. O endereço é reduzido à célula geohash (~150 m) e a cotação
+    # base de cada (célula, restaurante) fica em cache: usuários vizinhos
+    # reaproveitam o mesmo cálculo. O carrinho só ajusta o prazo do
+    # restaurante dele, depois do cache.
+    #
+    # distância: haversine x ROAD_FACTOR (ruas não são linha reta)
+    # taxa: delivery_fee do restaurante + FEE_PER_KM acima de FREE_KM,
+    #       com acréscimo de SURGE_PER_ORDER por pedido na fila acima de
+    #       SURGE_QUEUE (até MAX_SURGE)
+    # prazo: preparo + espera da fila + retirada + deslocamento
+
+    ROAD_FACTOR = 1.3
+    SPEED_KMH = 25.0
+    PICKUP_MINUTES = 5.0
+    FREE_KM = 2.0
+    FEE_PER_KM = 1.0
+    SURGE_QUEUE = 5
+    SURGE_PER_ORDER = 0.05
+    MAX_SURGE = 1.5
+    MINUTES_PER_QUEUED_ORDER = 4.0
+    MAX_DISTANCE_KM = 15.0
+    DEFAULT_PREPARATION = 15.0
+
+    def __init__(self, precision=7, ttl=60, maxsize=200000):
+        self.precision = precision
+        self.quotes = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.restaurants = TTLCache(maxsize=20000, ttl=300)
+        self.queues = TTLCache(maxsize=20000, ttl=15)
+
+    def compute(self, lat, lng, r_lat, r_lng, base_fee, preparation, queue):
+        # Núcleo vetorizado: arrays por restaurante -> (distância, taxa, prazo)
+        lat1, lng1 = np.radians(lat), np.radians(lng)
+        lat2, lng2 = np.radians(r_lat), np.radians(r_lng)
+        a = (np.sin((lat2 - lat1) / 2) ** 2
+             + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a)) * self.ROAD_FACTOR
+
+        surge = np.minimum(1 + self.SURGE_PER_ORDER * np.maximum(queue - self.SURGE_QUEUE, 0), self.MAX_SURGE)
+        fee = (base_fee + self.FEE_PER_KM * np.maximum(distance - self.FREE_KM, 0)) * surge
+        eta = (preparation + self.MINUTES_PER_QUEUED_ORDER * queue + self.PICKUP_MINUTES
+               + distance / self.SPEED_KMH * 60)
+        return distance, np.round(fee, 2), np.ceil(eta)
+
+    def quote(self, lat, lng, restaurant_ids, cart=None):
+        # {restaurant_id: cotação}; restaurantes inexistentes ou sem
+        # coordenadas ficam de fora
+        cell = geohash(lat, lng, self.precision)
+        quotes, missing = {}, []
+        for restaurant_id in dict.fromkeys(restaurant_ids):
+            cached = self.quotes.get((cell, restaurant_id))
+            if cached is None:
+                missing.append(restaurant_id)
+            else:
+                quotes[restaurant_id] = cached
+
+        if missing:
+            quotes.update(self._compute_cell(cell, missing))
+
+        if cart is not None and cart['restaurant_id'] in quotes:
+            quotes[cart['restaurant_id']] = self._with_cart(quotes[cart['restaurant_id']], cart)
+        return quotes
+
+    def _compute_cell(self, cell, restaurant_ids):
+        params = self._restaurant_params(restaurant_ids)
+        ids = [restaurant_id for restaurant_id in restaurant_ids if restaurant_id in params]
+        if not ids:
+            return {}
+        queues = self._queue_depths(ids)
+
+        columns = np.array([params[restaurant_id] for restaurant_id in ids], dtype=float).T
+        r_lat, r_lng, base_fee, preparation = columns
+        queue = np.array([queues[restaurant_id] for restaurant_id in ids], dtype=float)
+        lat, lng = geohash_center(cell)
+        distance, fee, eta = self.compute(lat, lng, r_lat, r_lng, base_fee, preparation, queue)
+
+        result = {}
+        for index, restaurant_id in enumerate(ids):
+            quote = {
+                'restaurant_id': restaurant_id,
+                'distance_km': round(float(distance[index]), 2),
+                'delivery_fee': float(fee[index]),
+                'eta_minutes': int(eta[index]),
+                'preparation_minutes': float(preparation[index]),
+                'queue_depth': int(queue[index]),
+                'deliverable': bool(distance[index] <= self.MAX_DISTANCE_KM)
+            }
+            self.quotes.set((cell, restaurant_id), quote)
+            result[restaurant_id] = quote
+        return result
+
+    def _with_cart(self, quote, cart):
+        # O item mais demorado do carrinho define o preparo; produto sem
+        # tempo cadastrado conta com o preparo médio do restaurante
+        times = [item['product']['preparation_time'] or quote['preparation_minutes']
+                 for item in cart['items'] if item['product'] is not None]
+        preparation = float(max(times or [0]) or self.DEFAULT_PREPARATION)
+        quote = dict(quote)
+        quote['eta_minutes'] = int(quote['eta_minutes'] + preparation - quote['preparation_minutes'])
+        quote['preparation_minutes'] = preparation
+        return quote
+
+    def _restaurant_params(self, restaurant_ids):
+        # (lat, lng, taxa base, preparo médio dos produtos) por restaurante
+        params, missing = {}, []
+        for restaurant_id in restaurant_ids:
+            cached = self.restaurants.get(restaurant_id)
+            if cached is None:
+                missing.append(restaurant_id)
+            elif cached is not False:
+                params[restaurant_id] = cached
+        if not missing:
+            return params
+
+        preparation = dict(Product.query
+                           .with_entities(Product.restaurant_id, func.avg(Product.preparation_time))
+                           .filter(Product.restaurant_id.in_(missing), Product.is_active.is_(True))
+                           .group_by(Product.restaurant_id))
+        rows = (Restaurant.query
+                .with_entities(Restaurant.id, Restaurant.latitude, Restaurant.longitude, Restaurant.delivery_fee)
+                .filter(Restaurant.id.in_(missing)))
+        found = set()
+        for restaurant_id, lat, lng, fee in rows:
+            found.add(restaurant_id)
+            if lat is None or lng is None:
+                self.restaurants.set(restaurant_id, False)
+                continue
+            value = (lat, lng, fee or 0.0, float(preparation.get(restaurant_id) or self.DEFAULT_PREPARATION))
+            self.restaurants.set(restaurant_id, value)
+            params[restaurant_id] = value
+        for restaurant_id in set(missing) - found:
+            self.restaurants.set(restaurant_id, False)
+        return params
+
+    def _queue_depths(self, restaurant_ids):
+        # Quadro de pedidos do restaurante quando carregado; senão uma
+        # contagem agrupada (índice restaurant_id, status, created_at)
+        depths, missing = {}, []
+        for restaurant_id in restaurant_ids:
+            depth = order_boards.queue_depth(restaurant_id, KITCHEN_STATUSES)
+            if depth is None:
+                depth = self.queues.get(restaurant_id)
+            if depth is None:
+                missing.append(restaurant_id)
+            else:
+                depths[restaurant_id] = depth
+
+        if missing:
+            counts = dict(db.session.query(Order.restaurant_id, func.count(Order.id))
+                          .filter(Order.restaurant_id.in_(missing), Order.status.in_(KITCHEN_STATUSES))
+                          .group_by(Order.restaurant_id))
+            for restaurant_id in missing:
+                depths[restaurant_id] = counts.get(restaurant_id, 0)
+                self.queues.set(restaurant_id, depths[restaurant_id])
+        return depths
+
+    def invalidate_restaurant(self, restaurant_id):
+        self.restaurants.pop(restaurant_id)
+        self.quotes.discard_where(lambda key, value: key[1] == restaurant_id)
+
+quote_engine = QuoteEngine()
+
+@on_commit(Restaurant)
+def _invalidate_quotes(changes):
+    for change in changes:
+        if change.op == 'update' and not change.changed & {'latitude', 'longitude', 'delivery_fee'}:
+            continue
+        if 'id' in change.values:
+            quote_engine.invalidate_restaurant(change.values['id'])
@@ -0,0 +1,300 @@
+import argparse
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import case, exists, func, literal, select
+from sqlalchemy.exc import IntegrityError
+from src.models.events import on_commit
+from src.models.user import db
+from src.models.restaurant import Restaurant
+from src.models.order import Order
+from src.models.courier import Courier, DeliveryAssignment
+from src.services.geo import GridIndex, haversine_km
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 3           # pedidos por viagem, limitado também pela capacidade do entregador
+PICKUP_RADIUS_KM = 0.5   # retiradas agrupáveis (mesmo restaurante ou vizinhos)
+DROP_RADIUS_KM = 2.5     # entregas agrupáveis em torno da primeira do lote
+MAX_PICKUP_KM = 8.0      # distância máxima do entregador até a retirada
+COURIER_STALE = timedelta(minutes=5)  # sem posição recente o entregador não recebe pedidos
+
+def _route(pickup, drops):
+    # Ordem de entrega pelo vizinho mais próximo a partir da retirada
+    remaining, position, ordered = dict(drops), pickup, []
+    while remaining:
+        order_id = min(remaining, key=lambda key: haversine_km(*position, *remaining[key]))
+        position = remaining.pop(order_id)
+        ordered.append(order_id)
+    return ordered
+
+def _nearest(index, lat, lng, max_km):
+    # Raio crescente: com entregadores por perto evita varrer o raio máximo
+    radius = min(1.0, max_km)
+    while True:
+        match = index.nearby(lat, lng, radius, limit=1)
+        if match or radius >= max_km:
+            return match[0][1] if match else None
+        radius = min(radius * 2, max_km)
+
+def plan(couriers, orders, open_batches, batch_size=BATCH_SIZE, pickup_radius_km=PICKUP_RADIUS_KM,
+         drop_radius_km=DROP_RADIUS_KM, max_pickup_km=MAX_PICKUP_KM):
+    # Solver puro (executado no pool de processos), só com tuplas:
+    #   couriers:     (courier_id, lat, lng, capacidade) livres
+    #   orders:       (order_id, r_lat, r_lng, d_lat, d_lng, pronto_em) sem entregador
+    #   open_batches: (courier_id, batch, p_lat, p_lng, d_lat, d_lng, vagas) ainda não retirados
+    # Retorna [(courier_id, batch, [order_id na ordem de entrega], novo)].
+    # Replanejamento incremental: o que já foi atribuído não é desfeito,
+    # pedidos novos primeiro completam lotes abertos compatíveis e só depois
+    # formam lotes novos, que vão para o entregador livre mais próximo.
+    orders = sorted(orders, key=lambda order: order[5])
+    pickups = GridIndex(cell_size=0.01)
+    by_id = {}
+    for order in orders:
+        by_id[order[0]] = order
+        pickups.insert(order[0], order[1], order[2])
+    pending = set(by_id)
+
+    results = []
+
+    # 1. Lotes abertos: a mesma retirada e entregas próximas da âncora
+    for courier_id, batch, p_lat, p_lng, d_lat, d_lng, slots in open_batches:
+        joined = []
+        for _, order_id in pickups.nearby(p_lat, p_lng, pickup_radius_km):
+            if len(joined) >= slots:
+                break
+            order = by_id[order_id]
+            if haversine_km(d_lat, d_lng, order[3], order[4]) <= drop_radius_km:
+                joined.append(order_id)
+        for order_id in joined:
+            pickups.remove(order_id)
+            pending.discard(order_id)
+        if joined:
+            results.append((courier_id, batch, joined, False))
+
+    # 2. Lotes novos, do pedido pronto há mais tempo para o mais recente
+    free = GridIndex(cell_size=0.02)
+    capacity = {}
+    for courier_id, lat, lng, courier_capacity in couriers:
+        free.insert(courier_id, lat, lng)
+        capacity[courier_id] = courier_capacity
+
+    for seed in orders:
+        if not free:
+            break
+        if seed[0] not in pending:
+            continue
+        courier_id = _nearest(free, seed[1], seed[2], max_pickup_km)
+        if courier_id is None:
+            continue
+
+        members = [seed[0]]
+        pickups.remove(seed[0])
+        pending.discard(seed[0])
+        limit = max(1, min(batch_size, capacity[courier_id]))
+        for _, order_id in pickups.nearby(seed[1], seed[2], pickup_radius_km):
+            if len(members) >= limit:
+                break
+            order = by_id[order_id]
+            if haversine_km(seed[3], seed[4], order[3], order[4]) <= drop_radius_km:
+                members.append(order_id)
+        for order_id in members[1:]:
+            pickups.remove(order_id)
+            pending.discard(order_id)
+
+        free.remove(courier_id)
+        drops = {order_id: (by_id[order_id][3], by_id[order_id][4]) for order_id in members}
+        results.append((courier_id, uuid.uuid4().hex, _route((seed[1], seed[2]), drops), True))
+
+    return results
+
+class Dispatcher:
+    # Atribui entregadores aos pedidos prontos fora do caminho da
+    # requisição: uma thread por processo monta o retrato (pedidos prontos
+    # sem entregador, entregadores livres e lotes ainda não retirados),
+    # resolve no pool de processos e grava o resultado. Acorda quando um
+    # pedido fica pronto ou um entregador fica livre neste processo, e a
+    # cada interval segundos para os commits de outros processos.
+
+    def __init__(self, workers=1, interval=2.0):
+        self.workers = workers
+        self.interval = interval
+        self._executor = None
+        self._pid = None
+        self._thread = None
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def wake(self):
+        self._wake.set()
+
+    def start(self, app):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._loop, args=(app,), name='dispatcher', daemon=True)
+        self._thread.start()
+
+    def _loop(self, app):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                with app.app_context():
+                    self.run_once()
+            except Exception:
+                logger.exception('Dispatch round failed')
+
+    def snapshot(self, now=None):
+        now = now or datetime.utcnow()
+        unassigned = (db.session.query(Order.id, Restaurant.latitude, Restaurant.longitude,
+                                       Order.delivery_latitude, Order.delivery_longitude, Order.created_at)
+                      .join(Restaurant, Restaurant.id == Order.restaurant_id)
+                      .outerjoin(DeliveryAssignment, DeliveryAssignment.order_id == Order.id)
+                      .filter(Order.status == 'ready', DeliveryAssignment.id.is_(None),
+                              Restaurant.latitude.isnot(None))
+                      .all())
+        # Sem coordenadas de entrega o destino é tratado como a própria retirada
+        orders = [(order_id, r_lat, r_lng, r_lat if d_lat is None else d_lat,
+                   r_lng if d_lng is None else d_lng, created_at.timestamp() if created_at else 0.0)
+                  for order_id, r_lat, r_lng, d_lat, d_lng, created_at in unassigned]
+
+        busy = db.session.query(DeliveryAssignment.courier_id).filter(DeliveryAssignment.status != 'delivered')
+        couriers = (db.session.query(Courier.id, Courier.latitude, Courier.longitude, Courier.capacity)
+                    .filter(Courier.status == 'available', Courier.latitude.isnot(None),
+                            Courier.last_seen_at >= now - COURIER_STALE,
+                            Courier.id.notin_(busy))
+                    .all())
+
+        # Lotes abertos: âncora (primeiro pedido) e vagas restantes
+        batches = (db.session.query(DeliveryAssignment.batch, DeliveryAssignment.courier_id,
+                                    func.count(DeliveryAssignment.id), func.min(DeliveryAssignment.order_id),
+                                    Courier.capacity)
+                   .join(Courier, Courier.id == DeliveryAssignment.courier_id)
+                   .filter(DeliveryAssignment.status != 'delivered')
+                   .group_by(DeliveryAssignment.batch, DeliveryAssignment.courier_id, Courier.capacity)
+                   .having(func.sum(case((DeliveryAssignment.status != 'assigned', 1), else_=0)) == 0)
+                   .all())
+        anchors = {}
+        open_ids = [anchor for _, _, count, anchor, capacity in batches if count < min(capacity, BATCH_SIZE)]
+        if open_ids:
+            anchors = {order_id: (r_lat, r_lng, d_lat if d_lat is not None else r_lat,
+                                  d_lng if d_lng is not None else r_lng)
+                       for order_id, r_lat, r_lng, d_lat, d_lng in
+                       db.session.query(Order.id, Restaurant.latitude, Restaurant.longitude,
+                                        Order.delivery_latitude, Order.delivery_longitude)
+                       .join(Restaurant, Restaurant.id == Order.restaurant_id)
+                       .filter(Order.id.in_(open_ids))}
+        open_batches = [(courier_id, batch, *anchors[anchor], min(capacity, BATCH_SIZE) - count)
+                        for batch, courier_id, count, anchor, capacity in batches
+                        if anchor in anchors and count < min(capacity, BATCH_SIZE)]
+        return [tuple(courier) for courier in couriers], orders, open_batches
+
+    def solve(self, couriers, orders, open_batches):
+        if not orders or not (couriers or open_batches):
+            return []
+        return self._get_executor().submit(plan, couriers, orders, open_batches).result()
+
+    def apply(self, results):
+        # Grava as atribuições numa transação; se outro processo atribuiu
+        # algum dos pedidos antes, a rodada é descartada e refeita depois.
+        # Pedido que entra num lote existente só é gravado se o lote ainda
+        # estiver todo 'assigned' (entregador não saiu do restaurante); senão
+        # essa parte da rodada é descartada e os pedidos voltam na próxima.
+        if not results:
+            return 0
+        # Encerra a leitura do snapshot: as checagens abaixo veem o estado atual
+        db.session.rollback()
+        joined = [batch for _, batch, _, new in results if not new]
+        sequences = {}
+        if joined:
+            # No PostgreSQL as linhas dos lotes ficam travadas até o commit:
+            # uma retirada simultânea espera esta rodada terminar
+            for batch, in (db.session.query(DeliveryAssignment.batch)
+                           .filter(DeliveryAssignment.batch.in_(joined))
+                           .with_for_update()):
+                sequences[batch] = sequences.get(batch, 0) + 1
+
+        now = datetime.utcnow()
+        table = DeliveryAssignment.__table__
+        rows, assigned = [], 0
+        try:
+            for courier_id, batch, order_ids, new in results:
+                start = sequences.get(batch, 0)
+                batch_rows = [{'order_id': order_id, 'courier_id': courier_id, 'batch': batch,
+                               'sequence': start + index, 'status': 'assigned', 'assigned_at': now}
+                              for index, order_id in enumerate(order_ids)]
+                if new:
+                    rows.extend(batch_rows)
+                    continue
+                for row in batch_rows:
+                    if not db.session.execute(_insert_into_open_batch(table, row)).rowcount:
+                        logger.info('Batch %s was picked up; its new orders wait for the next round', batch)
+                        break
+                    assigned += 1
+            if rows:
+                db.session.execute(table.insert(), rows)
+            new_couriers = [courier_id for courier_id, _, _, new in results if new]
+            if new_couriers:
+                (Courier.query.filter(Courier.id.in_(new_couriers))
+                 .update({'status': 'delivering'}, synchronize_session=False))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            logger.info('Dispatch round lost a race; retrying on the next round')
+            return 0
+        return len(rows) + assigned
+
+    def run_once(self):
+        started = time.perf_counter()
+        couriers, orders, open_batches = self.snapshot()
+        assigned = self.apply(self.solve(couriers, orders, open_batches))
+        return {'orders': len(orders), 'couriers': len(couriers), 'assigned': assigned,
+                'seconds': time.perf_counter() - started}
+
+def _insert_into_open_batch(table, row):
+    # INSERT ... SELECT ... WHERE NOT EXISTS: a checagem e a escrita num só
+    # comando (no SQLite, sob a trava de escrita do banco)
+    picked_up = select(table.c.id).where(table.c.batch == row['batch'], table.c.status != 'assigned')
+    values = select(*[literal(value, table.c[column].type) for column, value in row.items()])
+    return table.insert().from_select(list(row), values.where(~exists(picked_up)))
+
+dispatcher = Dispatcher(workers=int(os.environ.get('DISPATCH_WORKERS', 1)),
+                        interval=float(os.environ.get('DISPATCH_INTERVAL', 2.0)))
+
+@on_commit(Order)
+def _order_ready(changes):
+    for change in changes:
+        if 'status' in change.changed and change.values.get('status') == 'ready':
+            dispatcher.wake()
+            return
+
+if __name__ == '__main__':
+    # Despachante dedicado: python -m src.services.dispatch
+    from src.main import app
+
+    parser = argparse.ArgumentParser(description='Atribui entregadores aos pedidos prontos')
+    parser.add_argument('--interval', type=float, default=dispatcher.interval)
+    parser.add_argument('--once', action='store_true', help='executa uma rodada e sai')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        while True:
+            stats = dispatcher.run_once()
+            if stats['assigned'] or args.once:
+                print(f"{stats['assigned']} pedido(s) atribuídos de {stats['orders']} prontos, "
+                      f"{stats['couriers']} entregador(es) livres em {stats['seconds'] * 1000:.0f} ms")
+            if args.once:
+                break
+            time.sleep(args.interval)
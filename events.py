@@ -0,0 +1,71 @@
+import logging
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# op: insert, update ou delete
+# values: colunas carregadas no momento do flush (as expiradas ficam de fora)
+# changed: colunas alteradas (todas, no caso de insert/delete)
+Change = namedtuple('Change', 'op model values changed')
+
+_listeners = []
+
+def on_commit(*models):
+    # Registra um callback chamado com a lista de Changes dos modelos
+    # informados, somente depois que a transação for efetivada
+    def decorator(callback):
+        _listeners.append((models, callback))
+        return callback
+    return decorator
+
+def _watched(obj):
+    return any(isinstance(obj, models) for models, _ in _listeners)
+
+def _snapshot(op, obj):
+    state = inspect(obj)
+    keys = [attr.key for attr in state.mapper.column_attrs]
+    values = {key: state.dict[key] for key in keys if key in state.dict}
+    if op == 'update':
+        changed = {key for key in keys if state.attrs[key].history.has_changes()}
+    else:
+        changed = set(keys)
+    return Change(op, type(obj), values, changed)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    if not _listeners:
+        return
+
+    pending = session.info.setdefault('pending_changes', [])
+    for op, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            if not _watched(obj):
+                continue
+            change = _snapshot(op, obj)
+            if change.changed:
+                pending.append(change)
+
+def publish(changes):
+    # Entrega Changes montadas à mão aos callbacks, para escritas em lote
+    # feitas pelo Core (que o ORM não acompanha); chamar após o commit
+    for models, callback in _listeners:
+        selected = [change for change in changes if issubclass(change.model, models)]
+        if not selected:
+            continue
+        try:
+            callback(selected)
+        except Exception:
+            # A transação já foi efetivada; falhas aqui não devem afetar a requisição
+            logger.exception('Error dispatching model changes to %s', callback.__name__)
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_changes(session):
+    changes = session.info.pop('pending_changes', None)
+    if changes:
+        publish(changes)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('pending_changes', None)
@@ -0,0 +1,201 @@
+import math
+import threading
+import time
+from src.models.events import on_commit
+from src.models.restaurant import Restaurant
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def geohash(lat, lng, precision=7):
+    # Geohash padrão; com 7 caracteres a célula tem ~150 x 150 m
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        target, bounds = (lng, lng_range) if even else (lat, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        value <<= 1
+        if target >= middle:
+            value |= 1
+            bounds[0] = middle
+        else:
+            bounds[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+def geohash_center(cell):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            bounds = lng_range if even else lat_range
+            middle = (bounds[0] + bounds[1]) / 2
+            if value >> shift & 1:
+                bounds[0] = middle
+            else:
+                bounds[1] = middle
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lng_range[0] + lng_range[1]) / 2
+
+class GridIndex:
+    # Índice espacial em grade regular (células de cell_size graus).
+    # Uma busca visita apenas as células que cobrem o raio pedido.
+
+    def __init__(self, cell_size=0.02):
+        self.cell_size = cell_size
+        self._cells = {}
+        self._points = {}
+        self._lock = threading.RLock()
+
+    def cell(self, lat, lng):
+        return (math.floor(lat / self.cell_size), math.floor(lng / self.cell_size))
+
+    def insert(self, key, lat, lng):
+        with self._lock:
+            self.remove(key)
+            cell = self.cell(lat, lng)
+            self._cells.setdefault(cell, {})[key] = (lat, lng)
+            self._points[key] = cell
+
+    def remove(self, key):
+        with self._lock:
+            cell = self._points.pop(key, None)
+            if cell is None:
+                return
+            bucket = self._cells[cell]
+            del bucket[key]
+            if not bucket:
+                del self._cells[cell]
+
+    def clear(self):
+        with self._lock:
+            self._cells = {}
+            self._points = {}
+
+    def __len__(self):
+        return len(self._points)
+
+    def _columns(self, lng, dlng):
+        # Faixas de colunas que cobrem lng ± dlng, dando a volta no antimeridiano
+        if dlng >= 180:
+            spans = [(-180.0, 180.0)]
+        else:
+            west, east = lng - dlng, lng + dlng
+            spans = [(max(west, -180.0), min(east, 180.0))]
+            if west < -180:
+                spans.append((west + 360, 180.0))
+            if east > 180:
+                spans.append((-180.0, east - 360))
+        return [(self.cell(0, west)[1], self.cell(0, east)[1]) for west, east in spans]
+
+    def nearby(self, lat, lng, radius_km, limit=None):
+        # Retorna [(distância_km, chave)] ordenado pela distância
+        dlat = radius_km / KM_PER_DEGREE
+        # A largura em longitude vale para a latitude da caixa mais próxima
+        # do polo; perto dele a caixa dá a volta inteira (no máximo 180°)
+        reach = min(abs(lat) + dlat, 90.0)
+        cos_reach = math.cos(math.radians(reach))
+        dlng = min(radius_km / (KM_PER_DEGREE * cos_reach), 180.0) if cos_reach > 1e-9 else 180.0
+        min_i = self.cell(max(lat - dlat, -90.0), 0)[0]
+        max_i = self.cell(min(lat + dlat, 90.0), 0)[0]
+        columns = self._columns(lng, dlng)
+
+        cells = self._cells
+        area = (max_i - min_i + 1) * sum(last - first + 1 for first, last in columns)
+        if area > len(cells):
+            # Caixa com mais células que a grade ocupada (raio grande, perto
+            # dos polos): percorre só as células que têm pontos
+            buckets = [bucket for (i, j), bucket in list(cells.items())
+                       if min_i <= i <= max_i and any(first <= j <= last for first, last in columns)]
+        else:
+            buckets = [cells.get((i, j)) for i in range(min_i, max_i + 1)
+                       for first, last in columns for j in range(first, last + 1)]
+
+        results = []
+        for bucket in buckets:
+            if not bucket:
+                continue
+            for key, (plat, plng) in list(bucket.items()):
+                # Descarta pela caixa envolvente antes do haversine
+                delta = abs(plng - lng) % 360
+                if abs(plat - lat) > dlat or min(delta, 360 - delta) > dlng:
+                    continue
+                distance = haversine_km(lat, lng, plat, plng)
+                if distance <= radius_km:
+                    results.append((distance, key))
+
+        results.sort()
+        return results[:limit] if limit else results
+
+class RestaurantLocator:
+    # Índice dos restaurantes ativos com coordenadas, construído sob demanda
+    # a partir da tabela e atualizado a cada commit. Como cada worker tem a
+    # sua cópia, o índice é reconstruído após max_age segundos para absorver
+    # alterações feitas por outros processos.
+
+    def __init__(self, cell_size=0.02, max_age=300):
+        self.index = GridIndex(cell_size)
+        self.max_age = max_age
+        self.loaded_at = None
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self):
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.max_age:
+            return
+        with self._lock:
+            if self.loaded_at is not None and time.monotonic() - self.loaded_at < self.max_age:
+                return
+            rows = (Restaurant.query
+                    .with_entities(Restaurant.id, Restaurant.latitude, Restaurant.longitude)
+                    .filter(Restaurant.is_active.is_(True),
+                            Restaurant.latitude.isnot(None),
+                            Restaurant.longitude.isnot(None))
+                    .all())
+            index = GridIndex(self.index.cell_size)
+            for restaurant_id, lat, lng in rows:
+                index.insert(restaurant_id, lat, lng)
+            self.index = index
+            self.loaded_at = time.monotonic()
+
+    def invalidate(self):
+        self.loaded_at = None
+
+    def apply(self, values, deleted=False):
+        if self.loaded_at is None:
+            return
+        lat, lng = values.get('latitude'), values.get('longitude')
+        if deleted or not values.get('is_active') or lat is None or lng is None:
+            self.index.remove(values['id'])
+        else:
+            self.index.insert(values['id'], lat, lng)
+
+    def nearby(self, lat, lng, radius_km, limit=None):
+        self.ensure_loaded()
+        return self.index.nearby(lat, lng, radius_km, limit)
+
+locator = RestaurantLocator()
+
+@on_commit(Restaurant)
+def _update_locator(changes):
+    for change in changes:
+        if change.op == 'update' and not change.changed & {'latitude', 'longitude', 'is_active'}:
+            continue
+        required = {'id'} if change.op == 'delete' else {'id', 'latitude', 'longitude', 'is_active'}
+        if not required <= change.values.keys():
+            # Atributos expirados: recarrega o índice na próxima busca
+            locator.invalidate()
+            continue
+        locator.apply(change.values, deleted=change.op == 'delete')
@@ -0,0 +1,66 @@
+# Configuração do gunicorn: gunicorn -c gunicorn.conf.py run:app
+#
+# WEB_WORKER_CLASS escolhe como cada worker atende conexões simultâneas:
+#   gevent:  até WEB_WORKER_CONNECTIONS conexões por worker, cada uma num
+#            greenlet. Esperas de rede (clientes lentos, streams SSE de
+#            /api/orders/stream) não prendem o worker. Padrão só com
+#            PostgreSQL e psycogreen instalado: o driver do SQLite e o
+#            psycopg2 sem o psycogreen bloqueiam o worker inteiro a cada
+#            consulta.
+#   gthread: (padrão nos demais casos) WEB_THREADS threads por worker; um
+#            stream ocupa uma thread.
+#   sync:    uma requisição por worker (o modo anterior).
+#
+# A sessão do banco (Flask-SQLAlchemy) pertence ao app context, que é
+# próprio de cada thread ou greenlet: cada requisição continua com a sua.
+# Com gevent, o pool do SQLAlchemy (DB_POOL_SIZE + DB_MAX_OVERFLOW por
+# worker) limita quantas requisições usam o banco ao mesmo tempo; as
+# demais esperam até DB_POOL_TIMEOUT.
+import importlib.util
+import os
+import tempfile
+
+def _postgres():
+    return os.environ.get('DATABASE_URL', '').startswith(('postgres://', 'postgresql'))
+
+def _default_worker_class():
+    if _postgres() and importlib.util.find_spec('gevent') and importlib.util.find_spec('psycogreen'):
+        return 'gevent'
+    return 'gthread'
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', 3))
+worker_class = os.environ.get('WEB_WORKER_CLASS') or _default_worker_class()
+threads = int(os.environ.get('WEB_THREADS', 32))
+worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', 1000))
+backlog = int(os.environ.get('WEB_BACKLOG', 2048))
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+def post_fork(server, worker):
+    # O app usa o número de workers para recusar streams de pedidos que
+    # não veriam eventos dos outros processos (src.services.broker)
+    os.environ['WEB_WORKERS'] = str(server.cfg.workers)
+
+    # psycopg2 só coopera com o gevent através do psycogreen (opcional)
+    if worker_class != 'gevent' or not _postgres():
+        return
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning('psycogreen not installed: PostgreSQL queries will block gevent workers')
+        return
+    patch_psycopg()
+
+def on_starting(server):
+    # Métricas (src.services.metrics): os workers somam as contagens num
+    # diretório comum, novo a cada início do servidor
+    directory = os.environ.get('METRICS_DIR')
+    if not directory:
+        os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='deliveryapp-metrics-')
+        return
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if name.startswith('metrics-') and name.endswith('.json'):
+            os.remove(os.path.join(directory, name))
@@ -0,0 +1,130 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from src.models.user import db
+from src.models.restaurant import Restaurant, Product
+from src.models.schedule import OpeningHours, ProductSchedule
+from src.routes.auth import token_required
+from src.services.availability import availability, WeeklyWindows
+
+hours_bp = Blueprint('hours', __name__)
+
+MAX_WINDOWS = 50
+MAX_LIMIT = 100
+
+def _authorize(current_user, restaurant_id):
+    owner_id = Restaurant.query.with_entities(Restaurant.owner_id).filter_by(id=restaurant_id).scalar()
+    if owner_id is None:
+        return jsonify({'message': 'Restaurant not found'}), 404
+    if owner_id != current_user.id and current_user.user_type != 'admin':
+        return jsonify({'message': 'Access denied'}), 403
+    return None
+
+def _parse_windows(data):
+    # [{'weekday': 0-6, 'opens_at': 'HH:MM', 'closes_at': 'HH:MM'}, ...]
+    windows = (data or {}).get('windows')
+    if not isinstance(windows, list) or len(windows) > MAX_WINDOWS:
+        raise ValueError()
+    parsed = []
+    for window in windows:
+        weekday = window.get('weekday') if isinstance(window, dict) else None
+        if not isinstance(weekday, int) or not 0 <= weekday <= 6:
+            raise ValueError()
+        parsed.append((weekday, datetime.strptime(window['opens_at'], '%H:%M').time(),
+                       datetime.strptime(window['closes_at'], '%H:%M').time()))
+    return parsed
+
+def _replace(model, key, key_id, windows):
+    # Troca as janelas e devolve o estado delas agora (None: sem janelas,
+    # volta ao controle manual)
+    model.query.filter(key == key_id).delete(synchronize_session=False)
+    for weekday, opens_at, closes_at in windows:
+        db.session.add(model(**{key.key: key_id}, weekday=weekday, opens_at=opens_at, closes_at=closes_at))
+    if not windows:
+        return None
+    return len(WeeklyWindows([(key_id, *window) for window in windows]).open_at(availability.local_now())) > 0
+
+@hours_bp.route('/<int:restaurant_id>/hours', methods=['GET'])
+def get_opening_hours(restaurant_id):
+    hours = (OpeningHours.query.filter_by(restaurant_id=restaurant_id)
+             .order_by(OpeningHours.weekday, OpeningHours.opens_at).all())
+    return jsonify({
+        'restaurant_id': restaurant_id,
+        'windows': [window.to_dict() for window in hours],
+        'open_now': availability.is_open(restaurant_id)
+    }), 200
+
+@hours_bp.route('/<int:restaurant_id>/hours', methods=['PUT'])
+@token_required
+def set_opening_hours(current_user, restaurant_id):
+    # Substitui o horário de funcionamento; lista vazia devolve o is_online
+    # ao controle manual
+    denied = _authorize(current_user, restaurant_id)
+    if denied:
+        return denied
+    try:
+        windows = _parse_windows(request.get_json())
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'message': f'windows must be a list of up to {MAX_WINDOWS} '
+                                   '{weekday: 0-6, opens_at: HH:MM, closes_at: HH:MM}'}), 400
+
+    open_now = _replace(OpeningHours, OpeningHours.restaurant_id, restaurant_id, windows)
+    if open_now is not None:
+        Restaurant.query.get(restaurant_id).is_online = open_now
+    db.session.commit()
+
+    return get_opening_hours(restaurant_id)
+
+@hours_bp.route('/<int:restaurant_id>/products/<int:product_id>/schedule', methods=['GET'])
+def get_product_schedule(restaurant_id, product_id):
+    product = Product.query.filter_by(id=product_id, restaurant_id=restaurant_id).first()
+    if not product:
+        return jsonify({'message': 'Product not found'}), 404
+
+    windows = (ProductSchedule.query.filter_by(product_id=product_id)
+               .order_by(ProductSchedule.weekday, ProductSchedule.opens_at).all())
+    return jsonify({
+        'product_id': product_id,
+        'windows': [window.to_dict() for window in windows],
+        'is_available': product.is_available
+    }), 200
+
+@hours_bp.route('/<int:restaurant_id>/products/<int:product_id>/schedule', methods=['PUT'])
+@token_required
+def set_product_schedule(current_user, restaurant_id, product_id):
+    denied = _authorize(current_user, restaurant_id)
+    if denied:
+        return denied
+    product = Product.query.filter_by(id=product_id, restaurant_id=restaurant_id).first()
+    if not product:
+        return jsonify({'message': 'Product not found'}), 404
+    try:
+        windows = _parse_windows(request.get_json())
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'message': f'windows must be a list of up to {MAX_WINDOWS} '
+                                   '{weekday: 0-6, opens_at: HH:MM, closes_at: HH:MM}'}), 400
+
+    available_now = _replace(ProductSchedule, ProductSchedule.product_id, product_id, windows)
+    if available_now is not None:
+        product.is_available = available_now
+    db.session.commit()
+
+    return get_product_schedule(restaurant_id, product_id)
+
+@hours_bp.route('/open', methods=['GET'])
+def get_open_restaurants():
+    # Restaurantes abertos agora (opcionalmente de uma categoria), em ordem
+    # de id, a partir do bitmap em memória
+    category_id = request.args.get('category_id', type=int)
+    limit = max(1, min(request.args.get('limit', 50, type=int), MAX_LIMIT))
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    ids = availability.open_ids(category_id)
+    page = ids[offset:offset + limit].tolist()
+    restaurants = Restaurant.query.filter(Restaurant.id.in_(page)).order_by(Restaurant.id).all() if page else []
+
+    return jsonify({
+        'restaurants': [restaurant.to_dict() for restaurant in restaurants],
+        'total': len(ids),
+        'limit': limit,
+        'offset': offset
+    }), 200
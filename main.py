@@ -8,13 +8,40 @@ from flask_cors import CORS
 from src.models.user import db
 from src.models.restaurant import Category, Restaurant, ProductCategory, Product
 from src.models.order import Order, OrderItem, Review, Cart, CartItem
+from src.models.courier import Courier, DeliveryAssignment
+from src.models.analytics import SalesRollup, DailySalesRollup, ProductSalesRollup, RolledUpOrder
+from src.models.archive_segment import ArchiveSegment
+from src.models.schedule import OpeningHours, ProductSchedule
+from src.models import storage
 from src.routes.user import user_bp
 from src.routes.restaurant import restaurant_bp
 from src.routes.order import order_bp
 from src.routes.auth import auth_bp
+from src.routes.nearby import nearby_bp
+from src.routes.search import search_bp
+from src.routes.order_stream import order_stream_bp
+from src.routes.board import board_bp
+from src.routes.quotes import quotes_bp
+from src.routes.couriers import couriers_bp
+from src.routes.cart import cart_bp
+from src.routes.reports import reports_bp
+from src.routes.archived_orders import archived_orders_bp
+from src.routes.order_pages import order_pages_bp
+from src.routes.menu import menu_bp
+from src.routes.hours import hours_bp
+from src.services.catalog_cache import catalog_cache
+from src.services.metrics import metrics
+from src.services.json_provider import FastJSONProvider
+from src.services import ratings  # mantém Restaurant.rating a cada Review
+from src.services.dispatch import dispatcher
+from src.services.cart_store import cart_store
+from src.services.archive import order_archive
+from src.services.broker import init_broker
+from src.services.availability import scheduler
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+app.json = FastJSONProvider(app)
 
 # Configurar CORS para permitir requisições do frontend
 CORS(app, origins="*")
@@ -24,14 +51,59 @@ app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(user_bp, url_prefix='/api/users')
 app.register_blueprint(restaurant_bp, url_prefix='/api/restaurants')
 app.register_blueprint(order_bp, url_prefix='/api/orders')
+app.register_blueprint(nearby_bp, url_prefix='/api/restaurants')
+app.register_blueprint(search_bp, url_prefix='/api/search')
+app.register_blueprint(order_stream_bp, url_prefix='/api/orders')
+app.register_blueprint(board_bp, url_prefix='/api/restaurants')
+app.register_blueprint(quotes_bp, url_prefix='/api/restaurants')
+app.register_blueprint(couriers_bp, url_prefix='/api/couriers')
+app.register_blueprint(cart_bp, url_prefix='/api/cart')
+app.register_blueprint(reports_bp, url_prefix='/api/restaurants')
+app.register_blueprint(archived_orders_bp, url_prefix='/api/orders')
+app.register_blueprint(order_pages_bp, url_prefix='/api/orders')
+app.register_blueprint(menu_bp, url_prefix='/api/restaurants')
+app.register_blueprint(hours_bp, url_prefix='/api/restaurants')
 
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Métricas em /api/metrics (METRICS_ENABLED=1; METRICS_DIR soma os workers,
+# METRICS_TOKEN libera o acesso remoto); registradas antes dos
+# demais hooks para medir a requisição inteira
+metrics.init_app(app)
+
+# Cache de respostas (com ETag) das leituras do catálogo
+catalog_cache.init_app(app)
+
+# Configuração do banco de dados: DATABASE_URL ou o SQLite local
+storage.configure(app, os.path.join(os.path.dirname(__file__), 'database', 'app.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 db.init_app(app)
 
+# Carrinhos ativos no KV (CART_STORE=memory ou caminho do arquivo)
+cart_store.init_app(app, os.path.join(os.path.dirname(__file__), 'database', 'carts.db'))
+
+# Segmentos de pedidos arquivados (ARCHIVE_DIR)
+order_archive.init_app(app, os.path.join(os.path.dirname(__file__), 'database', 'archive'))
+
 with app.app_context():
+    storage.init_engine(db.engine)
     db.create_all()
+    # Streams de pedidos entre workers (LISTEN/NOTIFY no PostgreSQL)
+    init_broker(db.engine)
+
+# Despacho de entregadores neste processo (DISPATCH_ENABLED=1 em um único
+# worker) ou à parte com python -m src.services.dispatch
+if os.environ.get('DISPATCH_ENABLED', '').lower() in ('1', 'true', 'yes'):
+    dispatcher.start(app)
+
+# Horários de funcionamento e de oferta dos produtos (SCHEDULER_ENABLED=1
+# em um único worker) ou à parte com python -m src.services.availability
+if os.environ.get('SCHEDULER_ENABLED', '').lower() in ('1', 'true', 'yes'):
+    scheduler.start(app)
+
+# Carrinhos vencidos vão do KV para o banco numa thread de cada worker (a
+# reserva evita gravações repetidas); CART_SWEEP_ENABLED=0 quando a
+# varredura roda à parte com python -m src.services.cart_store
+if os.environ.get('CART_SWEEP_ENABLED', '1').lower() in ('1', 'true', 'yes'):
+    cart_store.start(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -0,0 +1,29 @@
+from flask import Blueprint, current_app, request, jsonify
+from src.services.menu_snapshots import menu_snapshots
+
+menu_bp = Blueprint('menu', __name__)
+
+@menu_bp.route('/<int:restaurant_id>/menu', methods=['GET'])
+def get_menu(restaurant_id):
+    # Restaurante, categorias e produtos numa resposta só, servida dos bytes
+    # já comprimidos do snapshot
+    snapshot = menu_snapshots.get(restaurant_id)
+    if snapshot is None:
+        return jsonify({'message': 'Restaurant not found'}), 404
+
+    accepted = request.accept_encodings
+    if snapshot.brotli is not None and accepted['br']:
+        body, encoding = snapshot.brotli, 'br'
+    elif accepted['gzip']:
+        body, encoding = snapshot.gzip, 'gzip'
+    else:
+        body, encoding = snapshot.body, None
+
+    response = current_app.response_class(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # Mesmo ETag para todas as codificações: identifica o cardápio
+    response.set_etag(snapshot.etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
@@ -0,0 +1,113 @@
+import gzip
+import hashlib
+import threading
+from flask import current_app
+from src.models.events import on_commit
+from src.models.restaurant import Restaurant, ProductCategory, Product
+from src.models.rows import product_rows
+from src.services.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+class MenuSnapshot:
+    # Cardápio de um restaurante já serializado e comprimido; as respostas
+    # usam estes bytes como estão
+    __slots__ = ('restaurant_id', 'body', 'gzip', 'brotli', 'etag')
+
+    def __init__(self, restaurant_id, body):
+        self.restaurant_id = restaurant_id
+        self.body = body
+        self.gzip = gzip.compress(body, compresslevel=9, mtime=0)
+        self.brotli = brotli.compress(body, quality=11) if brotli else None
+        self.etag = hashlib.sha1(body).hexdigest()
+
+class MenuSnapshots:
+    # Um snapshot por restaurante, montado na primeira leitura depois de
+    # uma mudança: restaurante, categorias ativas em `order` e produtos
+    # ativos de cada uma, em três consultas. Escritas em produtos,
+    # categorias ou no restaurante descartam só o snapshot dele; o TTL
+    # limita a defasagem em relação às escritas de outros workers.
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.snapshots = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._generations = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self, restaurant_ids=None):
+        # None descarta todos
+        with self._lock:
+            if restaurant_ids is None:
+                self._generation += 1
+                self._generations.clear()
+                self.snapshots.clear()
+                return
+            for restaurant_id in restaurant_ids:
+                self._generations[restaurant_id] = self._generations.get(restaurant_id, 0) + 1
+                self.snapshots.pop(restaurant_id)
+
+    def _version(self, restaurant_id):
+        with self._lock:
+            return self._generation, self._generations.get(restaurant_id, 0)
+
+    def menu(self, restaurant_id):
+        restaurant = Restaurant.query.filter_by(id=restaurant_id, is_active=True).first()
+        if restaurant is None:
+            return None
+
+        categories = (ProductCategory.query
+                      .filter_by(restaurant_id=restaurant_id, is_active=True)
+                      .order_by(ProductCategory.order, ProductCategory.id)
+                      .all())
+        products = product_rows(Product.query
+                                .filter_by(restaurant_id=restaurant_id, is_active=True)
+                                .order_by(Product.id))
+        by_category = {category.id: dict(category.to_dict(), products=[]) for category in categories}
+        uncategorized = []
+        for product in products:
+            category = by_category.get(product['category_id'])
+            if category is not None:
+                category['products'].append(product)
+            elif product['category_id'] is None:
+                uncategorized.append(product)
+        # Produtos de categorias inativas ficam fora do cardápio
+
+        return {
+            'restaurant': restaurant.to_dict(),
+            'categories': list(by_category.values()),
+            'uncategorized_products': uncategorized
+        }
+
+    def get(self, restaurant_id):
+        snapshot = self.snapshots.get(restaurant_id)
+        if snapshot is not None:
+            return snapshot
+
+        # Uma escrita durante a montagem invalida o resultado: não é guardado
+        version = self._version(restaurant_id)
+        menu = self.menu(restaurant_id)
+        if menu is None:
+            return None
+        snapshot = MenuSnapshot(restaurant_id, current_app.json.dumps(menu).encode('utf-8'))
+        with self._lock:
+            if (self._generation, self._generations.get(restaurant_id, 0)) == version:
+                self.snapshots.set(restaurant_id, snapshot)
+        return snapshot
+
+menu_snapshots = MenuSnapshots()
+
+@on_commit(Restaurant, ProductCategory, Product)
+def _invalidate_menus(changes):
+    restaurant_ids = set()
+    for change in changes:
+        key = 'id' if change.model is Restaurant else 'restaurant_id'
+        if key not in change.values or (key == 'restaurant_id' and 'restaurant_id' in change.changed
+                                        and change.op == 'update'):
+            # Sem o restaurante (ou mudou de restaurante): descarta todos
+            menu_snapshots.invalidate()
+            return
+        restaurant_ids.add(change.values[key])
+    menu_snapshots.invalidate(restaurant_ids)
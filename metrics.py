@@ -0,0 +1,352 @@
+import collections
+import contextvars
+import functools
+import hmac
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from flask import Response, g, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.models.user import db
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Contadores da requisição corrente: [consultas, segundos em SQL,
+# segundos em to_dict, profundidade de to_dict aninhados]
+_request_stats = contextvars.ContextVar('request_stats', default=None)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+
+    def samples(self):
+        # Contagens cumulativas por limite, como o Prometheus espera
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield str(bound), total
+
+class SamplingProfiler:
+    # Amostra periodicamente a pilha das threads que estão atendendo
+    # requisições. Ao final de uma requisição lenta grava as pilhas no
+    # formato "folded" (uma pilha por linha com a contagem), aceito pelo
+    # flamegraph.pl e pelo speedscope. Com o gevent (threading substituído
+    # pelo monkey patch) cada requisição é uma greenlet: o amostrador roda
+    # numa thread de verdade do sistema, que o GIL alterna mesmo durante
+    # uma requisição que não cede, e lê a pilha de cada greenlet.
+
+    MAX_SAMPLES = 20000
+
+    def __init__(self, threshold, interval=0.005, directory=None):
+        self.threshold = threshold
+        self.interval = interval
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'deliveryapp-profiles')
+        self._active = {}
+        self._pid = None
+        self._greenlets = False
+        self._get_ident = threading.get_ident
+
+    def _start(self):
+        # Threads não sobrevivem ao fork do gunicorn; o monkey patch do
+        # gevent acontece no worker, então a escolha também é feita aqui
+        self._pid = os.getpid()
+        self._greenlets = _gevent_active()
+        if self._greenlets:
+            from gevent import monkey
+            self._get_ident = monkey.get_original('_thread', 'get_ident')
+            monkey.get_original('_thread', 'start_new_thread')(
+                self._run, (monkey.get_original('time', 'sleep'),))
+        else:
+            self._get_ident = threading.get_ident
+            threading.Thread(target=self._run, args=(time.sleep,), name='sampling-profiler', daemon=True).start()
+
+    def _key(self):
+        if self._greenlets:
+            import greenlet
+            return greenlet.getcurrent()
+        return threading.get_ident()
+
+    def begin(self):
+        if self._pid != os.getpid():
+            self._start()
+        # Chave (thread ou greenlet) -> [thread do sistema, amostras]
+        self._active[self._key()] = [self._get_ident(), []]
+
+    def end(self, elapsed, name):
+        entry = self._active.pop(self._key(), None)
+        if entry and entry[1] and elapsed >= self.threshold:
+            return self._dump(entry[1], name, elapsed)
+        return None
+
+    def _run(self, sleep):
+        own = self._get_ident()
+        while True:
+            sleep(self.interval)
+            frames = sys._current_frames()
+            for key, (thread_ident, samples) in list(self._active.items()):
+                if thread_ident == own or len(samples) >= self.MAX_SAMPLES:
+                    continue
+                # Greenlet suspensa: a pilha guardada nela; a que está em
+                # execução (gr_frame None) é a pilha atual da thread
+                frame = key.gr_frame if self._greenlets else None
+                if frame is None:
+                    frame = frames.get(thread_ident)
+                if frame is not None:
+                    samples.append(self._fold(frame))
+
+    @staticmethod
+    def _fold(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def _dump(self, samples, name, elapsed):
+        os.makedirs(self.directory, exist_ok=True)
+        safe_name = ''.join(c if c.isalnum() else '_' for c in name).strip('_') or 'request'
+        path = os.path.join(self.directory, f"{int(time.time() * 1000)}-{safe_name}-{elapsed * 1000:.0f}ms.folded")
+        with open(path, 'w') as output:
+            for stack, count in collections.Counter(samples).most_common():
+                output.write(f"{stack} {count}\n")
+        return path
+
+def _gevent_active():
+    if 'gevent' not in sys.modules:
+        return False
+    from gevent import monkey
+    return monkey.is_module_patched('threading')
+
+class Metrics:
+    # Métricas por endpoint expostas em /api/metrics (formato texto do
+    # Prometheus). Desligadas, nenhum hook é instalado e o custo é zero;
+    # METRICS_ENABLED=1 liga a coleta e PROFILE_SLOW_MS liga o profiler.
+    #
+    # Cada worker conta as próprias requisições. Com METRICS_DIR (o
+    # gunicorn.conf.py cria um a cada início) cada processo grava as suas
+    # contagens em metrics-<pid>.json, no máximo a cada flush_interval
+    # segundos, e /api/metrics soma os arquivos de todos, como o modo
+    # multiprocesso do prometheus_client: qualquer worker responde com o
+    # total, e os arquivos de workers encerrados continuam somados para que
+    # os contadores não voltem atrás. Sem METRICS_DIR cada série leva o
+    # rótulo pid e cada worker precisa ser coletado à parte.
+    #
+    # /api/metrics exige METRICS_TOKEN (Authorization: Bearer) quando
+    # definido; sem ele, só responde a conexões locais diretas (sem os
+    # cabeçalhos de proxy que o nginx acrescenta).
+
+    def __init__(self, flush_interval=1.0):
+        self.enabled = False
+        self.profiler = None
+        self.directory = None
+        self.token = None
+        self.flush_interval = flush_interval
+        self._flushed_at = 0.0
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._queries = {}
+        self._totals = collections.defaultdict(lambda: [0.0, 0.0])
+
+    def init_app(self, app):
+        self.enabled = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+        if not self.enabled:
+            return
+        self.directory = os.environ.get('METRICS_DIR') or None
+        self.token = os.environ.get('METRICS_TOKEN') or None
+
+        slow_ms = os.environ.get('PROFILE_SLOW_MS')
+        if slow_ms:
+            self.profiler = SamplingProfiler(
+                float(slow_ms) / 1000,
+                interval=float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000,
+                directory=os.environ.get('PROFILE_DIR'))
+
+        app.before_request(self._begin)
+        app.after_request(self._end)
+        app.add_url_rule('/api/metrics', 'metrics', self.render)
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        for mapper in db.Model.registry.mappers:
+            if 'to_dict' in mapper.class_.__dict__:
+                mapper.class_.to_dict = _timed_to_dict(mapper.class_.__dict__['to_dict'])
+
+    def _begin(self):
+        g.metrics_started = time.perf_counter()
+        _request_stats.set([0, 0.0, 0.0, 0])
+        if self.profiler:
+            self.profiler.begin()
+
+    def _end(self, response):
+        started = g.pop('metrics_started', None)
+        stats = _request_stats.get()
+        if started is None or stats is None:
+            return response
+
+        elapsed = time.perf_counter() - started
+        _request_stats.set(None)
+        rule = request.url_rule.rule if request.url_rule else 'unmatched'
+        key = (rule, request.method, str(response.status_code))
+        with self._lock:
+            if key not in self._latency:
+                self._latency[key] = Histogram(LATENCY_BUCKETS)
+                self._queries[key] = Histogram(QUERY_BUCKETS)
+            self._latency[key].observe(elapsed)
+            self._queries[key].observe(stats[0])
+            totals = self._totals[key]
+            totals[0] += stats[1]
+            totals[1] += stats[2]
+
+        if self.profiler:
+            self.profiler.end(elapsed, f"{request.method} {rule}")
+        if self.directory and time.monotonic() - self._flushed_at >= self.flush_interval:
+            self._flush()
+        return response
+
+    def _state(self):
+        with self._lock:
+            return {
+                'latency': [[*key, histogram.counts, histogram.sum] for key, histogram in self._latency.items()],
+                'queries': [[*key, histogram.counts, histogram.sum] for key, histogram in self._queries.items()],
+                'totals': [[*key, *totals] for key, totals in self._totals.items()]
+            }
+
+    def _flush(self):
+        # Grava num arquivo temporário e renomeia: quem lê nunca vê um arquivo pela metade
+        self._flushed_at = time.monotonic()
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + '.tmp', 'w') as output:
+                json.dump(self._state(), output)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            logger.exception('Could not write metrics to %s', path)
+
+    def _collect(self):
+        # (latência, consultas, totais) somados entre os processos, ou só os
+        # deste processo, com o rótulo pid, sem METRICS_DIR
+        if not self.directory:
+            state = self._state()
+            pid = str(os.getpid())
+            states = [{name: [[*entry[:3], pid, *entry[3:]] for entry in entries]
+                       for name, entries in state.items()}]
+            width = 4
+        else:
+            self._flush()
+            states, width = [], 3
+            for name in os.listdir(self.directory):
+                if not (name.startswith('metrics-') and name.endswith('.json')):
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name)) as source:
+                        states.append(json.load(source))
+                except (OSError, ValueError):
+                    logger.warning('Skipping unreadable metrics file %s', name)
+
+        latency, queries = {}, {}
+        totals = collections.defaultdict(lambda: [0.0, 0.0])
+        for state in states:
+            for histograms, entries, buckets in ((latency, state['latency'], LATENCY_BUCKETS),
+                                                 (queries, state['queries'], QUERY_BUCKETS)):
+                for entry in entries:
+                    key, (counts, total) = tuple(entry[:width]), entry[width:]
+                    histogram = histograms.setdefault(key, Histogram(buckets))
+                    histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                    histogram.sum += total
+            for entry in state['totals']:
+                key, sums = tuple(entry[:width]), entry[width:]
+                totals[key][0] += sums[0]
+                totals[key][1] += sums[1]
+        return latency, queries, totals
+
+    def _authorized(self):
+        if self.token:
+            supplied = request.headers.get('Authorization', '')
+            return hmac.compare_digest(supplied.encode(), f'Bearer {self.token}'.encode())
+        return (request.remote_addr in ('127.0.0.1', '::1')
+                and 'X-Forwarded-For' not in request.headers and 'X-Real-IP' not in request.headers)
+
+    def render(self):
+        if not self._authorized():
+            return jsonify({'message': 'Access denied'}), 403
+        latency, queries, totals = self._collect()
+        lines = []
+        self._render_histogram(lines, 'http_request_duration_seconds',
+                               'Request latency in seconds', latency)
+        self._render_histogram(lines, 'http_request_sql_queries',
+                               'SQL statements executed per request', queries)
+        for index, (name, help_text) in enumerate((
+                ('http_request_sql_seconds_total', 'Time spent executing SQL'),
+                ('http_request_serialize_seconds_total', 'Time spent in to_dict'))):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for key, sums in sorted(totals.items()):
+                lines.append(f"{name}{{{_labels(key)}}} {sums[index]:.6f}")
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+    @staticmethod
+    def _render_histogram(lines, name, help_text, histograms):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} histogram")
+        for key, histogram in sorted(histograms.items()):
+            labels = _labels(key)
+            for bound, count in histogram.samples():
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {sum(histogram.counts)}")
+
+def _labels(key):
+    rule, method, status, *pid = key
+    rule = rule.replace('\\', '\\\\').replace('"', '\\"')
+    labels = f'endpoint="{rule}",method="{method}",status="{status}"'
+    return labels + f',pid="{pid[0]}"' if pid else labels
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_stats.get() is not None:
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _request_stats.get()
+    started = conn.info.get('metrics_started')
+    if stats is not None and started:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started.pop()
+
+def _timed_to_dict(to_dict):
+    # Mede só a chamada mais externa: to_dict aninhados (pedido -> itens ->
+    # produto) não são contados duas vezes
+    @functools.wraps(to_dict)
+    def wrapper(self, *args, **kwargs):
+        stats = _request_stats.get()
+        if stats is None or stats[3]:
+            return to_dict(self, *args, **kwargs)
+        stats[3] = 1
+        started = time.perf_counter()
+        try:
+            return to_dict(self, *args, **kwargs)
+        finally:
+            stats[2] += time.perf_counter() - started
+            stats[3] = 0
+    return wrapper
+
+metrics = Metrics()
@@ -0,0 +1,49 @@
+import math
+from flask import Blueprint, request, jsonify
+from src.models.restaurant import Restaurant
+from src.services.geo import locator
+from src.services.availability import availability
+
+nearby_bp = Blueprint('nearby', __name__)
+
+MAX_RADIUS_KM = 50
+MAX_LIMIT = 200
+
+@nearby_bp.route('/nearby', methods=['GET'])
+def get_nearby_restaurants():
+    try:
+        lat = float(request.args['lat'])
+        lng = float(request.args['lng'])
+        radius = float(request.args.get('radius', 5))
+        limit = int(request.args.get('limit', 50))
+    except (KeyError, ValueError):
+        return jsonify({'message': 'lat and lng are required and must be numeric'}), 400
+
+    # float() aceita "nan" e "inf"
+    if not all(math.isfinite(value) for value in (lat, lng, radius)):
+        return jsonify({'message': 'lat, lng and radius must be finite numbers'}), 400
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or radius <= 0:
+        return jsonify({'message': 'Invalid coordinates or radius'}), 400
+
+    radius = min(radius, MAX_RADIUS_KM)
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    # open_now=1: só os abertos agora, pelo bitmap (filtra antes do limite)
+    if request.args.get('open_now', '0').lower() in ('1', 'true'):
+        matches = [match for match in locator.nearby(lat, lng, radius)
+                   if availability.is_open(match[1])][:limit]
+    else:
+        matches = locator.nearby(lat, lng, radius, limit)
+    distances = {restaurant_id: distance for distance, restaurant_id in matches}
+
+    # Uma única consulta para a página de resultados, reordenada pela distância
+    restaurants = Restaurant.query.filter(Restaurant.id.in_(distances)).all() if distances else []
+    restaurants.sort(key=lambda restaurant: distances[restaurant.id])
+
+    result = []
+    for restaurant in restaurants:
+        data = restaurant.to_dict()
+        data['distance_km'] = round(distances[restaurant.id], 3)
+        result.append(data)
+
+    return jsonify({'restaurants': result, 'radius_km': radius}), 200
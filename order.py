@@ -1,9 +1,20 @@
 from src.models.user import db
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 
 class Order(db.Model):
+    __table_args__ = (
+        # Repetições do checkout com a mesma chave devolvem o mesmo pedido
+        db.UniqueConstraint('user_id', 'idempotency_key', name='uq_order_user_idempotency_key'),
+        # "Meus pedidos" e "pedidos abertos do restaurante" (ver check_query_plans.py)
+        db.Index('ix_order_user_created', 'user_id', 'created_at'),
+        db.Index('ix_order_restaurant_status_created', 'restaurant_id', 'status', 'created_at'),
+        db.Index('ix_order_status_created', 'status', 'created_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(20), unique=True, nullable=False)
+    idempotency_key = db.Column(db.String(64), nullable=True)
     
     # Relacionamentos
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -26,6 +37,8 @@ class Order(db.Model):
     delivery_city = db.Column(db.String(100), nullable=False)
     delivery_state = db.Column(db.String(50), nullable=False)
     delivery_zip_code = db.Column(db.String(20), nullable=False)
+    delivery_latitude = db.Column(db.Float, nullable=True)
+    delivery_longitude = db.Column(db.Float, nullable=True)
     
     # Informações adicionais
     notes = db.Column(db.Text, nullable=True)
@@ -36,10 +49,37 @@ class Order(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     confirmed_at = db.Column(db.DateTime, nullable=True)
     delivered_at = db.Column(db.DateTime, nullable=True)
+    # Última alteração; é a versão dos quadros de pedidos (src.services.order_board)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relacionamentos
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
+    # Campos aninhados de to_dict(), usados na projeção (fields=)
+    composite_fields = {
+        'delivery_address': {
+            'street': 'delivery_street',
+            'number': 'delivery_number',
+            'complement': 'delivery_complement',
+            'neighborhood': 'delivery_neighborhood',
+            'city': 'delivery_city',
+            'state': 'delivery_state',
+            'zip_code': 'delivery_zip_code',
+            'latitude': 'delivery_latitude',
+            'longitude': 'delivery_longitude'
+        }
+    }
+    
+    # Chaves de to_dict() sem os itens (serialização por tuplas em src.models.rows)
+    row_fields = ('id', 'order_number', 'user_id', 'restaurant_id', 'status', 'subtotal', 'delivery_fee',
+                  'total', 'delivery_address', 'notes', 'payment_method', 'payment_status',
+                  'created_at', 'confirmed_at', 'delivered_at')
+    
+    @classmethod
+    def with_items(cls, query=None):
+        # Itens e produtos carregados em lote: 2 SELECTs por página, qualquer que seja o tamanho
+        return (cls.query if query is None else query).options(selectinload(cls.items).joinedload(OrderItem.product))
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -57,7 +97,9 @@ class Order(db.Model):
                 'neighborhood': self.delivery_neighborhood,
                 'city': self.delivery_city,
                 'state': self.delivery_state,
-                'zip_code': self.delivery_zip_code
+                'zip_code': self.delivery_zip_code,
+                'latitude': self.delivery_latitude,
+                'longitude': self.delivery_longitude
             },
             'notes': self.notes,
             'payment_method': self.payment_method,
@@ -68,11 +110,18 @@ class Order(db.Model):
             'items': [item.to_dict() for item in self.items]
         }
 
+class OrderNode(db.Model):
+    # Nós (0-1023) do gerador de números de pedido, concedidos aos
+    # processos por tempo limitado (ver src.services.checkout)
+    node_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    owner = db.Column(db.String(100), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
 class OrderItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Relacionamentos
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     
     # Detalhes do item
@@ -84,6 +133,9 @@ class OrderItem(db.Model):
     # Relacionamentos
     product = db.relationship('Product', backref='order_items')
     
+    # Chaves de to_dict() sem o produto (serialização por tuplas em src.models.rows)
+    row_fields = ('id', 'product_id', 'quantity', 'unit_price', 'total_price', 'notes')
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -100,7 +152,7 @@ class Review(db.Model):
     
     # Relacionamentos
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False, index=True)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=True)
     
     # Avaliação
@@ -125,7 +177,7 @@ class Cart(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Relacionamentos
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
     
     # Timestamps
@@ -135,6 +187,11 @@ class Cart(db.Model):
     # Relacionamentos
     items = db.relationship('CartItem', backref='cart', lazy=True, cascade='all, delete-orphan')
     
+    @classmethod
+    def with_items(cls, query=None):
+        # Itens e produtos carregados em lote, como em Order.with_items()
+        return (cls.query if query is None else query).options(selectinload(cls.items).joinedload(CartItem.product))
+    
     def to_dict(self):
         total = sum(item.total_price for item in self.items)
         return {
@@ -151,7 +208,7 @@ class CartItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Relacionamentos
-    cart_id = db.Column(db.Integer, db.ForeignKey('cart.id'), nullable=False)
+    cart_id = db.Column(db.Integer, db.ForeignKey('cart.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     
     # Detalhes do item
@@ -174,3 +231,12 @@ class CartItem(db.Model):
             'product': self.product.to_dict() if self.product else None
         }
 
+def serialize_orders(query, page=1, per_page=50):
+    # Serializa uma página de pedidos num número fixo de consultas,
+    # gerando o mesmo JSON de Order.to_dict()
+    orders = (Order.with_items(query)
+              .order_by(Order.created_at.desc(), Order.id.desc())
+              .limit(per_page)
+              .offset((page - 1) * per_page)
+              .all())
+    return [order.to_dict() for order in orders]
@@ -0,0 +1,215 @@
+import collections
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from src.models.events import on_commit
+from src.models.order import Order
+from src.models.rows import order_rows
+from src.services.broker import get_broker
+
+OPEN_STATUSES = ('pending', 'confirmed', 'preparing', 'ready', 'delivering')
+
+# Canal do broker com os pedidos alterados em qualquer worker
+BOARD_CHANNEL = 'order_boards'
+# Até quantos pares (restaurante, pedido) por mensagem (NOTIFY: 8000 bytes)
+BOARD_MESSAGE_SIZE = 200
+# O updated_at é gravado no flush, e o commit vem depois: alterações
+# efetivadas fora de ordem entram nos deltas até GRACE antes da versão
+GRACE = timedelta(seconds=5)
+
+class RestaurantBoard:
+    # Pedidos abertos de um restaurante, já serializados, com o updated_at
+    # de cada um. A versão é o maior updated_at conhecido: vem do banco e
+    # por isso vale em qualquer worker. Os deltas trazem o que mudou desde
+    # a versão do cliente; quem tem versão anterior ao que o quadro conhece
+    # (known_since) recebe o quadro completo.
+
+    def __init__(self, restaurant_id, history=500):
+        self.restaurant_id = restaurant_id
+        self.orders = {}
+        self.stamps = {}
+        self.removed = collections.deque()
+        self.history = history
+        self.version = None
+        self.known_since = None
+        self.dirty = set()
+        self.loaded_at = None
+        self.lock = threading.RLock()
+
+    def _record(self, order_id, data, stamp):
+        # data None = pedido saiu do quadro (entregue, cancelado ou removido)
+        if data is None:
+            if self.orders.pop(order_id, None) is None:
+                return
+            del self.stamps[order_id]
+            self.removed.append((stamp, order_id))
+            if len(self.removed) > self.history:
+                # Remoção esquecida: versões anteriores a ela recebem o quadro completo
+                forgotten, _ = self.removed.popleft()
+                self.known_since = max(self.known_since, forgotten)
+        elif self.orders.get(order_id) == data:
+            return
+        else:
+            self.orders[order_id] = data
+            self.stamps[order_id] = stamp
+        if self.version is None or stamp > self.version:
+            self.version = stamp
+
+    def replace(self, orders, stamps, now):
+        # Reconstrução completa, registrada como delta em relação ao atual.
+        # O que só a reconstrução percebeu (aviso perdido) leva o horário
+        # atual, para entrar no próximo delta de todos os clientes.
+        if self.known_since is None:
+            self.known_since = now
+        learned = self.loaded_at is not None
+        for order_id in set(self.orders) - set(orders):
+            self._record(order_id, None, now)
+        for order_id, data in orders.items():
+            self._record(order_id, data, max(stamps[order_id], now) if learned else stamps[order_id])
+        self.loaded_at = time.monotonic()
+
+    def apply(self, orders, stamps, now):
+        # stamps: todos os pedidos avisados, abertos ou não; os ausentes
+        # foram apagados
+        for order_id in stamps.keys() | orders.keys():
+            self._record(order_id, orders.get(order_id), stamps.get(order_id, now))
+
+    def token(self, since=None):
+        # Nunca anterior à versão do cliente: voltar atrás faria o próximo
+        # worker, carregado depois deste, responder com o quadro completo
+        return max(version for version in (self.version, self.known_since, since) if version).isoformat()
+
+    def snapshot(self):
+        return {'since': self.token(), 'full': True, 'orders': list(self.orders.values())}
+
+    def changes_since(self, since):
+        if since < self.known_since:
+            return self.snapshot()
+        floor = since - GRACE
+        return {
+            'since': self.token(since),
+            'full': False,
+            'orders': [data for order_id, data in self.orders.items() if self.stamps[order_id] >= floor],
+            'removed': [order_id for stamp, order_id in self.removed
+                        if stamp >= floor and order_id not in self.orders]
+        }
+
+class BoardListener:
+    # Assinatura do broker que só marca os pedidos avisados como alterados;
+    # a leitura do quadro os recarrega
+    channels = (BOARD_CHANNEL,)
+
+    def __init__(self, boards):
+        self.boards = boards
+
+    def put(self, message):
+        for restaurant_id, order_id in message['orders']:
+            self.boards.mark_dirty(restaurant_id, order_id)
+
+class OrderBoards:
+    # Quadros por restaurante, carregados no primeiro acesso e mantidos pelos
+    # commits de Order. Os callbacks de commit não podem consultar o banco:
+    # eles só marcam os pedidos alterados, que são recarregados (numa única
+    # consulta) na próxima leitura do quadro. Com um broker compartilhado
+    # (PostgreSQL) os commits de todos os workers chegam pelo canal
+    # BOARD_CHANNEL; sem ele, os de outros workers só entram quando o quadro
+    # é refeito, após max_age.
+
+    def __init__(self, max_age=30, history=500):
+        self.max_age = max_age
+        self.history = history
+        self.boards = {}
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _board(self, restaurant_id):
+        if self._pid != os.getpid():
+            # Cada worker do gunicorn começa com quadros e assinatura próprios
+            with self._lock:
+                if self._pid != os.getpid():
+                    self.boards = {}
+                    if get_broker().shared:
+                        get_broker().add(BoardListener(self))
+                    self._pid = os.getpid()
+        board = self.boards.get(restaurant_id)
+        if board is None:
+            with self._lock:
+                board = self.boards.setdefault(restaurant_id, RestaurantBoard(restaurant_id, self.history))
+        return board
+
+    def _load(self, query):
+        return {data['id']: data for data in order_rows(query, per_page=10000)}
+
+    @staticmethod
+    def _stamps(condition):
+        return {order_id: updated_at or created_at or datetime.min for order_id, updated_at, created_at in
+                Order.query.with_entities(Order.id, Order.updated_at, Order.created_at).filter(condition)}
+
+    def read(self, restaurant_id, since=None):
+        # since: valor devolvido pela leitura anterior, em qualquer worker
+        board = self._board(restaurant_id)
+        with board.lock:
+            now = datetime.utcnow()
+            if board.loaded_at is None or time.monotonic() - board.loaded_at >= self.max_age:
+                board.dirty.clear()
+                condition = (Order.restaurant_id == restaurant_id) & Order.status.in_(OPEN_STATUSES)
+                board.replace(self._load(Order.query.filter(condition)), self._stamps(condition), now)
+            elif board.dirty:
+                order_ids, board.dirty = board.dirty, set()
+                board.apply(self._load(Order.query.filter(Order.id.in_(order_ids),
+                                                          Order.status.in_(OPEN_STATUSES))),
+                            self._stamps(Order.id.in_(order_ids)), now)
+
+            since = _parse_since(since)
+            return board.snapshot() if since is None else board.changes_since(since)
+
+    def queue_depth(self, restaurant_id, statuses):
+        # Pedidos nos status informados, se o quadro estiver carregado e em
+        # dia; None quando for preciso consultar o banco
+        board = self.boards.get(restaurant_id) if self._pid == os.getpid() else None
+        if (board is None or board.loaded_at is None or board.dirty
+                or time.monotonic() - board.loaded_at >= self.max_age):
+            return None
+        return sum(1 for data in list(board.orders.values()) if data['status'] in statuses)
+
+    def mark_dirty(self, restaurant_id, order_id):
+        board = self.boards.get(restaurant_id)
+        if board is not None and board.loaded_at is not None:
+            with board.lock:
+                board.dirty.add(order_id)
+
+    def invalidate(self):
+        for board in list(self.boards.values()):
+            board.loaded_at = None
+
+def _parse_since(since):
+    if not since:
+        return None
+    try:
+        return datetime.fromisoformat(since)
+    except ValueError:
+        return None
+
+order_boards = OrderBoards()
+
+@on_commit(Order)
+def _mark_board_orders(changes):
+    touched = []
+    for change in changes:
+        if change.op == 'update' and not change.changed:
+            continue
+        values = change.values
+        if not {'id', 'restaurant_id'} <= values.keys():
+            # Atributos expirados: refaz os quadros na próxima leitura
+            order_boards.invalidate()
+            continue
+        order_boards.mark_dirty(values['restaurant_id'], values['id'])
+        touched.append([values['restaurant_id'], values['id']])
+
+    # Os outros workers recebem pelo broker (este também, sem efeito)
+    broker = get_broker()
+    if broker.shared:
+        for start in range(0, len(touched), BOARD_MESSAGE_SIZE):
+            broker.publish(BOARD_CHANNEL, {'type': 'order_board',
+                                           'orders': touched[start:start + BOARD_MESSAGE_SIZE]})
@@ -0,0 +1,33 @@
+from flask import Blueprint, request, jsonify
+from src.models.order import Order
+from src.models.pagination import keyset_page, parse_fields, parse_limit
+from src.routes.auth import token_required
+
+order_pages_bp = Blueprint('order_pages', __name__)
+
+@order_pages_bp.route('/mine', methods=['GET'])
+@token_required
+def get_my_orders(current_user):
+    # Pedidos do usuário, do mais novo ao mais antigo, por cursor
+    # (?cursor= da página anterior) e com projeção opcional (?fields=)
+    try:
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+    try:
+        fields = parse_fields(Order, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # Sem projeção os itens vêm junto, carregados em lote
+    query = Order.query if fields is not None else Order.with_items()
+    query = query.filter(Order.user_id == current_user.id)
+    if request.args.get('status'):
+        query = query.filter(Order.status == request.args['status'])
+
+    try:
+        page = keyset_page(query, Order, request.args.get('cursor'), limit, fields)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    return jsonify({'orders': page['items'], 'next_cursor': page['next_cursor']}), 200
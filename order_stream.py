@@ -0,0 +1,77 @@
+import json
+import logging
+from datetime import datetime
+from flask import Blueprint, Response, jsonify
+from src.models.events import on_commit
+from src.models.order import Order
+from src.models.restaurant import Restaurant
+from src.routes.auth import stream_token_required
+from src.services.broker import get_broker, stream_available
+
+logger = logging.getLogger(__name__)
+
+order_stream_bp = Blueprint('order_stream', __name__)
+
+HEARTBEAT_SECONDS = 15
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+def restaurant_channel(restaurant_id):
+    return f'restaurant:{restaurant_id}'
+
+@on_commit(Order)
+def _publish_status_changes(changes):
+    broker = get_broker()
+    for change in changes:
+        if change.op == 'delete' or 'status' not in change.changed:
+            continue
+
+        values = change.values
+        if not {'id', 'user_id', 'restaurant_id', 'status'} <= values.keys():
+            logger.warning('Order status change without loaded keys; not published')
+            continue
+
+        message = {
+            'type': 'order_status',
+            'order_id': values['id'],
+            'order_number': values.get('order_number'),
+            'restaurant_id': values['restaurant_id'],
+            'status': values['status'],
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        # Cliente e restaurante do pedido recebem a mesma mensagem
+        broker.publish(user_channel(values['user_id']), message)
+        broker.publish(restaurant_channel(values['restaurant_id']), message)
+
+def _event_stream(subscription):
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            message = subscription.get(timeout=HEARTBEAT_SECONDS)
+            if message is None:
+                # Comentário SSE mantém a conexão viva através de proxies
+                yield ': keepalive\n\n'
+                continue
+            yield f"event: {message['type']}\ndata: {json.dumps(message)}\n\n"
+    finally:
+        subscription.close()
+
+@order_stream_bp.route('/stream', methods=['GET'])
+@stream_token_required
+def stream_order_updates(current_user):
+    if not stream_available():
+        # Broker local com vários workers: eventos de outros processos não
+        # chegariam a este stream
+        return jsonify({'message': 'Order stream requires PostgreSQL or a single worker'}), 503
+
+    channels = [user_channel(current_user.id)]
+    if current_user.user_type == 'restaurant':
+        owned = Restaurant.query.with_entities(Restaurant.id).filter_by(owner_id=current_user.id).all()
+        channels.extend(restaurant_channel(restaurant_id) for restaurant_id, in owned)
+
+    subscription = get_broker().subscribe(*channels)
+    return Response(_event_stream(subscription), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
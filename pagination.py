@@ -0,0 +1,91 @@
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+def encode_cursor(created_at, id):
+    # created_at None (registro sem data) vira a data vazia
+    raw = f"{created_at.isoformat() if created_at else ''}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, id = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(created_at) if created_at else None, int(id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+
+def parse_limit(value):
+    if value is None:
+        return DEFAULT_LIMIT
+    return max(1, min(int(value), MAX_LIMIT))
+
+def parse_fields(model, value):
+    # "name,rating,address" -> ['name', 'rating', 'address']; None = todos os campos.
+    # Só as chaves de to_dict() (model.row_fields): colunas internas, como
+    # a idempotency_key do pedido, não são expostas
+    if not value:
+        return None
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    allowed = set(getattr(model, 'row_fields', ()))
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return fields
+
+def _projected_columns(model, fields):
+    composites = getattr(model, 'composite_fields', {})
+    names = ['id', 'created_at']
+    for field in fields:
+        names.extend(composites[field].values() if field in composites else [field])
+    return list(dict.fromkeys(names))
+
+def _projected_dict(model, fields, row):
+    composites = getattr(model, 'composite_fields', {})
+    data = {'id': row.id}
+    for field in fields:
+        if field in composites:
+            data[field] = {key: getattr(row, column) for key, column in composites[field].items()}
+        else:
+            value = getattr(row, field)
+            data[field] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+def keyset_page(query, model, cursor=None, limit=DEFAULT_LIMIT, fields=None):
+    # Página ordenada por (created_at, id) decrescente. O filtro pelo cursor
+    # mantém o custo de páginas profundas igual ao da primeira; com fields,
+    # apenas as colunas pedidas são selecionadas no SQL. Registros sem
+    # created_at vêm depois de todos os datados, por id decrescente (a
+    # posição dos NULLs no ORDER BY muda de um banco para outro).
+    if fields is not None:
+        columns = [getattr(model, name) for name in _projected_columns(model, fields)]
+        query = query.with_entities(*columns)
+
+    created_at, id = decode_cursor(cursor) if cursor else (None, None)
+    rows = []
+    if not cursor or created_at is not None:
+        dated = query.filter(model.created_at.isnot(None))
+        if cursor:
+            dated = dated.filter(or_(model.created_at < created_at,
+                                     and_(model.created_at == created_at, model.id < id)))
+        rows = dated.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        # Datados esgotados: completa com os sem data
+        undated = query.filter(model.created_at.is_(None))
+        if id is not None and created_at is None:
+            undated = undated.filter(model.id < id)
+        rows += undated.order_by(model.id.desc()).limit(limit + 1 - len(rows)).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if fields is None:
+        items = [row.to_dict() for row in rows]
+    else:
+        items = [_projected_dict(model, fields, row) for row in rows]
+
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return {'items': items, 'next_cursor': next_cursor}
@@ -0,0 +1,76 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug import security
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Esquema usado em novos hashes; hashes antigos migram no próximo login
+PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+
+HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+# Hashes aguardando ou em execução além dos quais novos logins recebem 503
+MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 16))
+WAIT_SECONDS = 2.0
+
+class HashingBusy(Exception):
+    pass
+
+class HashingPool:
+    # Pool de processos para o PBKDF2, fora da thread da requisição. O
+    # semáforo limita a fila: sob uma rajada de logins as requisições
+    # excedentes falham rápido em vez de acumular e travar o worker.
+
+    def __init__(self, workers=HASH_WORKERS, max_pending=MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _get_executor(self):
+        # Criado sob demanda, já dentro de cada worker do gunicorn
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def run(self, function, *args):
+        if not self._slots.acquire(timeout=WAIT_SECONDS):
+            raise HashingBusy()
+        try:
+            return self._get_executor().submit(function, *args).result()
+        finally:
+            self._slots.release()
+
+pool = HashingPool()
+
+def hash_password(password):
+    return pool.run(generate_password_hash, password, PASSWORD_HASH_METHOD)
+
+def verify_password(password_hash, password):
+    return pool.run(check_password_hash, password_hash, password)
+
+def _scheme(method):
+    # Prefixo de um hash (ou PASSWORD_HASH_METHOD) como (método, parâmetros)
+    # com os padrões do werkzeug preenchidos: "scrypt" == "scrypt:32768:8:1"
+    # e "pbkdf2" == "pbkdf2:sha256" == "pbkdf2:sha256:<iterações padrão>"
+    name, *params = method.split(':')
+    if name == 'scrypt':
+        defaults = (2 ** 15, 8, 1)
+        return (name,) + tuple(int(value) for value in params) + defaults[len(params):]
+    if name == 'pbkdf2':
+        digest = params[0] if params else 'sha256'
+        iterations = int(params[1]) if len(params) > 1 else PBKDF2_DEFAULT_ITERATIONS
+        return (name, digest, iterations)
+    return (name, *params)
+
+PBKDF2_DEFAULT_ITERATIONS = getattr(security, 'DEFAULT_PBKDF2_ITERATIONS', 600000)
+PASSWORD_HASH_SCHEME = _scheme(PASSWORD_HASH_METHOD)
+
+def needs_rehash(password_hash):
+    try:
+        return _scheme(password_hash.split('$', 1)[0]) != PASSWORD_HASH_SCHEME
+    except ValueError:
+        return True
@@ -26,10 +26,9 @@ def populate_database():
             Category(name="Bebidas", description="Refrigerantes, sucos e bebidas", image_url="https://via.placeholder.com/300x200?text=Bebidas")
         ]
         
-        for category in categories:
-            db.session.add(category)
-        
-        db.session.commit()
+        db.session.add_all(categories)
+        db.session.flush()
+        categories_by_name = {category.name: category for category in categories}
         
         print("Criando usuários...")
         # Criar usuários de teste
@@ -41,25 +40,22 @@ def populate_database():
             User(username="restaurante2", email="restaurante2@email.com", full_name="Dono da Pizzaria", user_type="restaurant", phone="(11) 99999-4444"),
         ]
         
-        for user in users:
-            user.set_password("123456")
-            db.session.add(user)
+        # Todos compartilham a mesma senha: o hash é calculado uma única vez
+        users[0].set_password("123456")
+        for user in users[1:]:
+            user.password_hash = users[0].password_hash
         
-        db.session.commit()
+        db.session.add_all(users)
+        db.session.flush()
         
-        # Buscar usuários criados
-        admin = User.query.filter_by(username="admin").first()
-        cliente1 = User.query.filter_by(username="cliente1").first()
-        cliente2 = User.query.filter_by(username="cliente2").first()
-        restaurante1 = User.query.filter_by(username="restaurante1").first()
-        restaurante2 = User.query.filter_by(username="restaurante2").first()
+        # Referências em memória, sem reconsultar o banco
+        admin, cliente1, cliente2, restaurante1, restaurante2 = users
         
-        # Buscar categorias
-        cat_lanches = Category.query.filter_by(name="Lanches").first()
-        cat_pizza = Category.query.filter_by(name="Pizza").first()
-        cat_japonesa = Category.query.filter_by(name="Japonesa").first()
-        cat_italiana = Category.query.filter_by(name="Italiana").first()
-        cat_doces = Category.query.filter_by(name="Doces").first()
+        cat_lanches = categories_by_name["Lanches"]
+        cat_pizza = categories_by_name["Pizza"]
+        cat_japonesa = categories_by_name["Japonesa"]
+        cat_italiana = categories_by_name["Italiana"]
+        cat_doces = categories_by_name["Doces"]
         
         print("Criando endereços...")
         # Criar endereços para clientes
@@ -70,10 +66,7 @@ def populate_database():
                    neighborhood="Bela Vista", city="São Paulo", state="SP", zip_code="01310-000", is_default=True)
         ]
         
-        for address in addresses:
-            db.session.add(address)
-        
-        db.session.commit()
+        db.session.add_all(addresses)
         
         print("Criando restaurantes...")
         # Criar restaurantes
@@ -185,17 +178,10 @@ def populate_database():
             )
         ]
         
-        for restaurant in restaurants:
-            db.session.add(restaurant)
+        db.session.add_all(restaurants)
+        db.session.flush()
         
-        db.session.commit()
-        
-        # Buscar restaurantes criados
-        burger_palace = Restaurant.query.filter_by(name="Burger Palace").first()
-        bella_napoli = Restaurant.query.filter_by(name="Pizzaria Bella Napoli").first()
-        sushi_zen = Restaurant.query.filter_by(name="Sushi Zen").first()
-        pasta_amore = Restaurant.query.filter_by(name="Pasta & Amore").first()
-        doce_tentacao = Restaurant.query.filter_by(name="Doce Tentação").first()
+        burger_palace, bella_napoli, sushi_zen, pasta_amore, doce_tentacao = restaurants
         
         print("Criando categorias de produtos...")
         # Criar categorias de produtos para cada restaurante
@@ -227,29 +213,28 @@ def populate_database():
             ProductCategory(name="Sobremesas", restaurant_id=doce_tentacao.id, order=3)
         ]
         
-        for cat in product_categories:
-            db.session.add(cat)
-        
-        db.session.commit()
+        db.session.add_all(product_categories)
+        db.session.flush()
         
         print("Criando produtos...")
-        # Buscar categorias de produtos
-        burger_hamburgueres = ProductCategory.query.filter_by(name="Hambúrgueres", restaurant_id=burger_palace.id).first()
-        burger_acompanhamentos = ProductCategory.query.filter_by(name="Acompanhamentos", restaurant_id=burger_palace.id).first()
-        burger_bebidas = ProductCategory.query.filter_by(name="Bebidas", restaurant_id=burger_palace.id).first()
+        sections = {(cat.restaurant_id, cat.name): cat for cat in product_categories}
         
-        pizza_doces = ProductCategory.query.filter_by(name="Pizzas Doces", restaurant_id=bella_napoli.id).first()
-        pizza_salgadas = ProductCategory.query.filter_by(name="Pizzas Salgadas", restaurant_id=bella_napoli.id).first()
+        burger_hamburgueres = sections[(burger_palace.id, "Hambúrgueres")]
+        burger_acompanhamentos = sections[(burger_palace.id, "Acompanhamentos")]
+        burger_bebidas = sections[(burger_palace.id, "Bebidas")]
         
-        sushi_sushi = ProductCategory.query.filter_by(name="Sushi", restaurant_id=sushi_zen.id).first()
-        sushi_sashimi = ProductCategory.query.filter_by(name="Sashimi", restaurant_id=sushi_zen.id).first()
-        sushi_hot = ProductCategory.query.filter_by(name="Hot Rolls", restaurant_id=sushi_zen.id).first()
+        pizza_doces = sections[(bella_napoli.id, "Pizzas Doces")]
+        pizza_salgadas = sections[(bella_napoli.id, "Pizzas Salgadas")]
         
-        pasta_massas = ProductCategory.query.filter_by(name="Massas", restaurant_id=pasta_amore.id).first()
-        pasta_risotos = ProductCategory.query.filter_by(name="Risotos", restaurant_id=pasta_amore.id).first()
+        sushi_sushi = sections[(sushi_zen.id, "Sushi")]
+        sushi_sashimi = sections[(sushi_zen.id, "Sashimi")]
+        sushi_hot = sections[(sushi_zen.id, "Hot Rolls")]
         
-        doce_bolos = ProductCategory.query.filter_by(name="Bolos", restaurant_id=doce_tentacao.id).first()
-        doce_tortas = ProductCategory.query.filter_by(name="Tortas", restaurant_id=doce_tentacao.id).first()
+        pasta_massas = sections[(pasta_amore.id, "Massas")]
+        pasta_risotos = sections[(pasta_amore.id, "Risotos")]
+        
+        doce_bolos = sections[(doce_tentacao.id, "Bolos")]
+        doce_tortas = sections[(doce_tentacao.id, "Tortas")]
         
         # Criar produtos
         products = [
@@ -321,9 +306,7 @@ def populate_database():
                    image_url="https://via.placeholder.com/300x200?text=Cheesecake")
         ]
         
-        for product in products:
-            db.session.add(product)
-        
+        db.session.add_all(products)
         db.session.commit()
         
         print("Banco de dados populado com sucesso!")
@@ -338,5 +321,15 @@ def populate_database():
         print(f"Produtos criados: {len(products)}")
 
 if __name__ == "__main__":
-    populate_database()
+    if len(sys.argv) > 1:
+        # python populate_db.py catalogo.csv: importação em lote de produtos
+        from bulk_import import import_catalog, DatabaseInUse
+        with app.app_context():
+            try:
+                loader = import_catalog(sys.argv[1])
+            except DatabaseInUse as e:
+                sys.exit(str(e))
+            print(f"Produtos importados: {loader.rows} ({loader.rate:,.0f} linhas/s)")
+    else:
+        populate_database()
 
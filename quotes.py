@@ -0,0 +1,43 @@
+from flask import Blueprint, request, jsonify
+from src.models.user import Address
+from src.routes.auth import token_required
+from src.services.delivery_quotes import quote_engine
+from src.services.cart_store import cart_store
+
+quotes_bp = Blueprint('quotes', __name__)
+
+MAX_RESTAURANTS = 500
+
+@quotes_bp.route('/quotes', methods=['POST'])
+@token_required
+def get_delivery_quotes(current_user):
+    # Taxa e prazo de entrega de vários restaurantes para um endereço do
+    # usuário (address_id) ou coordenadas (latitude/longitude)
+    data = request.get_json() or {}
+
+    restaurant_ids = data.get('restaurant_ids')
+    if (not isinstance(restaurant_ids, list) or not restaurant_ids
+            or not all(isinstance(restaurant_id, int) for restaurant_id in restaurant_ids)):
+        return jsonify({'message': 'restaurant_ids must be a non-empty list of ids'}), 400
+    if len(restaurant_ids) > MAX_RESTAURANTS:
+        return jsonify({'message': f'At most {MAX_RESTAURANTS} restaurants per request'}), 400
+
+    if data.get('address_id') is not None:
+        address = Address.query.filter_by(id=data['address_id'], user_id=current_user.id).first()
+        if not address:
+            return jsonify({'message': 'Address not found'}), 404
+        lat, lng = address.latitude, address.longitude
+    else:
+        lat, lng = data.get('latitude'), data.get('longitude')
+
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        return jsonify({'message': 'Address has no coordinates'}), 400
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'message': 'Invalid coordinates'}), 400
+
+    cart = cart_store.serialize(current_user.id) if data.get('include_cart', True) else None
+    quotes = quote_engine.quote(lat, lng, restaurant_ids, cart)
+    return jsonify({'quotes': [quotes[restaurant_id] for restaurant_id in dict.fromkeys(restaurant_ids)
+                               if restaurant_id in quotes]}), 200
@@ -0,0 +1,28 @@
+import threading
+import time
+from src.services.cache import TTLCache
+
+class RateLimiter:
+    # Token bucket por chave: até `capacity` tentativas seguidas, repostas à
+    # razão de `rate` por segundo. Os baldes vivem num LRU limitado, então
+    # chaves inativas são descartadas sozinhas.
+
+    def __init__(self, capacity=5, rate=5 / 60, maxsize=100000):
+        self.capacity = capacity
+        self.rate = rate
+        self._buckets = TTLCache(maxsize=maxsize, ttl=capacity / rate)
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets.set(key, (tokens, now))
+        return allowed
+
+    def reset(self, key):
+        self._buckets.pop(key)
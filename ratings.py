@@ -0,0 +1,106 @@
+import argparse
+from sqlalchemy import Float, bindparam, case, cast, event, func, inspect
+from sqlalchemy.orm import object_session
+from src.models.events import Change, publish
+from src.models.user import db
+from src.models.restaurant import Restaurant
+from src.models.order import Review
+
+restaurants = Restaurant.__table__
+
+def _rating_change(restaurant_id):
+    # O UPDATE pelo Core não passa pelo on_commit(Restaurant): a alteração
+    # é avisada à mão, para os caches do restaurante
+    return Change('update', Restaurant, {'id': restaurant_id}, {'rating', 'rating_sum', 'total_reviews'})
+
+def _apply(connection, review, delta_sum, delta_count):
+    # Um único UPDATE relativo: O(1) por avaliação e atômico na mesma
+    # transação do INSERT/DELETE da Review; o aviso sai com os demais
+    # Changes da sessão, depois do commit
+    restaurant_id = review.restaurant_id
+    new_sum = func.coalesce(restaurants.c.rating_sum, 0) + delta_sum
+    new_count = func.coalesce(restaurants.c.total_reviews, 0) + delta_count
+    connection.execute(
+        restaurants.update()
+        .where(restaurants.c.id == restaurant_id)
+        .values(rating_sum=new_sum,
+                total_reviews=new_count,
+                rating=case((new_count > 0, cast(new_sum, Float) / new_count), else_=0.0))
+    )
+    session = object_session(review)
+    if session is not None:
+        session.info.setdefault('pending_changes', []).append(_rating_change(restaurant_id))
+
+@event.listens_for(Review, 'after_insert')
+def _review_created(mapper, connection, review):
+    _apply(connection, review, review.rating, 1)
+
+@event.listens_for(Review, 'after_delete')
+def _review_deleted(mapper, connection, review):
+    _apply(connection, review, -review.rating, -1)
+
+@event.listens_for(Review, 'after_update')
+def _review_updated(mapper, connection, review):
+    history = inspect(review).attrs.rating.history
+    if not history.deleted:
+        return
+    _apply(connection, review, review.rating - history.deleted[0], 0)
+
+def reconcile_ratings(chunk_size=1000):
+    # Recalcula rating/total_reviews a partir da tabela Review, uma faixa de
+    # restaurantes por vez (via índice em review.restaurant_id), gravando só
+    # o que divergiu. Retorna o número de restaurantes corrigidos.
+    last_id = 0
+    corrected = 0
+    statement = (restaurants.update()
+                 .where(restaurants.c.id == bindparam('restaurant_id'))
+                 .values(rating_sum=bindparam('new_sum'),
+                         total_reviews=bindparam('new_count'),
+                         rating=bindparam('new_rating')))
+
+    while True:
+        current = (db.session.query(Restaurant.id, Restaurant.rating_sum, Restaurant.total_reviews)
+                   .filter(Restaurant.id > last_id)
+                   .order_by(Restaurant.id)
+                   .limit(chunk_size)
+                   .all())
+        if not current:
+            break
+
+        first_id, last_id = current[0].id, current[-1].id
+        totals = {
+            restaurant_id: (float(total), count)
+            for restaurant_id, total, count in db.session.query(
+                Review.restaurant_id, func.sum(Review.rating), func.count(Review.id))
+            .filter(Review.restaurant_id.between(first_id, last_id))
+            .group_by(Review.restaurant_id)
+        }
+
+        params = []
+        for restaurant_id, rating_sum, total_reviews in current:
+            new_sum, new_count = totals.get(restaurant_id, (0.0, 0))
+            if rating_sum != new_sum or total_reviews != new_count:
+                params.append({
+                    'restaurant_id': restaurant_id,
+                    'new_sum': new_sum,
+                    'new_count': new_count,
+                    'new_rating': new_sum / new_count if new_count else 0.0
+                })
+
+        if params:
+            db.session.execute(statement, params)
+        db.session.commit()
+        publish([_rating_change(param['restaurant_id']) for param in params])
+        corrected += len(params)
+
+    return corrected
+
+if __name__ == '__main__':
+    from src.main import app
+
+    parser = argparse.ArgumentParser(description='Recalcula as avaliações dos restaurantes')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    with app.app_context():
+        print(f"Restaurantes corrigidos: {reconcile_ratings(args.chunk_size)}")
@@ -0,0 +1,58 @@
+from datetime import date, datetime, timedelta
+from flask import Blueprint, request, jsonify
+from src.models.restaurant import Restaurant
+from src.routes.auth import token_required
+from src.services.rollups import rollups, MAX_RANGE_DAYS
+
+reports_bp = Blueprint('reports', __name__)
+
+def _authorize(current_user, restaurant_id):
+    owner_id = Restaurant.query.with_entities(Restaurant.owner_id).filter_by(id=restaurant_id).scalar()
+    if owner_id is None:
+        return jsonify({'message': 'Restaurant not found'}), 404
+    if owner_id != current_user.id and current_user.user_type != 'admin':
+        return jsonify({'message': 'Access denied'}), 403
+    return None
+
+def _date_range():
+    # ?from=AAAA-MM-DD&to=AAAA-MM-DD (dias locais, inclusive); padrão: últimos 30 dias
+    today = (datetime.utcnow() + timedelta(hours=rollups.utc_offset_hours)).date()
+    end = date.fromisoformat(request.args['to']) if request.args.get('to') else today
+    start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=29)
+    if start > end or (end - start).days >= MAX_RANGE_DAYS:
+        raise ValueError()
+    return start, end
+
+@reports_bp.route('/<int:restaurant_id>/reports/sales', methods=['GET'])
+@token_required
+def get_sales_report(current_user, restaurant_id):
+    # Faturamento, pedidos, ticket médio e itens vendidos por dia ou hora,
+    # lidos das rollups (pedidos entregues)
+    denied = _authorize(current_user, restaurant_id)
+    if denied:
+        return denied
+
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ('day', 'hour'):
+        return jsonify({'message': 'granularity must be day or hour'}), 400
+    try:
+        start, end = _date_range()
+    except ValueError:
+        return jsonify({'message': f'Invalid date range (YYYY-MM-DD, at most {MAX_RANGE_DAYS} days)'}), 400
+
+    return jsonify(rollups.sales(restaurant_id, start, end, granularity)), 200
+
+@reports_bp.route('/<int:restaurant_id>/reports/products', methods=['GET'])
+@token_required
+def get_top_products(current_user, restaurant_id):
+    denied = _authorize(current_user, restaurant_id)
+    if denied:
+        return denied
+
+    try:
+        start, end = _date_range()
+    except ValueError:
+        return jsonify({'message': f'Invalid date range (YYYY-MM-DD, at most {MAX_RANGE_DAYS} days)'}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+
+    return jsonify(rollups.top_products(restaurant_id, start, end, limit)), 200
@@ -1,6 +1,11 @@
 from src.models.user import db
 from datetime import datetime
 
+def _initial_rating_sum(context):
+    # Restaurantes cadastrados já com rating/total_reviews (ex.: populate_db)
+    params = context.get_current_parameters()
+    return (params.get('rating') or 0.0) * (params.get('total_reviews') or 0)
+
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -48,6 +53,8 @@ class Restaurant(db.Model):
     delivery_time = db.Column(db.Integer, default=30)  # em minutos
     rating = db.Column(db.Float, default=0.0)
     total_reviews = db.Column(db.Integer, default=0)
+    # Soma das notas, mantida incrementalmente; rating = rating_sum / total_reviews
+    rating_sum = db.Column(db.Float, default=_initial_rating_sum)
     
     # Relacionamentos
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=True)
@@ -58,6 +65,21 @@ class Restaurant(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Campos aninhados de to_dict(), usados na projeção (fields=)
+    composite_fields = {
+        'address': {
+            'street': 'street',
+            'number': 'number',
+            'complement': 'complement',
+            'neighborhood': 'neighborhood',
+            'city': 'city',
+            'state': 'state',
+            'zip_code': 'zip_code',
+            'latitude': 'latitude',
+            'longitude': 'longitude'
+        }
+    }
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -124,6 +146,10 @@ class Product(db.Model):
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # Chaves de to_dict(), na mesma ordem (serialização por tuplas em src.models.rows)
+    row_fields = ('id', 'name', 'description', 'price', 'image_url', 'is_available', 'is_active',
+                  'preparation_time', 'restaurant_id', 'category_id', 'created_at')
+    
     def to_dict(self):
         return {
             'id': self.id,
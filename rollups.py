@@ -0,0 +1,277 @@
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from src.models.events import on_commit
+from src.models.user import db
+from src.models.restaurant import Product
+from src.models.order import Order, OrderItem
+from src.models.analytics import SalesRollup, DailySalesRollup, ProductSalesRollup, RolledUpOrder
+
+EPOCH = datetime(1970, 1, 1)
+MAX_RANGE_DAYS = 366
+
+def _group(keys, *weights):
+    # Soma os pesos por chave composta: (chaves distintas, [somas])
+    unique_keys, inverse = np.unique(np.stack(keys, axis=1), axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    return unique_keys, [np.bincount(inverse, weights=weight, minlength=len(unique_keys)) for weight in weights]
+
+def aggregate(orders, items, utc_offset_hours=0):
+    # Agregação vetorizada de um lote, sem acesso ao banco:
+    #   orders: (order_id, restaurant_id, entregue_em, total), ids distintos
+    #   items:  (order_id, product_id, quantidade, total_price); itens de
+    #           pedidos fora do lote são ignorados
+    # Horas e dias são contados desde 1970-01-01 no horário local. Retorna
+    # {'hourly': [(restaurante, hora, pedidos, faturamento, itens)],
+    #  'daily': [(restaurante, dia, pedidos, faturamento, itens)],
+    #  'products': [(restaurante, dia, produto, quantidade, faturamento)],
+    #  'orders': [(order_id, hora)]}
+    if not orders:
+        return {'hourly': [], 'daily': [], 'products': [], 'orders': []}
+    order_ids, restaurant_ids, delivered_at, totals = zip(*orders)
+    order_ids = np.array(order_ids, dtype=np.int64)
+    restaurant_ids = np.array(restaurant_ids, dtype=np.int64)
+    totals = np.array(totals, dtype=float)
+    seconds = np.array(delivered_at, dtype='datetime64[s]').astype(np.int64) + utc_offset_hours * 3600
+    hours = seconds // 3600
+    days = hours // 24
+
+    # Itens de cada pedido do lote, localizados por busca binária nos ids ordenados
+    quantities = np.zeros(len(order_ids))
+    products = []
+    if items:
+        item_orders, item_products, item_quantities, item_totals = (np.array(column) for column in zip(*items))
+        order_sort = np.argsort(order_ids)
+        position = np.clip(np.searchsorted(order_ids, item_orders, sorter=order_sort), 0, len(order_ids) - 1)
+        index = order_sort[position]
+        inside = order_ids[index] == item_orders
+        index, item_products = index[inside], item_products[inside].astype(np.int64)
+        item_quantities, item_totals = item_quantities[inside].astype(float), item_totals[inside].astype(float)
+        quantities = np.bincount(index, weights=item_quantities, minlength=len(order_ids))
+        if len(index):
+            keys, (sold, revenue) = _group([restaurant_ids[index], days[index], item_products],
+                                           item_quantities, item_totals)
+            products = [(int(r), int(d), int(p), int(q), float(v)) for (r, d, p), q, v in zip(keys, sold, revenue)]
+
+    ones = np.ones(len(order_ids))
+    result = {'products': products, 'orders': list(zip(order_ids.tolist(), hours.tolist()))}
+    for name, bucket in (('hourly', hours), ('daily', days)):
+        keys, (counts, revenue, sold) = _group([restaurant_ids, bucket], ones, totals, quantities)
+        result[name] = [(int(r), int(b), int(c), float(v), int(q))
+                        for (r, b), c, v, q in zip(keys, counts, revenue, sold)]
+    return result
+
+class RollupPipeline:
+    # Mantém as rollups de vendas a partir dos pedidos entregues. A carga
+    # histórica (backfill) percorre os pedidos por faixas de id e agrega
+    # cada lote com NumPy; a incremental (refresh) só olha os pedidos
+    # criados nos últimos `lookback` que ainda não estão em rolled_up_order.
+    # A incremental roda antes de um relatório quando algum pedido foi
+    # entregue neste processo ou após max_age segundos, para absorver as
+    # entregas feitas em outros workers. Horas e dias seguem o horário
+    # local (utc_offset_hours, padrão Brasília).
+
+    def __init__(self, utc_offset_hours=-3, lookback=timedelta(days=2), max_age=60, chunk_size=50000):
+        self.utc_offset_hours = utc_offset_hours
+        self.lookback = lookback
+        self.max_age = max_age
+        self.chunk_size = chunk_size
+        self._dirty = True
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def _delivered(self):
+        # Pedidos entregues ainda fora das rollups
+        return (select(Order.id, Order.restaurant_id, func.coalesce(Order.delivered_at, Order.created_at),
+                       Order.total)
+                .outerjoin(RolledUpOrder, RolledUpOrder.order_id == Order.id)
+                .where(Order.status == 'delivered', RolledUpOrder.order_id.is_(None)))
+
+    def _upsert(self, model, keys, rows, sums):
+        insert = postgresql.insert if db.engine.dialect.name == 'postgresql' else sqlite.insert
+        statement = insert(model.__table__)
+        statement = statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: model.__table__.c[column] + statement.excluded[column] for column in sums})
+        db.session.execute(statement, rows)
+
+    def _process(self, orders):
+        # Soma um lote às rollups numa transação. Se outro processo somou
+        # algum dos pedidos antes (chave de rolled_up_order), o lote é
+        # descartado e volta na próxima execução.
+        if not orders:
+            return 0
+        # Itens pela faixa de ids (índice de order_id); os de pedidos fora
+        # do lote são descartados na agregação
+        order_ids = [order[0] for order in orders]
+        items = db.session.execute(
+            select(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.total_price)
+            .where(OrderItem.order_id.between(min(order_ids), max(order_ids)))
+        ).all()
+        result = aggregate(orders, items, self.utc_offset_hours)
+        sums = ('orders', 'revenue', 'items_sold')
+
+        try:
+            db.session.execute(RolledUpOrder.__table__.insert(),
+                               [{'order_id': order_id, 'bucket': EPOCH + timedelta(hours=hour)}
+                                for order_id, hour in result['orders']])
+            self._upsert(SalesRollup, ['restaurant_id', 'bucket'],
+                         [{'restaurant_id': r, 'bucket': EPOCH + timedelta(hours=h), 'orders': c,
+                           'revenue': v, 'items_sold': q} for r, h, c, v, q in result['hourly']], sums)
+            self._upsert(DailySalesRollup, ['restaurant_id', 'day'],
+                         [{'restaurant_id': r, 'day': (EPOCH + timedelta(days=d)).date(), 'orders': c,
+                           'revenue': v, 'items_sold': q} for r, d, c, v, q in result['daily']], sums)
+            if result['products']:
+                self._upsert(ProductSalesRollup, ['restaurant_id', 'day', 'product_id'],
+                             [{'restaurant_id': r, 'day': (EPOCH + timedelta(days=d)).date(), 'product_id': p,
+                               'quantity': q, 'revenue': v} for r, d, p, q, v in result['products']],
+                             ('quantity', 'revenue'))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return 0
+        return len(orders)
+
+    def backfill(self, chunk_size=None, progress=None):
+        # Todo o histórico, em faixas de chunk_size ids: memória limitada
+        # qualquer que seja o tamanho da tabela de pedidos
+        chunk_size = chunk_size or self.chunk_size
+        low, high = db.session.execute(select(func.min(Order.id), func.max(Order.id))).one()
+        total = 0
+        if low is None:
+            return total
+        for start in range(low, high + 1, chunk_size):
+            orders = db.session.execute(self._delivered().where(Order.id.between(start, start + chunk_size - 1))).all()
+            total += self._process(orders)
+            if progress:
+                progress(min(start + chunk_size - 1, high), high, total)
+        return total
+
+    def include(self, condition, limit=None):
+        # Soma os entregues ainda fora das rollups que atendem à condição
+        # (ex.: antes de o arquivo morto apagá-los da tabela de pedidos)
+        query = self._delivered().where(condition).order_by(Order.id)
+        orders = db.session.execute(query if limit is None else query.limit(limit)).all()
+        total = 0
+        for start in range(0, len(orders), self.chunk_size):
+            total += self._process(orders[start:start + self.chunk_size])
+        return total
+
+    def refresh(self):
+        with self._lock:
+            self._dirty = False
+            self._refreshed_at = time.monotonic()
+            since = datetime.utcnow() - self.lookback
+            orders = db.session.execute(self._delivered().where(Order.created_at >= since)
+                                        .order_by(Order.id)).all()
+            total = 0
+            for start in range(0, len(orders), self.chunk_size):
+                total += self._process(orders[start:start + self.chunk_size])
+            return total
+
+    def maybe_refresh(self):
+        if self._dirty or time.monotonic() - self._refreshed_at >= self.max_age:
+            self.refresh()
+
+    @staticmethod
+    def _range(start, end):
+        # Dias locais [start, end] como horas locais [início, fim)
+        midnight = datetime.min.time()
+        return datetime.combine(start, midnight), datetime.combine(end + timedelta(days=1), midnight)
+
+    def sales(self, restaurant_id, start, end, granularity='day'):
+        # No máximo uma linha por dia (ou por hora) do intervalo pedido,
+        # qualquer que seja o tamanho do histórico de pedidos
+        self.maybe_refresh()
+        if granularity == 'hour':
+            first, last = self._range(start, end)
+            rows = (db.session.query(SalesRollup.bucket, SalesRollup.orders, SalesRollup.revenue,
+                                     SalesRollup.items_sold)
+                    .filter(SalesRollup.restaurant_id == restaurant_id,
+                            SalesRollup.bucket >= first, SalesRollup.bucket < last)
+                    .order_by(SalesRollup.bucket))
+        else:
+            rows = (db.session.query(DailySalesRollup.day, DailySalesRollup.orders, DailySalesRollup.revenue,
+                                     DailySalesRollup.items_sold)
+                    .filter(DailySalesRollup.restaurant_id == restaurant_id,
+                            DailySalesRollup.day >= start, DailySalesRollup.day <= end)
+                    .order_by(DailySalesRollup.day))
+        series = [(bucket, [orders, revenue, items_sold]) for bucket, orders, revenue, items_sold in rows]
+
+        def summary(orders, revenue, items_sold):
+            return {
+                'orders': orders,
+                'revenue': round(revenue, 2),
+                'average_ticket': round(revenue / orders, 2) if orders else 0.0,
+                'items_sold': items_sold
+            }
+
+        totals = [sum(column) for column in zip(*(values for _, values in series))] or [0, 0.0, 0]
+        return {
+            'restaurant_id': restaurant_id,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'granularity': granularity,
+            'utc_offset_hours': self.utc_offset_hours,
+            'totals': summary(*totals),
+            'series': [dict(summary(*values), bucket=bucket.isoformat()) for bucket, values in series]
+        }
+
+    def top_products(self, restaurant_id, start, end, limit=10):
+        self.maybe_refresh()
+        quantity = func.sum(ProductSalesRollup.quantity)
+        revenue = func.sum(ProductSalesRollup.revenue)
+        rows = (db.session.query(ProductSalesRollup.product_id, Product.name, quantity, revenue)
+                .outerjoin(Product, Product.id == ProductSalesRollup.product_id)
+                .filter(ProductSalesRollup.restaurant_id == restaurant_id,
+                        ProductSalesRollup.day >= start, ProductSalesRollup.day <= end)
+                .group_by(ProductSalesRollup.product_id, Product.name)
+                .order_by(revenue.desc(), ProductSalesRollup.product_id)
+                .limit(limit)
+                .all())
+        return {
+            'restaurant_id': restaurant_id,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'products': [{'product_id': product_id, 'name': name, 'quantity': int(sold), 'revenue': round(total, 2)}
+                         for product_id, name, sold, total in rows]
+        }
+
+rollups = RollupPipeline(utc_offset_hours=int(os.environ.get('REPORTS_UTC_OFFSET', -3)))
+
+@on_commit(Order)
+def _order_delivered(changes):
+    for change in changes:
+        if 'status' in change.changed and change.values.get('status') == 'delivered':
+            rollups.mark_dirty()
+            return
+
+if __name__ == '__main__':
+    # Carga histórica: python -m src.services.rollups --backfill
+    from src.main import app
+
+    parser = argparse.ArgumentParser(description='Atualiza as rollups de vendas')
+    parser.add_argument('--backfill', action='store_true', help='processa todo o histórico de pedidos')
+    parser.add_argument('--chunk', type=int, default=rollups.chunk_size, help='pedidos por lote')
+    args = parser.parse_args()
+
+    with app.app_context():
+        started = time.perf_counter()
+        if args.backfill:
+            def progress(position, high, total):
+                print(f'\r{position}/{high} ids, {total} pedidos entregues somados', end='', flush=True)
+            total = rollups.backfill(args.chunk, progress)
+            print()
+        else:
+            total = rollups.refresh()
+        elapsed = time.perf_counter() - started
+        print(f'{total} pedidos em {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} pedidos/s)')
@@ -0,0 +1,85 @@
+from src.models.user import db
+from src.models.order import Order, OrderItem
+from src.models.restaurant import Product
+
+# Serialização direto das tuplas do SELECT, sem instanciar os modelos nem
+# passar por to_dict(). Os dicts têm as mesmas chaves de to_dict(), mas as
+# datas continuam datetime: o JSON fica igual ao de to_dict() quando sai
+# pelo provider da aplicação (src.services.json_provider).
+
+def row_columns(model):
+    # Colunas na ordem de model.row_fields, com os campos aninhados expandidos
+    composites = getattr(model, 'composite_fields', {})
+    columns = []
+    for field in model.row_fields:
+        if field in composites:
+            columns.extend(getattr(model, column) for column in composites[field].values())
+        else:
+            columns.append(getattr(model, field))
+    return columns
+
+def row_serializer(model):
+    # Função tupla -> dict; sem campos aninhados é um único dict(zip())
+    composites = getattr(model, 'composite_fields', {})
+    if not any(field in composites for field in model.row_fields):
+        keys = model.row_fields
+        return lambda row: dict(zip(keys, row))
+
+    plan, offset = [], 0
+    for field in model.row_fields:
+        if field in composites:
+            width = len(composites[field])
+            plan.append((field, tuple(composites[field]), offset, offset + width))
+            offset += width
+        else:
+            plan.append((field, None, offset, offset + 1))
+            offset += 1
+
+    def serialize(row):
+        data = {}
+        for field, keys, start, end in plan:
+            data[field] = row[start] if keys is None else dict(zip(keys, row[start:end]))
+        return data
+    return serialize
+
+def _tuples(query, columns):
+    # Executa no Core: sem a camada de carregamento do ORM para cada linha
+    return db.session.connection().execute(query.with_entities(*columns).statement)
+
+def product_rows(query):
+    # Cardápio: query de Product (já filtrada) -> lista de dicts
+    serialize = row_serializer(Product)
+    return [serialize(row) for row in _tuples(query, row_columns(Product))]
+
+def order_rows(query, page=1, per_page=50):
+    # Mesmo resultado de serialize_orders() num número fixo de consultas:
+    # a página de pedidos, os seus itens e os produtos distintos, cada
+    # produto serializado uma única vez
+    orders = _tuples(query.order_by(Order.created_at.desc(), Order.id.desc())
+                     .limit(per_page)
+                     .offset((page - 1) * per_page), row_columns(Order))
+    serialize_order = row_serializer(Order)
+
+    result, by_id = [], {}
+    for row in orders:
+        data = serialize_order(row)
+        data['items'] = []
+        by_id[data['id']] = data
+        result.append(data)
+    if not by_id:
+        return result
+
+    serialize_item = row_serializer(OrderItem)
+    items = _tuples(OrderItem.query.filter(OrderItem.order_id.in_(by_id)).order_by(OrderItem.id),
+                    [OrderItem.order_id, *row_columns(OrderItem)]).all()
+    product_ids = {row[2] for row in items}
+
+    serialize_product = row_serializer(Product)
+    products = {row[0]: serialize_product(row) for row in
+                _tuples(Product.query.filter(Product.id.in_(product_ids)), row_columns(Product))}
+
+    for row in items:
+        item = serialize_item(row[1:])
+        item['product'] = products.get(item['product_id'])
+        by_id[row[0]]['items'].append(item)
+    return result
@@ -0,0 +1,55 @@
+from src.models.user import db
+from datetime import datetime
+
+# Janelas semanais em horário local (ver src.services.availability).
+# weekday segue date.weekday(): 0 = segunda ... 6 = domingo. closes_at
+# menor ou igual a opens_at atravessa a meia-noite; 00:00-00:00 é o dia
+# inteiro.
+
+class OpeningHours(db.Model):
+    # Horário de funcionamento: com alguma janela cadastrada, is_online do
+    # restaurante passa a ser ligado e desligado pelo agendador
+    __table_args__ = (
+        db.Index('ix_opening_hours_restaurant', 'restaurant_id', 'weekday'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    restaurant_id = db.Column(db.Integer, db.ForeignKey('restaurant.id'), nullable=False)
+    weekday = db.Column(db.Integer, nullable=False)
+    opens_at = db.Column(db.Time, nullable=False)
+    closes_at = db.Column(db.Time, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'restaurant_id': self.restaurant_id,
+            'weekday': self.weekday,
+            'opens_at': self.opens_at.strftime('%H:%M'),
+            'closes_at': self.closes_at.strftime('%H:%M')
+        }
+
+class ProductSchedule(db.Model):
+    # Janelas de oferta de um produto (café da manhã, prato do dia): com
+    # alguma janela cadastrada, is_available é controlado pelo agendador
+    __table_args__ = (
+        db.Index('ix_product_schedule_product', 'product_id', 'weekday'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
+    weekday = db.Column(db.Integer, nullable=False)
+    opens_at = db.Column(db.Time, nullable=False)
+    closes_at = db.Column(db.Time, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'product_id': self.product_id,
+            'weekday': self.weekday,
+            'opens_at': self.opens_at.strftime('%H:%M'),
+            'closes_at': self.closes_at.strftime('%H:%M')
+        }
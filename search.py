@@ -0,0 +1,27 @@
+from flask import Blueprint, request, jsonify
+from src.services.search_index import catalog_search, RESTAURANT, PRODUCT
+
+search_bp = Blueprint('search', __name__)
+
+MAX_LIMIT = 50
+
+@search_bp.route('', methods=['GET'])
+def search_catalog():
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'message': 'Query parameter q is required'}), 400
+
+    kind = request.args.get('type')
+    if kind not in (None, RESTAURANT, PRODUCT):
+        return jsonify({'message': 'type must be restaurant or product'}), 400
+
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), MAX_LIMIT))
+    except ValueError:
+        return jsonify({'message': 'limit must be an integer'}), 400
+
+    # prefix=1 trata o último termo como prefixo (typeahead)
+    prefix = request.args.get('prefix', '0').lower() in ('1', 'true')
+    results = catalog_search.search(query, prefix=prefix, kind=kind, limit=limit)
+
+    return jsonify({'query': query, 'results': results}), 200
@@ -0,0 +1,264 @@
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from flask import current_app
+from src.models.events import on_commit
+from src.models.restaurant import Category, Restaurant, Product
+
+RESTAURANT = 'restaurant'
+PRODUCT = 'product'
+CATEGORY = 'category'
+
+# Pesos por campo: nome pesa mais que categoria, que pesa mais que descrição
+NAME_WEIGHT = 3
+CATEGORY_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+STOPWORDS = frozenset('a o as os e de da do das dos em na no nas nos com sem para por um uma'.split())
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+def normalize(text):
+    # "Açaí com Granola" -> "acai com granola"
+    text = text or ''
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return text.lower()
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(normalize(text)) if token not in STOPWORDS]
+
+class InvertedIndex:
+    # Índice invertido em memória com termos ordenados para busca por prefixo
+
+    def __init__(self, max_prefix_terms=100):
+        self.max_prefix_terms = max_prefix_terms
+        self._postings = {}
+        self._terms = []
+        self._terms_sorted = True
+        self._docs = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, key, fields, meta):
+        # fields: [(texto, peso)]; meta: dados devolvidos nos resultados
+        weights = {}
+        for text, weight in fields:
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0) + weight
+
+        with self._lock:
+            self.remove(key)
+            for term, weight in weights.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    # Ordenação adiada: cargas em lote ordenam uma única vez
+                    self._terms.append(term)
+                    self._terms_sorted = False
+                postings[key] = weight
+            self._docs[key] = (meta, tuple(weights))
+
+    def remove(self, key):
+        with self._lock:
+            entry = self._docs.pop(key, None)
+            if entry is None:
+                return
+            for term in entry[1]:
+                postings = self._postings[term]
+                del postings[key]
+                if not postings:
+                    del self._postings[term]
+                    self._sort_terms()
+                    del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def _sort_terms(self):
+        if not self._terms_sorted:
+            self._terms.sort()
+            self._terms_sorted = True
+
+    def _expand(self, token, prefix):
+        if not prefix:
+            return [token] if token in self._postings else []
+        self._sort_terms()
+        start = bisect.bisect_left(self._terms, token)
+        end = bisect.bisect_left(self._terms, token + '\uffff', start)
+        return self._terms[start:min(end, start + self.max_prefix_terms)]
+
+    def search(self, query, prefix=False, kind=None, limit=20):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            candidates = []
+            for position, token in enumerate(tokens):
+                # Apenas o último termo é tratado como prefixo (typeahead)
+                terms = self._expand(token, prefix and position == len(tokens) - 1)
+                matches = {}
+                for term in terms:
+                    for key, weight in self._postings[term].items():
+                        if weight > matches.get(key, 0):
+                            matches[key] = weight
+                if not matches:
+                    return []
+                candidates.append(matches)
+
+            # Interseção a partir do termo mais seletivo
+            candidates.sort(key=len)
+            scores = candidates[0]
+            if kind:
+                scores = {key: score for key, score in scores.items() if key[0] == kind}
+            for matches in candidates[1:]:
+                scores = {key: score + matches[key] for key, score in scores.items() if key in matches}
+
+            ranked = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+            return [dict(self._docs[key][0], type=key[0], id=key[1], score=score) for key, score in ranked]
+
+class CatalogSearch:
+    # Índice do catálogo (restaurantes e produtos ativos). Alterações feitas
+    # neste processo marcam documentos como pendentes, reindexados em lote na
+    # busca seguinte; a cada max_age segundos o índice é reconstruído em
+    # segundo plano para absorver alterações de outros workers.
+
+    def __init__(self, max_age=600, chunk_size=5000):
+        self.index = InvertedIndex()
+        self.max_age = max_age
+        self.chunk_size = chunk_size
+        self.loaded_at = None
+        self._stale = set()
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        # Pendências aplicadas ao índice antigo durante a reconstrução
+        self._drained = set()
+
+    def _category_names(self):
+        return dict(Category.query.with_entities(Category.id, Category.name).all())
+
+    def _restaurant_doc(self, restaurant, categories):
+        fields = [(restaurant.name, NAME_WEIGHT),
+                  (categories.get(restaurant.category_id), CATEGORY_WEIGHT),
+                  (restaurant.description, DESCRIPTION_WEIGHT)]
+        return fields, {'name': restaurant.name, 'restaurant_id': restaurant.id}
+
+    def _product_doc(self, product):
+        fields = [(product.name, NAME_WEIGHT), (product.description, DESCRIPTION_WEIGHT)]
+        return fields, {'name': product.name, 'restaurant_id': product.restaurant_id}
+
+    def _restaurant_rows(self, ids=None, category_ids=()):
+        query = Restaurant.query.with_entities(
+            Restaurant.id, Restaurant.name, Restaurant.description,
+            Restaurant.category_id, Restaurant.is_active)
+        if ids is not None:
+            query = query.filter(Restaurant.id.in_(ids) | Restaurant.category_id.in_(category_ids))
+        return query.order_by(Restaurant.id).yield_per(self.chunk_size)
+
+    def _product_rows(self, ids=None, restaurant_ids=()):
+        query = (Product.query
+                 .join(Restaurant, Restaurant.id == Product.restaurant_id)
+                 .with_entities(Product.id, Product.name, Product.description,
+                                Product.restaurant_id, Product.is_active,
+                                Restaurant.is_active.label('restaurant_active')))
+        if ids is not None:
+            query = query.filter(Product.id.in_(ids) | Product.restaurant_id.in_(restaurant_ids))
+        return query.order_by(Product.id).yield_per(self.chunk_size)
+
+    def _index_rows(self, index, restaurants, products, categories):
+        for row in restaurants:
+            key = (RESTAURANT, row.id)
+            if row.is_active:
+                index.add(key, *self._restaurant_doc(row, categories))
+            else:
+                index.remove(key)
+        for row in products:
+            key = (PRODUCT, row.id)
+            if row.is_active and row.restaurant_active:
+                index.add(key, *self._product_doc(row))
+            else:
+                index.remove(key)
+
+    def build(self):
+        index = InvertedIndex(self.index.max_prefix_terms)
+        self._index_rows(index, self._restaurant_rows(), self._product_rows(), self._category_names())
+        self.index = index
+        self.loaded_at = time.monotonic()
+
+    def _rebuild_in_background(self, app):
+        def run():
+            try:
+                with app.app_context():
+                    self.build()
+            finally:
+                with self._lock:
+                    # O novo índice pode ter lido o banco antes dessas
+                    # alterações: voltam a ser pendências, agora sobre ele
+                    self._stale |= self._drained
+                    self._drained = set()
+                    self._rebuilding = False
+
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=run, name='catalog-search-rebuild', daemon=True).start()
+
+    def _refresh_stale(self):
+        with self._lock:
+            stale, self._stale = self._stale, set()
+            if self._rebuilding:
+                self._drained |= stale
+        if not stale:
+            return
+
+        ids = {RESTAURANT: [], PRODUCT: [], CATEGORY: []}
+        for kind, key_id in stale:
+            ids[kind].append(key_id)
+        # Documentos que sumiram do banco não voltam nas consultas abaixo
+        for key in stale:
+            self.index.remove(key)
+
+        restaurants = []
+        if ids[RESTAURANT] or ids[CATEGORY]:
+            # Renomear uma categoria afeta todos os restaurantes dela
+            restaurants = self._restaurant_rows(ids[RESTAURANT], ids[CATEGORY]).all()
+        # Produtos seguem a disponibilidade do restaurante
+        restaurant_ids = [row.id for row in restaurants]
+        products = []
+        if ids[PRODUCT] or restaurant_ids:
+            products = self._product_rows(ids[PRODUCT], restaurant_ids)
+        self._index_rows(self.index, restaurants, products,
+                         self._category_names() if restaurants else {})
+
+    def ensure_fresh(self):
+        if self.loaded_at is None:
+            with self._lock:
+                if self.loaded_at is None:
+                    self.build()
+                    self._stale.clear()
+        elif time.monotonic() - self.loaded_at > self.max_age and not self._rebuilding:
+            self._rebuild_in_background(current_app._get_current_object())
+        self._refresh_stale()
+
+    def mark_stale(self, keys):
+        if self.loaded_at is None:
+            return
+        with self._lock:
+            self._stale.update(keys)
+
+    def search(self, query, prefix=False, kind=None, limit=20):
+        self.ensure_fresh()
+        return self.index.search(query, prefix=prefix, kind=kind, limit=limit)
+
+catalog_search = CatalogSearch()
+
+@on_commit(Restaurant, Product, Category)
+def _mark_search_stale(changes):
+    kinds = {Restaurant: RESTAURANT, Product: PRODUCT, Category: CATEGORY}
+    catalog_search.mark_stale({(kinds[change.model], change.values['id'])
+                               for change in changes if 'id' in change.values})
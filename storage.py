@@ -0,0 +1,67 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Perfil do SQLite aplicado a cada conexão nova. Em WAL leitores não
+# bloqueiam o escritor; synchronous=NORMAL só faz fsync nos checkpoints;
+# busy_timeout faz os writers concorrentes esperarem pela trava em vez de
+# falhar na hora com "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'),
+    'mmap_size': os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)),
+    'temp_store': 'MEMORY',
+    'cache_size': '-20000',
+}
+
+def database_url(default_path):
+    # DATABASE_URL (mesma variável usada no deploy) ou o SQLite local
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        return f"sqlite:///{default_path}"
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def engine_options(url):
+    # Opções de create_engine por banco (SQLALCHEMY_ENGINE_OPTIONS)
+    url = make_url(url)
+    options = {'query_cache_size': int(os.environ.get('DB_STATEMENT_CACHE', '1200'))}
+
+    if url.get_backend_name() == 'sqlite':
+        # O timeout do driver cobre a espera antes do primeiro PRAGMA
+        options['connect_args'] = {'timeout': int(SQLITE_PRAGMAS['busy_timeout']) / 1000}
+    elif url.get_backend_name() == 'postgresql':
+        options.update({
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', '10')),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '20')),
+            'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+            'pool_pre_ping': True,
+        })
+        if url.get_driver_name() == 'psycopg':
+            # psycopg 3 prepara no servidor as consultas repetidas
+            options['connect_args'] = {'prepare_threshold': int(os.environ.get('DB_PREPARE_THRESHOLD', '5'))}
+    return options
+
+def configure(app, default_path):
+    url = database_url(default_path)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+def init_engine(engine):
+    # Chamado dentro do app context, antes da primeira conexão
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', _sqlite_pragmas)
+
+    # Conexões herdadas de um fork (gunicorn --preload) não são reutilizadas
+    # pelo filho; o pai continua dono delas
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+import os
+import sys
+import unittest
+sys.path.insert(0, os.path.dirname(__file__))
+
+# Banco em memória, só para o teste
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from sqlalchemy import event
+from src.main import app
+from src.models.user import db
+from src.models.order import Cart, CartItem, Order, serialize_orders
+from src.models.restaurant import Product
+from bench_data import generate
+
+class SelectCounter:
+    # Conta os SELECTs emitidos pelo engine enquanto ativo
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._before_cursor_execute)
+
+class SerializeOrdersQueriesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.context = app.app_context()
+        cls.context.push()
+        db.drop_all()
+        db.create_all()
+        generate(1, 5, 50, 300, 20, 42)
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        cls.context.pop()
+
+    def selects_for(self, per_page):
+        db.session.expunge_all()
+        with SelectCounter(db.engine) as counter:
+            orders = serialize_orders(Order.query, per_page=per_page)
+        self.assertEqual(len(orders), per_page)
+        self.assertTrue(all(order['items'] and order['items'][0]['product'] for order in orders))
+        return counter.count
+
+    def test_constant_selects(self):
+        # Pedidos, e itens com produtos: 2 SELECTs para 1 ou 200 pedidos
+        self.assertEqual(self.selects_for(1), 2)
+        self.assertEqual(self.selects_for(200), 2)
+
+    def test_same_output_as_to_dict(self):
+        expected = [order.to_dict() for order in
+                    Order.query.order_by(Order.created_at.desc(), Order.id.desc()).limit(20)]
+        db.session.expunge_all()
+        self.assertEqual(serialize_orders(Order.query, per_page=20), expected)
+
+class CartQueriesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.context = app.app_context()
+        cls.context.push()
+        db.drop_all()
+        db.create_all()
+        generate(1, 1, 30, 10, 20, 42)
+        # Carrinhos gravados com 1 e com 30 itens
+        products = Product.query.filter_by(restaurant_id=1).limit(30).all()
+        cls.carts = {}
+        for user_id, count in ((1, 1), (2, 30)):
+            cart = Cart(user_id=user_id, restaurant_id=1)
+            cart.items = [CartItem(product_id=product.id, quantity=2, unit_price=product.price,
+                                   total_price=product.price * 2) for product in products[:count]]
+            db.session.add(cart)
+            cls.carts[user_id] = count
+        db.session.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        cls.context.pop()
+
+    def test_constant_selects(self):
+        # Carrinho, e itens com produtos: 2 SELECTs para 1 ou 30 itens
+        for user_id, count in self.carts.items():
+            db.session.expunge_all()
+            with SelectCounter(db.engine) as counter:
+                cart = Cart.with_items(Cart.query.filter_by(user_id=user_id)).first().to_dict()
+            self.assertEqual(len(cart['items']), count)
+            self.assertTrue(all(item['product'] for item in cart['items']))
+            self.assertEqual(counter.count, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
+from src.services.passwords import PASSWORD_HASH_METHOD
 
 db = SQLAlchemy()
 
@@ -11,7 +12,7 @@ class User(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     phone = db.Column(db.String(20), nullable=True)
     full_name = db.Column(db.String(100), nullable=True)
-    user_type = db.Column(db.String(20), nullable=False, default='customer')  # customer, restaurant, admin
+    user_type = db.Column(db.String(20), nullable=False, default='customer')  # customer, restaurant, courier, admin
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -24,7 +25,7 @@ class User(db.Model):
         return f'<User {self.username}>'
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)